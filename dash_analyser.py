@@ -1,7 +1,9 @@
+from multiprocessing import freeze_support
 from dash_analyser_application.__main__ import main
 """
 This is the entrypoint script that is called either by the .exe file or by the user when they run the application from the command line.
 It should be placed outside the directory containing all other Dash Analyser files.
 """
 if __name__=="__main__":
+	freeze_support() #the watermarks are read in worker processes (ocr_executor.py), which would each start the GUI again in the .exe without this
 	main()
\ No newline at end of file
@@ -45,6 +45,12 @@ class GUIController(Tk):
         self.speed_chart_option=IntVar(value = 0)
         self.save_extracted_metadata_option=IntVar(value = 0)
         self.exclusion_zones_option=IntVar(value = 0)
+        self.save_ocr_frames_option=IntVar(value = 0)
+        self.glyph_ocr_option=IntVar(value = 0)
+        self.tile_map_option=IntVar(value = 0)
+        self.shared_assets_option=IntVar(value = 0)
+        self.trips_option=IntVar(value = 0)
+        self.incremental_ingest_option=IntVar(value = 0)
         self.dashcam_type=""
 
     def make_exclusion_zones(self):
@@ -101,7 +107,13 @@ class GUIController(Tk):
             Timeline = self.timeline_option.get(), 
             OCR = self.ocr_option.get(), 
             SpeedChart = self.speed_chart_option.get(), 
-            SaveMetadata = self.save_extracted_metadata_option.get()
+            SaveMetadata = self.save_extracted_metadata_option.get(),
+            SaveOCRFrames = self.save_ocr_frames_option.get(),
+            GlyphOCR = self.glyph_ocr_option.get(),
+            TileMap = self.tile_map_option.get(),
+            SharedAssets = self.shared_assets_option.get(),
+            Trips = self.trips_option.get(),
+            IncrementalIngest = self.incremental_ingest_option.get()
             )
 
     def visualise(self):
@@ -88,8 +88,20 @@ class SetupScreen(Frame):
             text="Read watermarks",
             variable=self.controller.ocr_option,
             tooltip = "Read the watermarks displayed in the videos.")
+        self.save_ocr_frames_select=Checkbutton( 
+            master=self.data_extraction_options_frame,
+            text="Save watermark frames",
+            variable=self.controller.save_ocr_frames_option,
+            tooltip = "Save the cropped watermark frames that are read to the ocr folder in the output directory. Useful for checking misreads.")
+        self.glyph_ocr_select=Checkbutton( 
+            master=self.data_extraction_options_frame,
+            text="Read watermarks with learned glyphs",
+            variable=self.controller.glyph_ocr_option,
+            tooltip = 'Learn the characters of the dashcam\'s watermark font from the first few frames, and read the rest by matching against them, which is much faster than tesseract. Frames that don\'t match well are read by tesseract. The characters learned for each dashcam type are kept in the "glyph_sets" folder and reused.')
         self.extract_metadata_select.grid(row=1, padx=5, pady=5, sticky="w")
         self.ocr_option_select.grid(row=2, padx=5, pady=5, sticky="w")
+        self.save_ocr_frames_select.grid(row=3, padx=5, pady=5, sticky="w")
+        self.glyph_ocr_select.grid(row=4, padx=5, pady=5, sticky="w")
 
     def output_menu_frame(self):
         # Defines the frame containing the elements required to set the date and time ranges for the data
@@ -122,6 +134,12 @@ class SetupScreen(Frame):
             variable=self.controller.speed_chart_option,
             tooltip = 'Generate a chart of speed against time using extracted metadata. If the "Read watermarks" options has also been selected, a second line will be plotted on the same axes using this data.')
 
+        self.tile_map_option_select=Checkbutton( 
+            master=self.output_options_frame, 
+            text="Generate tiled map", 
+            variable=self.controller.tile_map_option,
+            tooltip = 'Output the route lines as map tiles in a "tiles" folder, with a page which only loads the part of the map in view. Use this for large numbers of videos. Open the page by running "python -m http.server" in the tiles folder and browsing to http://localhost:8000.')
+
         self.save_extracted_metadata_option_select=Checkbutton( 
             master=self.output_options_frame, 
             text="Save extracted metadata", 
@@ -134,6 +152,24 @@ class SetupScreen(Frame):
             variable=self.controller.exclusion_zones_option, 
             tooltip= "If this option is selected, you will be asked to define some exclusion zones. If the map option is selected, these exclusion zones will be graphically represented on the map as circles. If the timeline option is selected, any videos in which the dashcam has enetered one of the zones will be coloured to indicate this.")
 
+        self.shared_assets_option_select=Checkbutton( 
+            master=self.output_options_frame, 
+            text="Share scripts and data between files", 
+            variable=self.controller.shared_assets_option,
+            tooltip = 'Write plotly.js, vega and leaflet once to an "assets" folder, and the speed chart and timeline data once to a "data" folder, which the map, speed chart and timeline files all load. This makes the output much smaller. Keep the folders next to the output files if you move them.')
+
+        self.trips_option_select=Checkbutton( 
+            master=self.output_options_frame, 
+            text="Group clips into trips", 
+            variable=self.controller.trips_option,
+            tooltip = "Join clips recorded less than 5 minutes apart into trips, and show each trip on the map and timeline rather than each clip. A trip's start marker lists its clips, and the timeline's legend can show the clips in each trip.")
+
+        self.incremental_ingest_option_select=Checkbutton( 
+            master=self.output_options_frame, 
+            text="Only process new or changed videos", 
+            variable=self.controller.incremental_ingest_option,
+            tooltip = 'Keep the metadata and watermark readings of each video in "ingest_manifest.sqlite" in the output folder, and reuse them when the same folder is processed again. Only videos which have been added or changed since are read, and the output files are made from every video.')
+
     def check_dashcam_type(self, combobox):
         if self.dashcam_type_drop_down.get()=="MiVue":
             self.extract_metadata_select.state(["disabled"])
@@ -159,8 +195,12 @@ class SetupScreen(Frame):
         self.map_option_select.grid(row=2, padx=5, pady=5, sticky="w")
         self.timeline_option_select.grid(row=3, padx=5, pady=5, sticky="w")
         self.speed_chart_option_select.grid(row=4, padx=5, pady=5, sticky="w")
+        self.tile_map_option_select.grid(row=5, padx=5, pady=5, sticky="w")
         self.save_extracted_metadata_option_select.grid(row=6, padx=5, pady=5, sticky="w")
         self.exclusion_zones_option_select.grid(row=7, padx=5, pady=5, sticky="w")
+        self.shared_assets_option_select.grid(row=8, padx=5, pady=5, sticky="w")
+        self.trips_option_select.grid(row=9, padx=5, pady=5, sticky="w")
+        self.incremental_ingest_option_select.grid(row=10, padx=5, pady=5, sticky="w")
 
     def make_continue_button(self):
         #Defines and places 
@@ -1,7 +1,9 @@
 from tkinter import Label, Frame, Button, font, SUNKEN, Entry, Scrollbar, Canvas, messagebox
 from tkinter.messagebox import askyesno
+from tkinter.filedialog import askopenfilename
 from tkinter.ttk import Button
 from geopy import Nominatim, exc
+from dash_analyser_application.zone_files import load_exclusion_zone_file
 
 class ExclusionZonesScreen(Frame):
 
@@ -61,6 +63,30 @@ class ExclusionZonesScreen(Frame):
         self.remove_form_button = Button(master=self.exclusion_button_frame, text='Remove exclusion zone', command=self.remove_exclusion_form)
         self.remove_form_button.grid(row=0, column=1)
 
+    def make_load_zones_button(self):
+        #Adds a button which loads many exclusion zones at once from a CSV or GeoJSON file
+        self.load_zones_button = Button(master=self.exclusion_button_frame, text='Load exclusion zones from file', command=self.load_zones_button_press)
+        self.load_zones_button.grid(row=0, column=2)
+        self.loaded_zones_label = Label(master=self.exclusion_button_frame, text="", font=self.controller.label_font)
+        self.loaded_zones_label.grid(row=1, column=0, columnspan=3, sticky="w")
+
+    def load_zones_button_press(self):
+        """
+        When the user clicks "Load exclusion zones from file", this asks for a CSV file (with Latitude, Longitude, Radius and optionally Name columns)
+        or a GeoJSON file (with Polygon features, such as the shapes exported from the map, or Point features with a radius property in metres),
+        and adds every zone in it to the exclusion zone list.
+        """
+        zone_file = askopenfilename(filetypes=[("Exclusion zone files", "*.csv *.geojson *.json"), ("All files", "*.*")])
+        if zone_file == "":
+            return
+        try:
+            loaded_zones = load_exclusion_zone_file(zone_file)
+        except (OSError, ValueError, KeyError, TypeError):
+            messagebox.showerror("Error", "Please select a valid exclusion zone file. CSV files need Latitude, Longitude and Radius (kilometers) columns.")
+            return
+        self.controller.exclusion_zone_list.extend(loaded_zones)
+        self.loaded_zones_label["text"] = f"Loaded {len(loaded_zones)} exclusion zones from {zone_file}"
+
     def add_form_button_press(self):
 
         """
@@ -211,5 +237,6 @@ class ExclusionZonesScreen(Frame):
         self.make_exclusion_button_frame()
         self.make_add_form_button()
         self.make_remove_previous_form_button()
+        self.make_load_zones_button()
         self.make_back_button()
         self.make_generate_button()
\ No newline at end of file
@@ -1,39 +1,35 @@
-from pandas import read_csv, to_datetime, concat, DataFrame
-from os import listdir
-from geopy import distance
-from folium.plugins import BeautifyIcon, MeasureControl, Draw
-from datetime import timedelta, datetime
+from pandas import to_datetime, DataFrame
+from re import findall
+from datetime import datetime
 from dash_analyser_application.mapper_functions import ExclusionZone
+from dash_analyser_application.gps_dtypes import set_compact_dtypes, make_label_column
 
 
 class MetaDataFrames:
 
 	"""
 	Manages GPS, temporal, and file information for a video file
-	Takes in a list of metadata output files containing one of each of the following file types:
-	- A GPS data file
-	- A temporal data file
-	- A file containing information about the original video file
-	Also takes in a list of ExclusionZone objects, and a temp directory for output files
+	Takes in the dictionary parsed from exiftool's JSON output for the video (see JSONMetadataExtractor), which contains:
+	- GPS and temporal data for each embedded document
+	- Information about the original video file
+	Also takes in a list of ExclusionZone objects
 	"""
 
-	def __init__(self, video_metadata_csvs: list, exclusion_zones: list, temp_dir: str):
-		self.file_info_df = read_csv(f"{temp_dir}\\{video_metadata_csvs[0]}")
+	def __init__(self, video_metadata: dict, exclusion_zones: list):
+		main_tags, documents = split_metadata_documents(video_metadata)
+		self.file_info_df = make_file_info_dataframe(main_tags)
 		file_path = self.file_info_df["SourceFile"].iloc[0]
 		self.video_name = file_path[file_path.rfind("/")+1:]
-		gps_df = read_csv(f"{temp_dir}\\{video_metadata_csvs[1]}", names=["Speed", "Speed Reference", "GPS Latitude", "GPS Longitude"])
-		time_df = read_csv(f"{temp_dir}\\{video_metadata_csvs[2]}", names=["DateTime"])
-		
-		self.gps_df=gps_df.join(time_df)
+		self.gps_df = make_gps_dataframe(documents)
 
 		self.exclusion_zones = exclusion_zones
 
 	def process_gps_and_time_dataframe(self):
 
-		"""Processes the combined GPS and temporal dataframe to remove excess rows, create a combined (latitude, longitude) column, and convert the datetime column to a datetime object"""
+		"""Processes the combined GPS and temporal dataframe to remove excess rows, store its columns with compact dtypes, and convert the datetime column to a datetime object"""
 
 		self.trim_dataframes()
-		self.combine_lat_long_columns()
+		self.set_compact_dtypes()
 		self.convert_to_datetime()
 
 	def process_file_info_dataframe(self):
@@ -50,60 +46,99 @@ class MetaDataFrames:
 		self.gps_df.drop(indexes, inplace=True)
 		self.gps_df.reset_index(drop=True, inplace=True) #resets row numbering - if this isn't done the row numbers will have gaps if data is removed
 
-	def combine_lat_long_columns(self):
-		#Combine the latitude and longitude columns into one column
-		self.gps_df["Latitude, Longitude"]=list(self.gps_df[["GPS Latitude", "GPS Longitude"]].to_records(index=False))
+	def set_compact_dtypes(self):
+		#Stores the coordinates and speed as floats and the speed reference as a categorical (see gps_dtypes.py). The map makes (latitude, longitude) pairs from the coordinate columns when it needs them
+		self.gps_df = set_compact_dtypes(self.gps_df, ["GPS Latitude", "GPS Longitude"], "Speed Reference")
 
 	def convert_to_datetime(self):
 		#converts the date and time columns in the dataframe to datetime objects, allowing them to be used for other functions
-		self.gps_df["DateTime"]=to_datetime(arg = self.gps_df["DateTime"], format = "%d-%m-%Y %H:%M:%S")
-		self.file_info_df["CreateDate"]=to_datetime(arg = self.file_info_df["CreateDate"], format = "%d-%m-%Y %H:%M:%S")
+		#exiftool's raw date format is used, as the -n option stops exiftool from formatting the dates
+		self.gps_df["DateTime"]=to_datetime(arg = self.gps_df["DateTime"].str[0:19], format = "%Y:%m:%d %H:%M:%S", errors = "coerce")
+		self.file_info_df["CreateDate"]=to_datetime(arg = self.file_info_df["CreateDate"].str[0:19], format = "%Y:%m:%d %H:%M:%S", errors = "coerce")
 
 	def add_label_for_speed_chart(self):
 		#Adds a column to the dataframe to identify the source of the data. This is done to make a legend for the speed chart.
-		self.gps_df["DataSource"] = len(self.gps_df.index) * ["Extracted metadata using exiftool"]
+		self.gps_df["DataSource"] = make_label_column("Extracted metadata using exiftool", len(self.gps_df.index))
 
 	def add_average_speed(self):
 		#Calculates the average speed for the video and adds it to the file info dataframe
-		self.file_info_df["AverageSpeed"] = round(self.gps_df["Speed"].mean(), 2)
+		self.file_info_df["AverageSpeed"] = round(float(self.gps_df["Speed"].mean()), 2)
 
 	def add_max_speed(self):
 		#Calculates the max speed for the video and adds it to the file info dataframe
-		self.file_info_df["MaxSpeed"] = round(self.gps_df["Speed"].max(), 2)
+		self.file_info_df["MaxSpeed"] = round(float(self.gps_df["Speed"].max()), 2)
 
 	def add_speed_reference(self):
 		#Gets the speed reference for the video
 		speed_ref = self.gps_df.at[0, "Speed Reference"]
-		if speed_ref == " K":
+		if speed_ref == "K":
 			self.file_info_df["SpeedRef"] = "kmph"
 		else:
 			self.file_info_df["SpeedRef"] = "mph"
 
-def make_video_csv_list(metadata_extraction_directory: str) -> list:
-	#Returns a list containing lists of three files. Each set of three files combined contains the metadata for one video being analysed.
-	files = listdir(metadata_extraction_directory)
-	video_csv_list = [files[x:x+3] for x in range(0, len(files), 3)]
-	return video_csv_list
+def document_order(document_name: str) -> tuple:
+	#Returns a sort key for a family 3 group name, so that "Doc2" comes before "Doc10", and sub-documents such as "Doc2-1" follow their parent
+	return tuple(int(number) for number in findall(r"\d+", document_name))
 
-def make_video_metadata_handlers(video_metadata_csv_list: list, exclusion_zones: list, temp_dir: str) -> list:
+def split_metadata_documents(video_metadata: dict) -> tuple:
 	"""
-	Takes in a list of strings which represents the output csv files from the metadata extraction, a list of ExclusionZone instances, 
-	and a temporary output directory.
+	Takes in the dictionary for one video from exiftool's JSON output, where each tag is prefixed with its family 3 group, e.g. "Doc1:GPSLatitude".
+	Returns a dictionary of the tags for the video file itself, and a list of dictionaries of tags for each embedded document, in document order.
+	"""
+	main_tags = {}
+	documents = {}
+	for key, value in video_metadata.items():
+		group, _, tag = key.rpartition(":")
+		if group.startswith("Doc"):
+			documents.setdefault(group, {})[tag] = value
+		else:
+			main_tags[tag] = value
+	return main_tags, [documents[group] for group in sorted(documents, key=document_order)]
+
+def format_file_size(file_size) -> str:
+	#Formats a file size in bytes the same way exiftool does when the -n option is not used
+	if file_size < 2048:
+		return f"{file_size} bytes"
+	for limit, divisor, unit, decimals in [(10240, 1024, "kB", 1), (2097152, 1024, "kB", 0), (10485760, 1048576, "MB", 1), (2147483648, 1048576, "MB", 0), (10737418240, 1073741824, "GB", 1)]:
+		if file_size < limit:
+			return f"{file_size / divisor:.{decimals}f} {unit}"
+	return f"{file_size / 1073741824:.0f} GB"
+
+def format_duration(duration) -> str:
+	#Formats a duration in seconds the same way exiftool does when the -n option is not used
+	if duration < 30:
+		return f"{duration:.2f} s"
+	duration = int(duration + 0.5)
+	return f"{duration // 3600}:{duration % 3600 // 60:02d}:{duration % 60:02d}"
+
+def make_file_info_dataframe(main_tags: dict) -> DataFrame:
+	#Makes a single row dataframe of the information about the video file, with the same columns and formatting as exiftool's csv output
+	file_info = dict(
+		SourceFile = main_tags.get("SourceFile"),
+		FileType = main_tags.get("FileType"),
+		FileSize = format_file_size(main_tags.get("FileSize", 0)),
+		MIMEType = main_tags.get("MIMEType"),
+		CreateDate = str(main_tags.get("CreateDate", "")),
+		Duration = format_duration(main_tags.get("Duration", 0))
+		)
+	return DataFrame(data = [file_info])
+
+def make_gps_dataframe(documents: list) -> DataFrame:
+	#Makes a dataframe with a row for each embedded document that contains a GPS position
+	rows = [
+		[document.get("GPSSpeed"), document.get("GPSSpeedRef"), document["GPSLatitude"], document["GPSLongitude"], str(document.get("GPSDateTime", ""))]
+		for document in documents if "GPSLatitude" in document and "GPSLongitude" in document
+		]
+	return DataFrame(data = rows, columns = ["Speed", "Speed Reference", "GPS Latitude", "GPS Longitude", "DateTime"])
+
+def make_video_metadata_handlers(video_metadata_list: list, exclusion_zones: list) -> list:
+	"""
+	Takes in a list of dictionaries parsed from exiftool's JSON output, one per video, and a list of ExclusionZone instances.
 	Makes and returns a list of MetaDataFrames instances to handle the data, and calls the functions necessary to populate the dataframes.
 	"""
-	video_metadata_handler_list = [MetaDataFrames(video_metadata_csvs, exclusion_zones, temp_dir) for video_metadata_csvs in video_metadata_csv_list]
+	video_metadata_handler_list = [MetaDataFrames(video_metadata, exclusion_zones) for video_metadata in video_metadata_list]
 	for video_metadata_handler in video_metadata_handler_list:
 		video_metadata_handler.process_gps_and_time_dataframe()
 		video_metadata_handler.process_file_info_dataframe()
 		video_metadata_handler.add_label_for_speed_chart()
-	return video_metadata_handler_list
-
-def make_speed_dataframe(video_list: list) -> DataFrame:
-	"""Takes in a list of video data handlers - either ocr or metadata, and returns a dataframe containing the speeds and datetimes in the list"""
-	speed_data = concat([video.gps_df[["Speed", "DateTime", "DataSource"]] for video in video_list])
-	return speed_data
-
-def find_final_point_in_route(video_list: list) -> tuple:
-	"""Takes in a list of video data handlers - either ocr or metadata, and returns the final available coordinate"""
-	final_point = video_list[-1].gps_df["Latitude, Longitude"].iloc[-1]
-	return final_point
\ No newline at end of file
+	return video_metadata_handler_list
\ No newline at end of file
@@ -0,0 +1,134 @@
+from subprocess import Popen, PIPE, TimeoutExpired
+from queue import Queue, Empty
+from threading import Lock, Thread
+from time import perf_counter
+
+EXIFTOOL_EXECUTABLE = "exiftool" #exiftool.exe is expected to be in the directory Dash Analyser is run from
+EXIFTOOL_PROCESSES = 1 #number of exiftool processes kept open to extract metadata with
+EXIFTOOL_TIMEOUT = 120 #number of seconds to wait for each line of exiftool's output before the process is treated as stuck and restarted
+
+def read_output_lines(stdout, output_queue:Queue):
+	#Run in a thread for each exiftool process. Passes each line the process writes to the queue, followed by None when its output ends because it has exited
+	for line in stdout:
+		output_queue.put(line)
+	output_queue.put(None)
+
+class ExifToolSession:
+
+	"""
+	Keeps a single exiftool process open using -stay_open, so that Perl and exiftool only have to start once per run rather than once per command.
+	Arguments are written to the process's stdin one per line, followed by -execute. Exiftool then writes its output followed by a {ready} line.
+	File names are sent as utf-8, and -charset filename=utf8 is given for every command so that exiftool reads non-ASCII names correctly on Windows.
+	If the process has died or gets stuck on a file, it is restarted so that the remaining files can still be read. The command it failed on raises an OSError.
+	"""
+
+	def __init__(self, executable:str=EXIFTOOL_EXECUTABLE, timeout:float=EXIFTOOL_TIMEOUT):
+		self.executable = executable
+		self.timeout = timeout
+		self.commands_run = 0
+		self.restarts = 0
+		self.total_time = 0.0
+		self.start()
+
+	def start(self):
+		#Starts the exiftool process, and a thread which reads its output so that reads can time out
+		self.process = Popen([self.executable, "-stay_open", "True", "-@", "-", "-common_args", "-charset", "filename=utf8"], stdin=PIPE, stdout=PIPE, text=True, encoding="utf-8")
+		self.output_queue = Queue()
+		Thread(target=read_output_lines, args=(self.process.stdout, self.output_queue), daemon=True).start()
+
+	def restart(self):
+		#Kills the exiftool process if it is still running, and starts a new one
+		self.process.kill()
+		self.process.wait()
+		self.restarts += 1
+		self.start()
+
+	def send_command(self, arguments:list):
+		#Writes a command to exiftool. If the process has already exited, it is restarted and the command is sent to the new process
+		if self.process.poll() is not None:
+			self.restart()
+		try:
+			self.process.stdin.write("\n".join(arguments) + "\n-execute\n")
+			self.process.stdin.flush()
+		except (BrokenPipeError, ValueError):
+			self.restart()
+			self.process.stdin.write("\n".join(arguments) + "\n-execute\n")
+			self.process.stdin.flush()
+
+	def execute(self, arguments:list) -> str:
+		"""
+		Sends a list of arguments to exiftool as one command, and returns everything exiftool writes before it is ready for the next command
+		Raises an OSError if exiftool exits or writes nothing for the timeout while running the command, after restarting it for the next command
+		"""
+		start_time = perf_counter()
+		self.send_command(arguments)
+		output_lines = []
+		while True:
+			try:
+				line = self.output_queue.get(timeout=self.timeout)
+			except Empty:
+				self.restart()
+				raise OSError(f"exiftool wrote nothing for {self.timeout}s, so it was restarted")
+			if line is None:
+				self.restart()
+				raise OSError("exiftool exited while running the command, so it was restarted")
+			if line.strip() == "{ready}":
+				break
+			output_lines.append(line)
+		self.commands_run += 1
+		self.total_time += perf_counter() - start_time
+		return "".join(output_lines)
+
+	def close(self):
+		#Tells exiftool to exit once it has finished the current command, and waits for it to do so. A process which has already died or doesn't exit in time is killed
+		try:
+			self.process.stdin.write("-stay_open\nFalse\n")
+			self.process.stdin.flush()
+			self.process.wait(timeout=self.timeout)
+		except (BrokenPipeError, ValueError, TimeoutExpired):
+			self.process.kill()
+			self.process.wait()
+
+class ExifToolPool:
+
+	"""
+	Manages a pool of ExifToolSession instances. Each command is run on whichever session is free, so several threads can extract metadata at once.
+	Sessions are only started when a command needs one, so exiftool doesn't have to be installed if it is never used.
+	Can be used as a context manager, which closes every session when it exits.
+	"""
+
+	def __init__(self, processes:int=EXIFTOOL_PROCESSES, executable:str=EXIFTOOL_EXECUTABLE):
+		self.processes = processes
+		self.executable = executable
+		self.sessions = []
+		self.free_sessions = Queue()
+		self.session_lock = Lock()
+
+	def get_session(self) -> ExifToolSession:
+		#Returns a free session, starting a new one if none are free and the pool is not full yet
+		try:
+			return self.free_sessions.get_nowait()
+		except Empty:
+			with self.session_lock:
+				if len(self.sessions) < self.processes:
+					self.sessions.append(ExifToolSession(self.executable))
+					return self.sessions[-1]
+			return self.free_sessions.get()
+
+	def execute(self, arguments:list) -> str:
+		#Runs a command on the next free session, and returns its output
+		session = self.get_session()
+		try:
+			return session.execute(arguments)
+		finally:
+			self.free_sessions.put(session)
+
+	def close(self):
+		for session in self.sessions:
+			session.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exception_details):
+		self.close()
@@ -0,0 +1,95 @@
+from numpy import arange, repeat, cumsum, concatenate, int64, zeros, asarray, nanmean
+from pandas import DataFrame, Categorical, concat
+from dash_analyser_application.geofence import get_coordinates
+from dash_analyser_application.mapper_functions import test_exclusion_zones
+
+"""
+Stores the points of every video in an intake in one table, rather than in a separate dataframe on each Video (video.py) or MetaDataFrames (dataframer.py) instance.
+The videos' points are concatenated once, in the order of the videos, with a video_id column naming the video each point came from, and the row each video starts at is kept in an offsets array.
+Each video's gps_df is then replaced with a slice of the table, which is a view rather than a copy, so the videos and the table share the same data.
+The stages which work across the whole intake - exclusion zones, the speed chart, the timeline and the map's centre - use the table directly, grouping it by video_id rather than looping over the videos.
+"""
+
+class FleetTracks:
+
+	"""
+	Takes in a list of Video or MetaDataFrames instances, or of Trips (trip_segmentation.py), and stores their points in one table and their file information in another.
+	Row i of file_info, and the rows of points from offsets[i] to offsets[i+1], belong to video i. Both tables have a categorical video_id column, whose categories are the video names in order.
+	"""
+
+	def __init__(self, video_list:list):
+		self.videos = video_list
+		self.video_names = [video.video_name for video in video_list]
+		self.lengths = asarray([len(video.gps_df.index) for video in video_list], dtype=int64)
+		self.offsets = concatenate([[0], cumsum(self.lengths)]).astype(int64)
+		self.points = concat([video.gps_df for video in video_list], ignore_index = True)
+		self.points["video_id"] = Categorical.from_codes(repeat(arange(len(video_list)), self.lengths), categories = self.video_names)
+		self.file_info = concat([video.file_info_df for video in video_list], ignore_index = True)
+		self.file_info["video_id"] = Categorical.from_codes(arange(len(video_list)), categories = self.video_names)
+		self.attach_videos()
+
+	def clip(self, video_number:int) -> DataFrame:
+		#Returns the points of the video with the given number. This is a slice of the points table, so no data is copied
+		return self.points.iloc[self.offsets[video_number]:self.offsets[video_number + 1]]
+
+	def attach_videos(self):
+		#Replaces each video's gps_df with its slice of the points table. This is done again whenever the points table is replaced, so the videos always see the same data as the table
+		for video_number, video in enumerate(self.videos):
+			video.gps_df = self.clip(video_number)
+
+	def has_points(self):
+		#Returns a boolean array which is True for each video with at least one point
+		return self.lengths > 0
+
+	def group_points(self) -> "DataFrameGroupBy":
+		#Groups the points table by video. The groups are in the same order as the videos, and videos with no points have empty groups
+		return self.points.groupby("video_id", observed = False)
+
+	def clip_times(self) -> DataFrame:
+		#Returns the first and last valid DateTime of each video, as columns "first" and "last", and the earliest and latest as "min" and "max". Videos with no points have NaT.
+		return self.group_points()["DateTime"].agg(["first", "last", "min", "max"])
+
+	def speed_data(self) -> DataFrame:
+		#Returns the speed, datetime and DataSource of every point, which the speed chart and the speed colour map are made from
+		return self.points[["Speed", "DateTime", "DataSource"]]
+
+	def mean_point(self) -> tuple:
+		#Returns the average coordinate of every point, which the map is centred on
+		latitudes, longitudes = get_coordinates(self.points)
+		return (float(nanmean(latitudes)), float(nanmean(longitudes)))
+
+	def final_point(self) -> tuple:
+		#Returns the last point of the last video with any points
+		latitudes, longitudes = get_coordinates(self.points)
+		return (float(latitudes[-1]), float(longitudes[-1]))
+
+	def test_exclusion_zones(self, exclusion_zones:list, zone_index:"ZoneIndex"=None):
+		"""
+		Tests every point in the table against the exclusion zones in one pass (see test_exclusion_zones() in mapper_functions.py), which adds a column per zone,
+		then notes the zones each video entered in its file information
+		"""
+		self.points = test_exclusion_zones(self.points, exclusion_zones, zone_index)
+		self.attach_videos()
+		self.add_exclusion_zones_to_file_info(exclusion_zones)
+
+	def add_exclusion_zones_to_file_info(self, exclusion_zones:list):
+		"""
+		Finds which zones each video entered by grouping the per point zone columns by video, and notes them in the "Present in Exclusion Zones" column
+		of the file information table and of each video's file_info_df, in the form the timeline shows them in
+		"""
+		zone_columns = [f"In Exclusion Zone {i+1}" for i in range(len(exclusion_zones))]
+		if zone_columns == []:
+			present = zeros((len(self.videos), 0), dtype=bool)
+		else:
+			present = self.group_points()[zone_columns].any().to_numpy(dtype=bool)
+		zone_labels = asarray([exclusion_zone.timeline_label for exclusion_zone in exclusion_zones], dtype=object)
+		zone_text = [",<br><br>".join(zone_labels[zones_entered]) or "Not in exclusion zones" for zones_entered in present]
+		self.file_info["Present in Exclusion Zones"] = zone_text
+		for video, text in zip(self.videos, zone_text):
+			video.file_info_df["Present in Exclusion Zones"] = text
+
+def make_fleet_tracks(video_list:list, exclusion_zones:list, zone_index:"ZoneIndex"=None) -> FleetTracks:
+	#Makes a FleetTracks instance for a list of videos, and tests every point against the exclusion zones
+	fleet = FleetTracks(video_list)
+	fleet.test_exclusion_zones(exclusion_zones, zone_index)
+	return fleet
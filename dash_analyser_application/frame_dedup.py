@@ -0,0 +1,70 @@
+from hashlib import blake2b
+from cv2 import resize, cvtColor, COLOR_BGR2GRAY, INTER_AREA
+from numpy import packbits, unpackbits, bitwise_xor
+
+DEDUPLICATE_FRAMES = True #if True, frames whose watermark crop has not changed are not read again
+FUZZY_DEDUPLICATION = False #if True, crops whose perceptual hash is within HASH_TOLERANCE of the previous unique crop's also reuse its output. Off by default, as only identical crops are certain to have the same watermark
+HASH_TOLERANCE = 2 #number of bits by which the perceptual hashes of two consecutive crops can differ while still being counted as the same watermark, when fuzzy deduplication is on
+HASH_SCALE = 0.5 #the crops are shrunk by this factor before hashing, which smooths out compression noise while keeping individual digits visible
+
+def exact_hash(image) -> bytes:
+	#Returns a hash of the raw pixel data of a crop. Crops with the same hash are identical.
+	return blake2b(image.tobytes(), digest_size=16).digest()
+
+def perceptual_hash(image):
+	"""
+	Returns a perceptual hash of a crop, as a packed array of bits.
+	The crop is shrunk and then thresholded around its mean, so small changes in brightness or compression noise don't change the hash,
+	but a change to a single character of the watermark does.
+	"""
+	if image.ndim == 3:
+		image = cvtColor(image, COLOR_BGR2GRAY)
+	small = resize(image, None, fx=HASH_SCALE, fy=HASH_SCALE, interpolation=INTER_AREA)
+	return packbits(small > small.mean())
+
+def hamming_distance(hash_a, hash_b) -> int:
+	#Returns the number of bits that differ between two perceptual hashes
+	return int(unpackbits(bitwise_xor(hash_a, hash_b)).sum())
+
+class FrameDeduplicator:
+
+	"""
+	Finds the frames of a video which have the same watermark as an earlier frame, so their OCR output can be reused instead of calling tesseract again.
+	A crop counts as a duplicate if it is identical to any earlier crop, or, if fuzzy is True, if its perceptual hash is within the tolerance of the previous unique crop's.
+	"""
+
+	def __init__(self, fuzzy:bool=FUZZY_DEDUPLICATION, hash_tolerance:int=HASH_TOLERANCE):
+		self.fuzzy = fuzzy
+		self.hash_tolerance = hash_tolerance
+
+	def find_unique_frames(self, images:list) -> tuple:
+		"""
+		Takes in a list of cropped frames in order.
+		Returns a list of the frames which need to be read, and a list mapping every frame to the index of the unique frame whose OCR output it should use.
+		"""
+		unique_images = []
+		frame_map = []
+		seen_hashes = {}
+		previous_hash = None
+		for image in images:
+			image_hash = exact_hash(image)
+			if image_hash in seen_hashes:
+				frame_map.append(seen_hashes[image_hash])
+				continue
+			current_hash = perceptual_hash(image) if self.fuzzy else None
+			if current_hash is not None and previous_hash is not None and previous_hash.shape == current_hash.shape and hamming_distance(previous_hash, current_hash) <= self.hash_tolerance:
+				frame_map.append(len(unique_images) - 1)
+			else:
+				unique_images.append(image)
+				frame_map.append(len(unique_images) - 1)
+				previous_hash = current_hash
+			seen_hashes[image_hash] = frame_map[-1]
+		return unique_images, frame_map
+
+def expand_watermarks(unique_watermarks:list, frame_map:list) -> list:
+	#Uses the frame map made by FrameDeduplicator to give every frame the OCR output of its unique frame
+	return [unique_watermarks[unique_index] for unique_index in frame_map]
+
+def report_avoided_ocr(frame_count:int, unique_count:int) -> str:
+	#Returns a summary of how many tesseract reads were avoided by reusing the output for unchanged watermarks
+	return f"Read {unique_count} unique watermarks out of {frame_count} frames ({frame_count - unique_count} OCR calls avoided)"
@@ -0,0 +1,264 @@
+from numpy import radians, degrees, sin, cos, arcsin, floor, maximum, minimum, stack, asarray, float64, int64, zeros, full, arange, concatenate, argsort, unique, searchsorted, where, repeat, cumsum, flatnonzero, isfinite, errstate
+from geopy import distance
+
+"""
+Tests GPS points against exclusion zones using NumPy, rather than calling geopy once per point and zone.
+A grid index (ZoneIndex) over the bounding box of every zone finds the zones each point could be in, and only those pairs are tested exactly.
+Circular zones are compared in one vectorised operation on the unit sphere, which is equivalent to comparing haversine distances.
+Treating the earth as a sphere can be out by up to about 0.5%, so points close to the edge of a circle can optionally be re-measured with geopy's exact geodesic distance.
+Polygon zones are tested with a vectorised ray casting (even-odd) test, so holes and multipolygons are handled by including all of their rings.
+"""
+
+EARTH_RADIUS_KM = 6371.0088 #mean radius of the earth used by the haversine formula
+GEODESIC_REFINEMENT_BAND = 0.005 #points within this fraction of a zone's radius of its edge are re-measured with geopy's geodesic distance. 0 turns refinement off
+GRID_CELL_DEGREES = 0.05 #size in degrees of the grid cells used to index zones. Each zone is listed under every cell its bounding box overlaps
+CELL_KEY_STRIDE = 1 << 32 #multiplier which packs a grid row and column into one integer key
+MAX_EDGE_PAIRS = 4000000 #maximum number of point-edge pairs held in memory at once when ray casting. Larger inputs are tested in chunks of points
+
+def get_coordinate_columns(gps_df) -> list:
+	#Returns the names of the latitude and longitude columns of a GPS dataframe. Metadata and OCR dataframes name these columns differently.
+	if "GPS Latitude" in gps_df.columns:
+		return ["GPS Latitude", "GPS Longitude"]
+	return ["Latitude", "Longitude"]
+
+def get_coordinates(gps_df) -> tuple:
+	#Returns the latitude and longitude columns of a GPS dataframe as float arrays
+	latitude_column, longitude_column = get_coordinate_columns(gps_df)
+	return gps_df[latitude_column].to_numpy(dtype=float64), gps_df[longitude_column].to_numpy(dtype=float64)
+
+def get_points(gps_df):
+	#Returns the points of a GPS dataframe as an array of shape (points, 2) of (latitude, longitude) pairs, which is made when a route line is drawn rather than stored in the dataframe
+	return gps_df[get_coordinate_columns(gps_df)].to_numpy(dtype=float64)
+
+def unit_vectors(latitudes, longitudes):
+	#Converts arrays of coordinates in degrees to an array of shape (points, 3) of points on the unit sphere
+	latitudes = radians(latitudes)
+	longitudes = radians(longitudes)
+	return stack([cos(latitudes) * cos(longitudes), cos(latitudes) * sin(longitudes), sin(latitudes)], axis=1)
+
+def radius_to_chord_squared(radii):
+	#Converts great circle distances in kilometres to the squared length of the straight chord between the two points on the unit sphere
+	return (2 * sin(radii / (2 * EARTH_RADIUS_KM))) ** 2
+
+def chord_lengths_squared(point_vectors, centre_vectors):
+	"""
+	Takes in two arrays of the same shape of points on the unit sphere, and returns the squared chord length between each pair of points.
+	The chord length increases with the great circle (haversine) distance, so comparing it against a zone's radius converted with radius_to_chord_squared
+	gives the same result as comparing haversine distances, without any trigonometry per pair.
+	"""
+	return maximum(2 - 2 * (point_vectors * centre_vectors).sum(axis=1), 0)
+
+def refine_near_boundary(inside, chords, latitudes, longitudes, zone_latitudes, zone_longitudes, radii, refinement_band:float):
+	"""
+	Takes in arrays with one entry per candidate point-zone pair.
+	Re-measures the pairs within the refinement band of the zone's edge using geopy's geodesic distance, and updates the mask for them.
+	Only these few pairs can be misclassified by the spherical approximation, so the exact solver is never run on the rest.
+	Returns the number of pairs re-measured.
+	"""
+	near_edge = flatnonzero((chords >= radius_to_chord_squared(radii * (1 - refinement_band))) & (chords <= radius_to_chord_squared(radii * (1 + refinement_band))))
+	for pair in near_edge:
+		inside[pair] = distance.distance((zone_latitudes[pair], zone_longitudes[pair]), (latitudes[pair], longitudes[pair])).km <= radii[pair]
+	return len(near_edge)
+
+class CircleSet:
+
+	"""Stores the centres and radii of the circular zones in an index, and tests points against them using their chord lengths on the unit sphere"""
+
+	def __init__(self, zone_numbers, latitudes, longitudes, radii):
+		self.zone_numbers = zone_numbers
+		self.latitudes = latitudes
+		self.longitudes = longitudes
+		self.radii = radii
+		self.centre_vectors = unit_vectors(latitudes, longitudes)
+		self.radius_chords = radius_to_chord_squared(radii)
+
+	def bounding_boxes(self) -> tuple:
+		"""
+		Returns the south, north, west and east edges of the box around each circle.
+		The half width is the widest longitude the circle reaches on the sphere, so it stays finite near the poles. Circles which contain a pole cover every longitude.
+		The west and east edges can be beyond ±180 for circles which cross the antimeridian, and ZoneIndex wraps them.
+		"""
+		angular_radii = self.radii / EARTH_RADIUS_KM
+		half_heights = degrees(angular_radii)
+		contains_pole = abs(self.latitudes) + half_heights >= 90
+		with errstate(divide="ignore", invalid="ignore"):
+			half_widths = where(contains_pole, 180.0, degrees(arcsin(minimum(sin(angular_radii) / cos(radians(self.latitudes)), 1))))
+		return maximum(self.latitudes - half_heights, -90), minimum(self.latitudes + half_heights, 90), self.longitudes - half_widths, self.longitudes + half_widths
+
+	def contains(self, latitudes, longitudes, members, refinement_band:float=GEODESIC_REFINEMENT_BAND):
+		#Takes in the coordinates of each candidate pair's point and the index of its circle in this set, and returns whether each point is inside its circle
+		chords = chord_lengths_squared(unit_vectors(latitudes, longitudes), self.centre_vectors[members])
+		inside = chords <= self.radius_chords[members]
+		if refinement_band > 0:
+			refine_near_boundary(inside, chords, latitudes, longitudes, self.latitudes[members], self.longitudes[members], self.radii[members], refinement_band)
+		return inside
+
+def make_edges(rings:list) -> tuple:
+	#Converts a list of rings, each a list of (latitude, longitude) vertices, into arrays of the start and end coordinates of every edge. Rings are closed if they aren't already.
+	starts = []
+	ends = []
+	for ring in rings:
+		ring = asarray(ring, dtype=float64).reshape(-1, 2)
+		if len(ring) < 3:
+			continue
+		starts.append(ring)
+		ends.append(concatenate([ring[1:], ring[:1]]))
+	if starts == []:
+		return zeros((0, 2)), zeros((0, 2))
+	return concatenate(starts), concatenate(ends)
+
+def ray_cast(latitudes, longitudes, edge_starts, edge_ends):
+	"""
+	Takes in arrays of point coordinates and the edges of a polygon, and returns whether each point is inside the polygon.
+	A ray is cast from each point towards the east, and the point is inside if the ray crosses an odd number of edges.
+	Every point is tested against every edge in one broadcasted operation, in chunks of points so that no more than MAX_EDGE_PAIRS pairs are held at once.
+	"""
+	inside = zeros(len(latitudes), dtype=bool)
+	if len(edge_starts) == 0:
+		return inside
+	start_latitudes, start_longitudes = edge_starts[:, 0][None, :], edge_starts[:, 1][None, :]
+	end_latitudes, end_longitudes = edge_ends[:, 0][None, :], edge_ends[:, 1][None, :]
+	chunk_size = max(1, MAX_EDGE_PAIRS // len(edge_starts))
+	for start in range(0, len(latitudes), chunk_size):
+		point_latitudes = latitudes[start:start+chunk_size, None]
+		point_longitudes = longitudes[start:start+chunk_size, None]
+		straddles = (start_latitudes > point_latitudes) != (end_latitudes > point_latitudes)
+		with errstate(divide="ignore", invalid="ignore"):
+			crossing_longitudes = start_longitudes + (point_latitudes - start_latitudes) * (end_longitudes - start_longitudes) / (end_latitudes - start_latitudes)
+		crossings = straddles & (point_longitudes < crossing_longitudes)
+		inside[start:start+chunk_size] = crossings.sum(axis=1) % 2 == 1
+	return inside
+
+class PolygonSet:
+
+	"""
+	Stores the edges of the polygon zones in an index, and tests points against them by ray casting.
+	Each zone can be made of several polygons, each with an outer ring and any number of holes. All of a zone's rings are tested together using the even-odd rule.
+	Edges are treated as straight lines in latitude and longitude, which matches how they are drawn on the map closely enough at the scale of a geofence.
+	"""
+
+	def __init__(self, zone_numbers, polygon_list:list):
+		self.zone_numbers = zone_numbers
+		self.edges = [make_edges([ring for polygon in polygons for ring in polygon]) for polygons in polygon_list]
+
+	def bounding_boxes(self) -> tuple:
+		#Returns the south, north, west and east edges of the box around each zone's polygons. Zones with no edges get an empty box.
+		boxes = [(starts[:, 0].min(), starts[:, 0].max(), starts[:, 1].min(), starts[:, 1].max()) if len(starts) else (1.0, 0.0, 1.0, 0.0) for starts, ends in self.edges]
+		south, north, west, east = zip(*boxes) if boxes else ((), (), (), ())
+		return asarray(south, dtype=float64), asarray(north, dtype=float64), asarray(west, dtype=float64), asarray(east, dtype=float64)
+
+	def contains(self, latitudes, longitudes, members, refinement_band:float=GEODESIC_REFINEMENT_BAND):
+		#Takes in the coordinates of each candidate pair's point and the index of its zone in this set, and ray casts each zone's points against that zone's edges
+		inside = zeros(len(members), dtype=bool)
+		for member in unique(members):
+			pairs = flatnonzero(members == member)
+			edge_starts, edge_ends = self.edges[member]
+			inside[pairs] = ray_cast(latitudes[pairs], longitudes[pairs], edge_starts, edge_ends)
+		return inside
+
+def make_cell_keys(rows, columns):
+	#Combines grid row and column numbers into a single integer key per cell
+	return rows.astype(int64) * CELL_KEY_STRIDE + columns.astype(int64)
+
+class ZoneIndex:
+
+	"""
+	A uniform latitude/longitude grid over the bounding boxes of a set of zones, so each point is only tested against the zones whose bounding box could contain it.
+	Each zone is listed under every cell its bounding box overlaps. Columns wrap around at the antimeridian, so a box which crosses it is listed under the cells on both sides,
+	and a box can never cover more than one full turn of columns, however close to a pole it is.
+	The cells are stored sorted by key, with the zones for each cell held in one array,
+	so the candidate zones for millions of points are found with a single binary search rather than testing every point against every zone.
+	The candidate pairs are then passed to the CircleSet or PolygonSet holding each zone for the exact test.
+	The index is built once per run and reused for every video.
+	"""
+
+	def __init__(self, shape_sets:list, zone_count:int, cell_size:float=GRID_CELL_DEGREES):
+		self.shape_sets = shape_sets
+		self.zone_count = zone_count
+		self.cell_size = cell_size
+		self.column_count = int(round(360 / cell_size))
+		boxes = [shape_set.bounding_boxes() for shape_set in shape_sets]
+		self.south, self.north, self.west, self.east = [concatenate([box[side] for box in boxes]) if boxes else zeros(0) for side in range(4)]
+		self.owners = concatenate([full(len(shape_set.zone_numbers), set_number, dtype=int64) for set_number, shape_set in enumerate(shape_sets)]) if shape_sets else zeros(0, dtype=int64)
+		self.members = concatenate([arange(len(shape_set.zone_numbers)) for shape_set in shape_sets]) if shape_sets else zeros(0, dtype=int64)
+		self.build_cells()
+
+	def build_cells(self):
+		#Lists each zone under every grid cell its bounding box overlaps, then sorts the entries by cell so each cell's zones are contiguous
+		cell_keys = [zeros(0, dtype=int64)]
+		cell_zones = [zeros(0, dtype=int64)]
+		for zone in range(len(self.south)):
+			rows = arange(floor(self.south[zone] / self.cell_size), floor(self.north[zone] / self.cell_size) + 1)
+			columns = arange(self.find_columns(self.west[zone], wrap=False), self.find_columns(self.east[zone], wrap=False) + 1)
+			columns = arange(self.column_count) if len(columns) >= self.column_count else columns % self.column_count
+			keys = make_cell_keys(rows[:, None], columns[None, :]).ravel()
+			cell_keys.append(keys)
+			cell_zones.append(full(len(keys), zone, dtype=int64))
+		cell_keys = concatenate(cell_keys)
+		cell_zones = concatenate(cell_zones)
+		order = argsort(cell_keys, kind="stable")
+		self.cell_zones = cell_zones[order]
+		self.cell_keys, self.cell_starts, self.cell_counts = unique(cell_keys[order], return_index=True, return_counts=True)
+
+	def find_columns(self, longitudes, wrap:bool=True):
+		#Returns the grid column of each longitude, counting east from the antimeridian. Columns are wrapped into a single turn unless wrap is False, which is used for the edges of a box so that its columns can be listed in order before wrapping
+		columns = floor((longitudes + 180) / self.cell_size)
+		return columns % self.column_count if wrap else columns
+
+	def find_candidates(self, latitudes, longitudes) -> tuple:
+		#Returns arrays of point indices and zone indices for every point which lies in a cell and inside the bounding box of a zone listed for that cell
+		keys = make_cell_keys(floor(latitudes / self.cell_size), self.find_columns(longitudes))
+		positions = minimum(searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+		found = self.cell_keys[positions] == keys
+		counts = where(found, self.cell_counts[positions], 0)
+		point_indices = repeat(arange(len(latitudes)), counts)
+		offsets = arange(len(point_indices)) - repeat(cumsum(counts) - counts, counts)
+		zone_indices = self.cell_zones[repeat(self.cell_starts[positions], counts) + offsets]
+		point_latitudes = latitudes[point_indices]
+		point_longitudes = longitudes[point_indices]
+		in_box = (point_latitudes >= self.south[zone_indices]) & (point_latitudes <= self.north[zone_indices]) & ((point_longitudes - self.west[zone_indices]) % 360 <= self.east[zone_indices] - self.west[zone_indices])
+		return point_indices[in_box], zone_indices[in_box]
+
+	def query(self, latitudes, longitudes, refinement_band:float=GEODESIC_REFINEMENT_BAND) -> tuple:
+		"""
+		Takes in arrays of point coordinates in degrees.
+		Returns arrays of point indices and zone numbers for every pair where the point is inside the zone. Points with missing coordinates are never inside a zone.
+		Only the candidate pairs found by the grid are tested, by the shape set each zone belongs to.
+		"""
+		point_results = [zeros(0, dtype=int64)]
+		zone_results = [zeros(0, dtype=int64)]
+		if len(self.cell_keys) == 0 or len(latitudes) == 0:
+			return point_results[0], zone_results[0]
+		valid = flatnonzero(isfinite(latitudes) & isfinite(longitudes))
+		point_indices, zone_indices = self.find_candidates(latitudes[valid], longitudes[valid])
+		point_indices = valid[point_indices]
+		for set_number, shape_set in enumerate(self.shape_sets):
+			pairs = flatnonzero(self.owners[zone_indices] == set_number)
+			members = self.members[zone_indices[pairs]]
+			inside = shape_set.contains(latitudes[point_indices[pairs]], longitudes[point_indices[pairs]], members, refinement_band)
+			point_results.append(point_indices[pairs[inside]])
+			zone_results.append(shape_set.zone_numbers[members[inside]])
+		return concatenate(point_results), concatenate(zone_results)
+
+def make_zone_index(exclusion_zones:list, cell_size:float=GRID_CELL_DEGREES) -> ZoneIndex:
+	"""
+	Builds a ZoneIndex over a list of ExclusionZone and PolygonExclusionZone (mapper_classes.py) instances.
+	Zones with polygons are placed in a PolygonSet and the rest in a CircleSet. Each zone keeps its position in the list as its zone number.
+	"""
+	polygon_numbers = [number for number, zone in enumerate(exclusion_zones) if getattr(zone, "polygons", None) is not None]
+	circle_numbers = [number for number, zone in enumerate(exclusion_zones) if getattr(zone, "polygons", None) is None]
+	circles = CircleSet(
+		asarray(circle_numbers, dtype=int64),
+		asarray([exclusion_zones[number].location[0] for number in circle_numbers], dtype=float64),
+		asarray([exclusion_zones[number].location[1] for number in circle_numbers], dtype=float64),
+		asarray([exclusion_zones[number].radius_km for number in circle_numbers], dtype=float64))
+	polygons = PolygonSet(asarray(polygon_numbers, dtype=int64), [exclusion_zones[number].polygons for number in polygon_numbers])
+	return ZoneIndex([circles, polygons], len(exclusion_zones), cell_size)
+
+def test_points_against_zones(gps_df, zone_index:ZoneIndex, refinement_band:float=GEODESIC_REFINEMENT_BAND):
+	#Returns a boolean array of shape (rows, zones) which is True where a row of the GPS dataframe is inside a zone in the ZoneIndex
+	latitudes, longitudes = get_coordinates(gps_df)
+	inside = zeros((len(latitudes), zone_index.zone_count), dtype=bool)
+	point_indices, zone_indices = zone_index.query(latitudes, longitudes, refinement_band)
+	inside[point_indices, zone_indices] = True
+	return inside
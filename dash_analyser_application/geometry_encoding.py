@@ -0,0 +1,139 @@
+from json import dumps
+from numpy import asarray, float64, int64, uint8, rint, diff, zeros, ones, repeat, arange, cumsum
+from branca.element import MacroElement
+from jinja2 import Template
+
+"""
+Writes the route lines on the map as compact encoded strings rather than as JSON arrays of full precision coordinates.
+Each video's track is stored once in a table in the page header, using Google's encoded polyline format, and is decoded in the browser when the page loads.
+The route line and speed line layers then refer to slices of the stored track, so the coordinates of a track are never written to the page more than once.
+"""
+
+ENCODING_PRECISION = 5 #decimal places coordinates are stored to, where 5 is about 1m. At most 6, as the decoder works with 32 bit integers. None writes full precision coordinates for every line instead
+ROUTELINE_WEIGHT = 3 #width in pixels of the route line, which is the same as folium's PolyLine default
+
+def encode_polyline(coordinates, precision:int=ENCODING_PRECISION) -> str:
+	"""
+	Takes in a list or array of (latitude, longitude) pairs, and returns them as an encoded polyline string.
+	Each coordinate is stored as the difference from the previous point, split into 5 bit chunks which are written as printable characters.
+	Every chunk of every value is found in one vectorised operation.
+	"""
+	values = rint(asarray(coordinates, dtype=float64).reshape(-1, 2) * 10 ** precision).astype(int64)
+	deltas = diff(values, axis=0, prepend=zeros((1, 2), dtype=int64)).ravel()
+	deltas = (deltas << 1) ^ (deltas >> 63) #negative values are inverted, so the sign is stored in the lowest bit
+	chunk_counts = ones(len(deltas), dtype=int64)
+	for shift in range(5, 64, 5):
+		chunk_counts += (deltas >> shift) > 0
+	values_of_chunks = repeat(arange(len(deltas)), chunk_counts)
+	chunk_positions = arange(len(values_of_chunks)) - repeat(cumsum(chunk_counts) - chunk_counts, chunk_counts)
+	chunks = (deltas[values_of_chunks] >> (5 * chunk_positions)) & 31
+	chunks[chunk_positions < chunk_counts[values_of_chunks] - 1] |= 32 #every chunk except the last of each value is flagged as continuing
+	return (chunks + 63).astype(uint8).tobytes().decode("ascii")
+
+def dumps_for_template(data:list) -> str:
+	"""
+	Returns a list as compact JSON which can be placed in a folium element's script.
+	The rendered script is parsed as a jinja template a second time, so braces are written as unicode escapes, which only works as every brace is inside a string.
+	"""
+	return dumps(data, separators = (",", ":")).replace("{", "\\u007b").replace("}", "\\u007d")
+
+class EncodedTrackTable(MacroElement):
+
+	"""
+	Stores the encoded track of every video on the map, and writes them along with the decoder to the page header.
+	Tracks are decoded the first time a layer uses them, and the decoded points are shared by every layer that refers to the same track.
+	Lines are added to feature groups through an EncodedPolyLines element, which is made the first time a group is given a line.
+	"""
+
+	_template = Template("""
+		{% macro header(this, kwargs) %}
+		<script>
+		var {{ this.get_name() }} = (function () {
+			var tracks = {{ this.tracks_json() }};
+			var decoded = {};
+			function decode(encoded) {
+				var factor = Math.pow(10, {{ this.precision }}), points = [], index = 0, latitude = 0, longitude = 0;
+				while (index < encoded.length) {
+					var values = [0, 0];
+					for (var i = 0; i < 2; i++) {
+						var result = 0, shift = 0, chunk;
+						do {
+							chunk = encoded.charCodeAt(index++) - 63;
+							result |= (chunk & 31) << shift;
+							shift += 5;
+						} while (chunk >= 32);
+						values[i] = (result & 1) ? ~(result >> 1) : (result >> 1);
+					}
+					latitude += values[0];
+					longitude += values[1];
+					points.push([latitude / factor, longitude / factor]);
+				}
+				return points;
+			}
+			return function (track) {
+				if (!(track in decoded)) { decoded[track] = decode(tracks[track]); }
+				return decoded[track];
+			};
+		})();
+		</script>
+		{% endmacro %}
+		""")
+
+	def __init__(self, precision:int=ENCODING_PRECISION):
+		super().__init__()
+		self._name = "EncodedTrackTable"
+		self.precision = precision
+		self.tracks = []
+		self.layers = {}
+
+	def tracks_json(self) -> str:
+		return dumps_for_template(self.tracks)
+
+	def set_track(self, track_id:int, points:list) -> int:
+		#Stores the encoded points of a track, replacing the track with the given id, or adding a new track if the id is None. Returns the track's id.
+		encoded_track = encode_polyline(points, self.precision)
+		if track_id is None:
+			self.tracks.append(encoded_track)
+			return len(self.tracks) - 1
+		self.tracks[track_id] = encoded_track
+		return track_id
+
+	def add_line(self, group:"FeatureGroup", colour:str, weight:float, track_slices:list):
+		"""
+		Adds a line to a feature group, drawn from slices of the stored tracks. Each slice is [track id] for a whole track,
+		or [track id, first point, last point] for part of one. A line with several slices is drawn as one multi-part line.
+		"""
+		if id(group) not in self.layers:
+			self.layers[id(group)] = EncodedPolyLines(self).add_to(group)
+		self.layers[id(group)].lines.append([colour, weight, track_slices])
+
+class EncodedPolyLines(MacroElement):
+
+	"""Draws the lines added to a feature group through an EncodedTrackTable, using the table's decoded tracks"""
+
+	_template = Template("""
+		{% macro script(this, kwargs) %}
+		{{ this.lines_json() }}.forEach(function (line) {
+			var points = line[2].map(function (slice) {
+				var track = {{ this.track_table.get_name() }}(slice[0]);
+				return slice.length == 1 ? track : track.slice(slice[1], slice[2] + 1);
+			});
+			L.polyline(points, {color: line[0], weight: line[1]}).addTo({{ this._parent.get_name() }});
+		});
+		{% endmacro %}
+		""")
+
+	def __init__(self, track_table:EncodedTrackTable):
+		super().__init__()
+		self._name = "EncodedPolyLines"
+		self.track_table = track_table
+		self.lines = []
+
+	def lines_json(self) -> str:
+		return dumps_for_template(self.lines)
+
+def make_track_table(precision:int=ENCODING_PRECISION) -> EncodedTrackTable:
+	#Returns an EncodedTrackTable for the given precision, or None if every line should be written with full precision coordinates
+	if precision is None:
+		return None
+	return EncodedTrackTable(precision)
@@ -0,0 +1,44 @@
+from numpy import float32, float64, zeros, int8
+from pandas import DataFrame, Categorical, to_numeric
+
+"""
+Keeps the GPS dataframes of every video small. Coordinates and speeds are stored as plain float columns, and the columns which hold the same few strings on every row
+(the DataSource label and the speed reference) are stored as categoricals, which hold each string once and a small integer code per row.
+The (latitude, longitude) pairs the map needs are made from the coordinate columns when a route line is drawn, rather than being stored as a column of Python objects.
+The saving can be measured with memory_usage(deep=True) against the layout the dataframes were stored in before, which report_memory_saving() rebuilds from the compact dataframe.
+"""
+
+COORDINATE_DTYPE = float64 #dtype latitudes and longitudes are stored as. float32 halves their size, but only keeps them to about a metre
+SPEED_DTYPE = float32 #dtype speeds are stored as. Speeds are only shown to 2 decimal places, which float32 keeps
+MEASURE_GPS_MEMORY = False #prints how much memory the compact dtypes save over every video's points. Off by default, as it builds a second copy of the points in the original layout to compare against
+
+def set_compact_dtypes(gps_df:DataFrame, coordinate_columns:list, speed_reference_column:str, coordinate_dtype:type=COORDINATE_DTYPE) -> DataFrame:
+	"""
+	Takes in a GPS dataframe, the names of its latitude and longitude columns, and the name of its speed reference column, which differ between metadata and OCR dataframes
+	Returns the dataframe with its coordinates and speed stored as floats and its speed reference as a categorical. Speeds which can't be read as numbers are left missing.
+	"""
+	gps_df = gps_df.assign(Speed = to_numeric(gps_df["Speed"], errors = "coerce"))
+	return gps_df.astype({**{column: coordinate_dtype for column in coordinate_columns}, "Speed": SPEED_DTYPE, speed_reference_column: "category"})
+
+def make_label_column(label:str, length:int) -> Categorical:
+	#Returns a categorical column holding the same label on every row, such as the DataSource each point came from, which stores the label once rather than once per row
+	return Categorical.from_codes(zeros(length, dtype=int8), categories = [label])
+
+def make_original_layout(gps_df:DataFrame, coordinate_columns:list, speed_reference_column:str) -> DataFrame:
+	#Returns a copy of a compact GPS dataframe in the layout it was stored in before: float64 coordinates and speeds, the speed reference and DataSource as a string on every row, and a "Latitude, Longitude" column of records
+	original_dtypes = {**{column: float64 for column in coordinate_columns}, "Speed": float64, speed_reference_column: object}
+	if "DataSource" in gps_df.columns:
+		original_dtypes["DataSource"] = object
+	original_df = gps_df.astype(original_dtypes)
+	original_df["Latitude, Longitude"] = list(original_df[coordinate_columns].to_records(index=False))
+	return original_df
+
+def measure_memory_saving(gps_df:DataFrame, coordinate_columns:list, speed_reference_column:str) -> tuple:
+	#Returns the number of bytes a compact GPS dataframe would take up in the original layout, and takes up now, as measured by memory_usage(deep=True)
+	original_bytes = int(make_original_layout(gps_df, coordinate_columns, speed_reference_column).memory_usage(deep=True).sum())
+	return original_bytes, int(gps_df.memory_usage(deep=True).sum())
+
+def report_memory_saving(gps_df:DataFrame, coordinate_columns:list, speed_reference_column:str) -> str:
+	#Returns how much memory the compact dtypes save for a GPS dataframe, such as the points table of every video in an ingest (fleet_tracks.py)
+	original_bytes, compact_bytes = measure_memory_saving(gps_df, coordinate_columns, speed_reference_column)
+	return f"GPS data for {len(gps_df.index)} points takes up {compact_bytes / 1048576:.2f}MB, down from {original_bytes / 1048576:.2f}MB in the original layout ({compact_bytes / max(original_bytes, 1):.1%} of original size)"
@@ -0,0 +1,100 @@
+from sqlite3 import connect
+from hashlib import blake2b
+from pickle import dumps, loads, HIGHEST_PROTOCOL
+from zlib import compress, decompress
+from os import stat
+
+"""
+Keeps the results of extracting metadata from and reading the watermarks of each video in an SQLite database in the output directory, so later runs over the same folder
+only have to process the videos which have been added or changed since.
+Each video is identified by its path, size, modification time and a hash of its first and last PARTIAL_HASH_BYTES, so a changed file is processed again without reading the whole video.
+The metadata is stored as the dictionary the metadata extractors make, so the dataframes are made from it in the same way as from a new extraction.
+Only successful results are stored, so a video which couldn't be read, or a run on a machine without exiftool, is tried again on the next run.
+Metadata is kept separately for each metadata backend, as the native reader and exiftool don't read exactly the same values from a video.
+Watermark results are stored as the processed gps and file info dataframes, as reading the watermarks again is what takes the time.
+They are kept separately for each dashcam type, OCR engine, frame sampling, batch size and deduplication setting.
+"""
+
+MANIFEST_FILE = "ingest_manifest.sqlite" #name of the database kept in the output directory
+PARTIAL_HASH_BYTES = 1048576 #number of bytes read from each end of a video to hash it
+
+class StoredClip:
+
+	"""Stands in for a Video (video.py) whose watermarks were read on an earlier run, holding the dataframes stored in the manifest"""
+
+	def __init__(self, video_name:str, gps_df:"DataFrame", file_info_df:"DataFrame"):
+		self.video_name = video_name
+		self.gps_df = gps_df
+		self.file_info_df = file_info_df
+
+class IngestManifest:
+
+	"""
+	Stores the result of processing each video, keyed by the pipeline that processed it ("metadata" or "ocr", followed by the backend or the settings the watermarks were read with) and the video's path.
+	A stored result is only used if the video's size, modification time and partial hash are the same as when it was stored.
+	"""
+
+	def __init__(self, database_file:str):
+		self.connection = connect(database_file)
+		self.connection.execute("""CREATE TABLE IF NOT EXISTS clips (
+			pipeline TEXT, path TEXT, size INTEGER, mtime INTEGER, partial_hash TEXT, result BLOB,
+			PRIMARY KEY (pipeline, path))""")
+		self.identities = {}
+		self.reused = 0
+		self.processed = 0
+
+	def identify(self, file_path:str) -> tuple:
+		#Returns the size, modification time in nanoseconds, and partial hash of a file. These are worked out once per run for each file.
+		if file_path not in self.identities:
+			file_stat = stat(file_path)
+			file_hash = blake2b(str(file_stat.st_size).encode(), digest_size = 16)
+			with open(file_path, "rb") as video_file:
+				file_hash.update(video_file.read(PARTIAL_HASH_BYTES))
+				if file_stat.st_size > 2 * PARTIAL_HASH_BYTES:
+					video_file.seek(-PARTIAL_HASH_BYTES, 2)
+				file_hash.update(video_file.read(PARTIAL_HASH_BYTES))
+			self.identities[file_path] = (file_stat.st_size, file_stat.st_mtime_ns, file_hash.hexdigest())
+		return self.identities[file_path]
+
+	def find_stored_results(self, pipeline:str, video_name_list:list, input_directory:str) -> tuple:
+		"""
+		Takes in the name of a pipeline, a list of video names and the input directory
+		Returns a dictionary of the stored result for each video which hasn't changed since it was stored, and a list of the videos which need to be processed
+		"""
+		stored_results = {}
+		new_video_names = []
+		for video_name in video_name_list:
+			file_path = f"{input_directory}\\{video_name}"
+			row = self.connection.execute("SELECT size, mtime, partial_hash, result FROM clips WHERE pipeline = ? AND path = ?", (pipeline, file_path)).fetchone()
+			try:
+				if row is not None and tuple(row[:3]) == self.identify(file_path):
+					stored_results[video_name] = loads(decompress(row[3]))
+					continue
+			except Exception as error:
+				print(f"Could not read the stored result for {video_name} ({error}), so it will be processed again")
+			new_video_names.append(video_name)
+		self.reused += len(stored_results)
+		self.processed += len(new_video_names)
+		return stored_results, new_video_names
+
+	def store_results(self, pipeline:str, results:dict, input_directory:str):
+		#Stores the result of processing each video in a dictionary of video names and results, replacing any result stored for an earlier version of the video. Results which are None are not stored
+		rows = []
+		for video_name, result in results.items():
+			if result is None:
+				continue
+			file_path = f"{input_directory}\\{video_name}"
+			rows.append((pipeline, file_path) + self.identify(file_path) + (compress(dumps(result, protocol = HIGHEST_PROTOCOL)),))
+		with self.connection:
+			self.connection.executemany("INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+	def report(self) -> str:
+		#Returns how many results were reused from the manifest and how many were made this run. Each video has a result for each of the metadata and OCR options that are selected
+		return f"Reused {self.reused} stored results, and made {self.processed} new results for videos which were added or changed"
+
+	def close(self):
+		self.connection.close()
+
+def open_ingest_manifest(output_directory:str) -> IngestManifest:
+	#Opens the manifest in the output directory, creating it if this is the first run
+	return IngestManifest(f"{output_directory}\\{MANIFEST_FILE}")
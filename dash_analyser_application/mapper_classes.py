@@ -1,7 +1,11 @@
-from folium import TileLayer, Map, Marker, Icon, LayerControl, ColorLine, Popup, IFrame, Circle, FeatureGroup
-from folium.vector_layers import PolyLine
+from folium import TileLayer, Map, Marker, Icon, LayerControl, Circle, FeatureGroup
+from folium.vector_layers import PolyLine, Polygon
 from folium.plugins import MeasureControl, Draw
 from pandas import DataFrame
+from dash_analyser_application.speed_colouring import quantise_speeds, make_bin_colours, merge_speed_runs, find_speed_runs, SPEED_COLOUR_BINS
+from dash_analyser_application.geometry_encoding import ROUTELINE_WEIGHT
+from dash_analyser_application.popup_tables import PopupTable, LazyPopup
+from dash_analyser_application.geofence import get_points
 
 class RouteLineMaker:
 
@@ -10,41 +14,86 @@ class RouteLineMaker:
 	Plots a single-coloured routeline on a folium map using those coordinates.
 	Plots a routeline which is coloured based on the speed of the vehicle.
 	Adds a marker to the start of the routeline with a popup containing information about the video file that is being plotted.
+	If a TrackSimplifier (track_simplification.py) is given, the track is simplified before it is plotted. The speed line adds the points where the colour changes to the routeline's simplified track,
+	so every point the routeline kept is kept by the speed line as well, and the simplifier's report counts the track once.
+	If an EncodedTrackTable (geometry_encoding.py) is given, the video's track is stored once in the table and both routelines are drawn from it.
+	The points are an array of (latitude, longitude) pairs made from the dataframe's coordinate columns, which are only turned into lists where folium needs them.
 	"""
 
-	def __init__(self, gps_df: DataFrame, routeline_group: FeatureGroup, start_marker_group: FeatureGroup, colour_line_group: FeatureGroup):
+	def __init__(self, gps_df: DataFrame, routeline_group: FeatureGroup, start_marker_group: FeatureGroup, colour_line_group: FeatureGroup, simplifier: "TrackSimplifier" = None, track_table: "EncodedTrackTable" = None):
 
-		self.points = gps_df["Latitude, Longitude"].to_list()
-		self.speed = gps_df["Speed"].to_list()
+		self.points = get_points(gps_df)
+		self.speed = gps_df["Speed"].to_numpy()
 		self.routeline_group = routeline_group
 		self.start_marker_group = start_marker_group
 		self.colour_line_group = colour_line_group
+		self.simplifier = simplifier
+		self.track_table = track_table
+		self.track_id = None
+		self.kept_indices = None #indices of the points kept by simplifying the track, which both routelines are drawn with
+		self.track_key = object() #identifies this track in the simplifier's report
+
+	def simplify_track(self, speed_bins=None):
+		#Returns the points the track is drawn with. With a simplifier, the track's kept points are updated to include the points needed for the speed bins, if any are given
+		if self.simplifier is None:
+			return self.points
+		self.kept_indices = self.simplifier.simplify_track(self.points, speed_bins, self.kept_indices, self.track_key)
+		return self.points[self.kept_indices]
 
 	def make_routeline(self, routeline_colour: str):
 		"""		
 		Take in a routeline colour (either blue for extracted metadata or purple for watermark data), 
 		and plot the coordinates stored by the class instance on the map
 		"""
-		PolyLine(locations=self.points, color = routeline_colour).add_to(self.routeline_group)
-
-	def make_routeline_with_speed_colouring(self, colour_map: "branca linear colormap"):
+		points = self.simplify_track()
+		if self.track_table is None:
+			PolyLine(locations=points.tolist(), color = routeline_colour).add_to(self.routeline_group)
+		else:
+			self.track_id = self.track_table.set_track(self.track_id, points)
+			self.track_table.add_line(self.routeline_group, routeline_colour, ROUTELINE_WEIGHT, [[self.track_id]])
+
+	def make_routeline_with_speed_colouring(self, colour_map: "branca linear colormap", bins: int = SPEED_COLOUR_BINS):
 		"""		
 		Take in a branca linear color map, and use this to plot an additional routeline which uses the speeds stored by the class instance
-		as a colour scale
+		as a colour scale. The speeds are split into the given number of bins along the colour map, and consecutive segments in the same bin
+		are merged, so one PolyLine is drawn per colour rather than one line per pair of points (see speed_colouring.py)
+		With a track table, the speed line's points replace the stored track, and the routeline drawn from it. These are the routeline's points with any points where the colour changes added
 		"""
-		ColorLine(positions=self.points, colors=self.speed, colormap=colour_map, weight=4.5).add_to(self.colour_line_group)
-
-	def make_start_marker(self, popup: Popup):
+		speed_bins = quantise_speeds(self.speed, colour_map, bins)
+		points = self.simplify_track(speed_bins)
+		if self.simplifier is not None:
+			speed_bins = speed_bins[self.kept_indices]
+		bin_colours = make_bin_colours(colour_map, bins)
+		if self.track_table is None:
+			for speed_bin, runs in merge_speed_runs(points, speed_bins).items():
+				PolyLine(locations=[run.tolist() for run in runs], color=bin_colours[speed_bin], weight=4.5).add_to(self.colour_line_group)
+		else:
+			self.track_id = self.track_table.set_track(self.track_id, points)
+			for speed_bin, runs in find_speed_runs(speed_bins).items():
+				self.track_table.add_line(self.colour_line_group, bin_colours[speed_bin], 4.5, [[self.track_id, start, end] for start, end in runs])
+
+	def make_start_marker(self, popup_table: PopupTable, popup_id: int):
 		"""		
-		Take in a popup for a start marker, which contains an HTML table of file details, and add it to a start marker for the routelines.
+		Take in the map's PopupTable and the id of the row holding the file details, and add a start marker for the routelines whose popup is rendered from that row.
+		"""
+		start_marker = Marker(location=self.points[0].tolist(), tooltip=f"Start of route line. Click to see file details.", icon=Icon(icon="plus-circle", prefix="fa")).add_to(self.start_marker_group)
+		LazyPopup(popup_table, popup_id).add_to(start_marker)
+
+	def add_start_marker_to_layer(self, marker_layer: "StartMarkerLayer", popup_id: int):
 		"""
-		Marker(location=self.points[0], tooltip=f"Start of route line. Click to see file details.", popup=popup, icon=Icon(icon="plus-circle", prefix="fa")).add_to(self.start_marker_group)
+		Take in a StartMarkerLayer (marker_layers.py) and the id of the PopupTable row holding the file details, and add a row for the start of the routelines to the layer.
+		Used instead of make_start_marker() for maps with a large number of videos.
+		"""
+		marker_layer.add_marker(self.points[0], popup_id)
 
 class StartMarkerPopup:
 	"""
 	Parses the file information dataframe for a single video file into its separate components
-	Generates the popup used by the RouteLineMaker class for its start marker using the parsed file information.
+	Adds the parsed file information to the map's PopupTable, which the RouteLineMaker class's start marker popup is rendered from.
 	"""
+
+	detail_labels = ["Name:", "File Type", "File Size", "MIME Type", "Video Length", "Average Speed:", "Highest Speed:", "File Create Date and Time:"]
+
 	def __init__(self, file_info_df):
 		self.file_name = file_info_df["SourceFile"].iloc[0]
 		self.file_type = file_info_df["FileType"].iloc[0]
@@ -54,171 +103,104 @@ class StartMarkerPopup:
 		self.average_speed = f'{file_info_df["AverageSpeed"].iloc[0]} {file_info_df["SpeedRef"].iloc[0]}'
 		self.max_speed = f'{file_info_df["MaxSpeed"].iloc[0]} {file_info_df["SpeedRef"].iloc[0]}'
 		self.file_create_date = file_info_df["CreateDate"].iloc[0]
-	
-	def start_marker_popup_html(self) -> Popup:
-		#Defines the HTML file details table
-		self.popup_html = """<html  lang="en">
-			<head>
-			<meta  charset="UTF-8">
-	<style> 
-	table {
-		font-family:  arial,  sans-serif; 
-		border-collapse:  collapse; 
-		width:  100%;
-	}
-
-	td,  th  {
-		border:  1px  solid  #dddddd; 
-		text-align:  left;  
-		padding:  8px;
-	}
-	 
-
-
-	tr:nth-child(even) { 
-		background-color:  #dddddd;
-	}
-	</style>
-	 
-			</head>
-			<body>
-			 
-
-			<h1>File Information</h1>
-			<table style ="width:100%">
-				<tr>	
-					<th> File  Attribute(s)</th>
-					<th> Value(s)</th>
-				</tr>	
-				<tr>	
-					<td>	Name:  </td>
-					<td> """ + self.file_name + """ </td>
-				</tr>	
-				<tr>	
-					<td>	File Type  </td>
-					<td> """ + self.file_type + """	 </td>
-				</tr>	
-				<tr>	
-					<td>	File Size  </td>
-					<td>	""" + self.file_size + """  </td>
-				</tr>	
-				<tr>	
-					<td>	MIME Type  </td>
-					<td>	""" + self.MIMEType + """   </td>
-				</tr>	
-				<tr>	
-					<td>	Video Length  </td>
-					<td>	"""+ self.duration + """  </td>
-				</tr>
-				</tr>	
-				<tr>	
-					<td>	Average  Speed:	</td>
-					<td>	""" + str(self.average_speed) + """  </td>
-				</tr>	
-				<tr>	
-					<td>	Highest  Speed:	</td>
-					<td>	""" + str(self.max_speed) + """  </td>
-				</tr>
-				<tr>		 
-					<td>  File Create Date and Time:	</td>
-					<td>  """ + str(self.file_create_date) + """  </td>
-				</tr>
-			</tr>
-		
-		</table>
-
-
-		</body>
-		</html>  
-		
-		"""
-		iframe=IFrame(html=self.popup_html, width=500, height=300)
-		popup=Popup(iframe, max_width=2650)
 
-		return popup
+	def file_details(self) -> list:
+		#Returns the file details in the same order as detail_labels
+		return [self.file_name, self.file_type, self.file_size, self.MIMEType, self.duration, self.average_speed, self.max_speed, self.file_create_date]
+	
+	def add_to_popup_table(self, popup_table: "PopupTable") -> int:
+		#Adds the file details to the map's PopupTable (popup_tables.py) and returns the popup's id, which the start marker's popup is rendered from when it is opened
+		return popup_table.add_row("File Information", ["File Attribute(s)", "Value(s)"], self.detail_labels, self.file_details())
 
 class ExclusionZone:
 
 	"""
 	This class stores information about an exclusion zone and adds graphical elements to a folium map representing the exclusion zone.
-	The information stored is the central point of the zone, and the radius of the zone in meters and kilometers
+	The information stored is the central point of the zone, the radius of the zone in meters and kilometers, and optionally a name for the zone
 	"""
 
-	def __init__(self, location, radius):
+	def __init__(self, location, radius, name=None):
 
 		self.radius_km = radius
 		self.location = location
 		self.radius_metres = radius * 1000
-		self.timeline_label = f"Present in zone:<br>-Radius {self.radius_km}km<br>-At {self.location}"
+		self.name = name
+		if name:
+			self.timeline_label = f"Present in zone:<br>-{name}<br>-Radius {self.radius_km}km<br>-At {self.location}"
+		else:
+			self.timeline_label = f"Present in zone:<br>-Radius {self.radius_km}km<br>-At {self.location}"
 
-	def add_to_map(self, group:FeatureGroup):
+	def add_to_map(self, group:FeatureGroup, popup_table:PopupTable):
 		"""
-		Sets the group of the exclusion zone to the provided feature group for the folium map
+		Sets the group of the exclusion zone to the provided feature group for the folium map, and the table its popup is stored in to the map's PopupTable
 		Calls functions to make the table for the exclusion zone popup and add a circle of the given radius 
 		and centred at the given coordinates, which is then placed on a map.
 		"""
 		self.group = group
+		self.popup_table = popup_table
 		self.make_exclusion_zone_popup()
 		self.make_exclusion_zone_radius()
 
 	def make_exclusion_zone_popup(self):
-		#Makes a popup containing the exclusion zone's information. This popup is added to the marker element at the ceentre of the zone.
-		html= """<html lang="en">
-		<html  lang="en">
-		<head>
-		<style> table {
-			font-family:  arial, sans-serif; 
-			border-collapse:  collapse; 
-			width:  100%;
-		}
-
-		td,  th  {
-			border:  1px  solid  #dddddd; 
-			text-align:  left;  
-			padding:  8px;
-		}
-
-		tr:nth-child(even) { 
-			background-color:  #dddddd;
-		}
-		</style>
-		</head>
-		<body>
-			<p>Center of Exclusion Zone</p>
-			<table  style  ="width:100%">
-		 	<tr>
-				<th>  Zone  Details:</th>
-				<th>  Value(s)</th>
-			</tr>
-			<tr>
-				<td>Coordinates:  </td>
-				<td>"""  +  str(self.location)  +  """  </td>
-			</tr>
-			<tr>
-				<td>Radius  (Kilometers):  </td>
-				<td>""" + str(self.radius_km) + """ </td>
-			</tr>
-		</table>
-
-
-	</body>
-	</html>
-	"""
-		self.iframe=IFrame(html=html, width=500, height=200)
+		#Adds the exclusion zone's information to the map's PopupTable (popup_tables.py). The popup is added to the circle showing the zone.
+		self.popup_id = self.popup_table.add_row("Center of Exclusion Zone", ["Zone Details:", "Value(s)"], ["Coordinates:", "Radius (Kilometers):"], [self.location, self.radius_km])
 
 	def make_exclusion_zone_radius(self):
 		#Adds a circle object to the map
-		Circle(radius=self.radius_metres, location=self.location, tooltip="Exclusion Zone", color="red", fill=True, fill_colour="red", popup=Popup(self.iframe)).add_to(self.group)
+		circle = Circle(radius=self.radius_metres, location=self.location, tooltip=self.name or "Exclusion Zone", color="red", fill=True, fill_colour="red").add_to(self.group)
+		LazyPopup(self.popup_table, self.popup_id).add_to(circle)
+
+
+class PolygonExclusionZone:
+
+	"""
+	This class stores information about an exclusion zone drawn as one or more polygons, such as the shapes exported by the map's draw tool,
+	and adds graphical elements to a folium map representing the exclusion zone.
+	Each polygon is a list of rings of (latitude, longitude) vertices, where the first ring is the outline of the polygon and any others are holes in it.
+	"""
+
+	def __init__(self, polygons, name=None):
+
+		self.polygons = polygons
+		self.name = name
+		outline = [vertex for polygon in polygons for vertex in polygon[0]]
+		self.location = (round(sum(vertex[0] for vertex in outline) / len(outline), 6), round(sum(vertex[1] for vertex in outline) / len(outline), 6))
+		self.vertex_count = sum(len(ring) for polygon in polygons for ring in polygon)
+		if name:
+			self.timeline_label = f"Present in zone:<br>-{name}<br>-Polygon with {self.vertex_count} points<br>-Around {self.location}"
+		else:
+			self.timeline_label = f"Present in zone:<br>-Polygon with {self.vertex_count} points<br>-Around {self.location}"
+
+	def add_to_map(self, group:FeatureGroup, popup_table:PopupTable):
+		"""
+		Sets the group of the exclusion zone to the provided feature group for the folium map, and the table its popup is stored in to the map's PopupTable
+		Calls functions to make the table for the exclusion zone popup and add the zone's polygons, which are then placed on a map.
+		"""
+		self.group = group
+		self.popup_table = popup_table
+		self.make_exclusion_zone_popup()
+		self.make_exclusion_zone_polygons()
+
+	def make_exclusion_zone_popup(self):
+		#Adds the exclusion zone's information to the map's PopupTable (popup_tables.py). The popup is shared by each of the zone's polygons.
+		self.popup_id = self.popup_table.add_row("Exclusion Zone", ["Zone Details:", "Value(s)"], ["Name:", "Centre of Outline:", "Number of Polygons:"], [self.name or "Unnamed", self.location, len(self.polygons)])
+
+	def make_exclusion_zone_polygons(self):
+		#Adds a polygon object to the map for each polygon in the zone, with any holes cut out of it
+		for polygon in self.polygons:
+			zone_polygon = Polygon(locations=[list(ring) for ring in polygon], tooltip=self.name or "Exclusion Zone", color="red", fill=True, fill_color="red").add_to(self.group)
+			LazyPopup(self.popup_table, self.popup_id).add_to(zone_polygon)
 
 
 class Mappy:
 
 	"""Class which stores the folium map canvas, adds tilelayers, adds draw options, and adds featuregroups"""
 
-	def __init__(self, average_point):
+	def __init__(self, average_point, prefer_canvas=False):
 
 		self.canvas = Map(location=average_point, 
-						  zoom_start=12)
+						  zoom_start=12,
+						  prefer_canvas=prefer_canvas)
 
 	def add_tilelayers(self):
 		#Adds different map styles which can bee freely switched between by the user
@@ -226,6 +208,10 @@ class Mappy:
 		TileLayer("Stamen Terrain").add_to(self.canvas)
 		TileLayer("Stamen Toner").add_to(self.canvas)
 
+	def add_popup_table(self):
+		#Adds the table every popup on the map is rendered from (popup_tables.py), along with the popups' shared style sheet
+		self.popup_table = PopupTable().add_to(self.canvas)
+
 	def add_draw_options(self):
 		#Adds draw options for the user
 		Draw(export=True, 
@@ -1,32 +1,56 @@
 from branca.colormap import linear
-from dash_analyser_application.mapper_classes import ExclusionZone, Mappy, StartMarkerPopup, RouteLineMaker
+from dash_analyser_application.mapper_classes import ExclusionZone, PolygonExclusionZone, Mappy, StartMarkerPopup, RouteLineMaker
 from folium import Popup, Html, IFrame, Marker, Icon, FeatureGroup
-from altair import Chart, data_transformers
+from altair import Chart, NamedData, X, Scale, selection_interval, vconcat
 from folium.features import VegaLite
-from pandas import DataFrame
-from geopy import distance
+from pandas import DataFrame, concat
+from json import dumps
+from dash_analyser_application.track_simplification import TrackSimplifier
+from dash_analyser_application.geometry_encoding import EncodedTrackTable, make_track_table
+from dash_analyser_application.marker_layers import StartMarkerLayer
+from dash_analyser_application.popup_tables import PopupTable
+from dash_analyser_application.speed_downsampling import downsample_speed_data, get_data_sources
+from dash_analyser_application.shared_outputs import SharedOutputs
+from dash_analyser_application.geofence import test_points_against_zones, make_zone_index, ZoneIndex
 from plotly.express import timeline
 
 
-def make_exclusion_zone(location:tuple, radius:float) -> ExclusionZone:
-	#Makes an instance of the ExclusionZone class with the given location and radius
-	exclusion_zone=ExclusionZone(location=location, radius=radius)
+def make_exclusion_zone(location:tuple, radius:float, name:str=None) -> ExclusionZone:
+	#Makes an instance of the ExclusionZone class with the given location, radius and optional name
+	exclusion_zone=ExclusionZone(location=location, radius=radius, name=name)
 	return exclusion_zone
 
-def initialise_map(video_metadata:DataFrame) -> Mappy:
-	#Initialises an instance of the Mappy class, which manages a folium map
-	mappy = Mappy(video_metadata)
+def make_polygon_exclusion_zone(polygons:list, name:str=None) -> PolygonExclusionZone:
+	#Makes an instance of the PolygonExclusionZone class with the given polygons and optional name
+	exclusion_zone=PolygonExclusionZone(polygons=polygons, name=name)
+	return exclusion_zone
+
+def make_exclusion_zone_index(exclusion_zones:list) -> ZoneIndex:
+	#Builds a spatial index (geofence.py) over the ExclusionZone instances. This is done once per run, and the index is shared by every video.
+	return make_zone_index(exclusion_zones)
+
+def initialise_map(video_metadata:DataFrame, prefer_canvas:bool=False) -> Mappy:
+	#Initialises an instance of the Mappy class, which manages a folium map. Maps with a large number of videos are drawn on a canvas.
+	mappy = Mappy(video_metadata, prefer_canvas)
 	mappy.add_tilelayers()
+	mappy.add_popup_table()
 	mappy.add_draw_options()
 	mappy.generate_feature_groups()
 	mappy.add_layer_control()
 	mappy.add_measure_control()
 	return mappy
 
-def add_exclusion_zones_to_map(exclusion_group:FeatureGroup, exclusion_zones:list):
-	#Calls the add_to_map() method for each ExclusionZone instance stored in the exclusion_zones list
+def add_track_table_to_map(mappy:Mappy) -> EncodedTrackTable:
+	#Adds a table of compactly encoded tracks (geometry_encoding.py) to the map, which every route line is drawn from. Returns None if compact encoding is turned off.
+	track_table = make_track_table()
+	if track_table is not None:
+		track_table.add_to(mappy.canvas)
+	return track_table
+
+def add_exclusion_zones_to_map(exclusion_group:FeatureGroup, exclusion_zones:list, popup_table:PopupTable):
+	#Calls the add_to_map() method for each ExclusionZone or PolygonExclusionZone instance stored in the exclusion_zones list, storing their popups in the map's PopupTable
 	for zone in exclusion_zones:
-		zone.add_to_map(exclusion_group)
+		zone.add_to_map(exclusion_group, popup_table)
 
 def generate_speed_colour_map(speed:DataFrame) -> linear:
 	#Takes in a dataframe containing a large list of speed, and uses this to generate a branca linear colour map.
@@ -34,38 +58,80 @@ def generate_speed_colour_map(speed:DataFrame) -> linear:
 	colour_map.caption="Speed colour scale: "
 	return colour_map
 
-def make_speed_chart(speed_data:DataFrame) -> Chart:
-	#Takes in a dataframe of speed and datetime data, and returns an altair Chart of that data
-	data_transformers.disable_max_rows()
-	speed_chart=Chart(speed_data
+def make_speed_chart(speed_data:DataFrame, detail_dataset:str=None) -> Chart:
+	"""
+	Takes in a dataframe of speed and datetime data, and returns an altair Chart of that data.
+	Each DataSource's line is downsampled (speed_downsampling.py), so the chart stays the same size however many videos there are.
+	If the name of the dataset registered by the full resolution sidecar script is given, a detail chart is added below the overview, which shows every point in the range brushed on the overview.
+	The dataset is only filled in by pages which load the sidecar and draw the chart with it (see shared_outputs.py).
+	The sidecar stores each DataSource as a number (see save_speed_chart_data()), which is turned back into its name by the chart.
+	"""
+	speed_chart=Chart(downsample_speed_data(speed_data)
 					).mark_line(
 						point=False
 					).encode(
 						x="DateTime", 
 						y="Speed",
-						color="DataSource"
+						color="DataSource:N"
 					).properties(
 						height=500, 
 						width=600
-					).interactive()
-	return speed_chart
+					)
+	if detail_dataset is None:
+		return speed_chart.interactive()
+	brush=selection_interval(encodings=["x"], empty="none")
+	detail_chart=Chart(NamedData(name=detail_dataset)
+					).transform_calculate(
+						DataSource=f"{dumps(get_data_sources(speed_data))}[datum.Source]"
+					).mark_line(
+						point=False
+					).encode(
+						x=X("DateTime:T", scale=Scale(domain=brush)), 
+						y="Speed:Q",
+						color="DataSource:N"
+					).transform_filter(
+						brush
+					).properties(
+						height=300, 
+						width=600, 
+						title="Full resolution speed for the range selected above"
+					)
+	return vconcat(speed_chart.properties(height=200).add_selection(brush), detail_chart)
 
-def add_routeline_to_map(gps_df:DataFrame, routeline_group:FeatureGroup, start_marker_group:FeatureGroup, colour_line_group:FeatureGroup)->RouteLineMaker:
+def add_routeline_to_map(gps_df:DataFrame, routeline_group:FeatureGroup, start_marker_group:FeatureGroup, colour_line_group:FeatureGroup, simplifier:TrackSimplifier=None, track_table:EncodedTrackTable=None)->RouteLineMaker:
 	"""	
-	Takes in a dataframe containing GPS and temporal data, as well as featuregroups for a routeline, start marker, and speed line.
+	Takes in a dataframe containing GPS and temporal data, as well as featuregroups for a routeline, start marker, and speed line, and optionally a TrackSimplifier and an EncodedTrackTable.
 	Uses this data to generate an instance of the RouteLineMaker class, and returns the instance
 	"""
-	routeliner = RouteLineMaker(gps_df, routeline_group, start_marker_group, colour_line_group)
+	routeliner = RouteLineMaker(gps_df, routeline_group, start_marker_group, colour_line_group, simplifier, track_table)
 	return routeliner
 
-def add_start_marker_to_map(file_info_df:DataFrame, routeliner:RouteLineMaker):
+def add_start_marker_layer_to_map(start_marker_group:FeatureGroup, marker_colour:str, popup_table:PopupTable) -> StartMarkerLayer:
+	#Adds a StartMarkerLayer (marker_layers.py) to a start marker feature group, which draws every start marker in the group as a canvas circle marker
+	return StartMarkerLayer(popup_table, marker_colour).add_to(start_marker_group)
+
+def add_start_marker_to_map(file_info_df:DataFrame, routeliner:RouteLineMaker, popup_table:PopupTable, marker_layer:StartMarkerLayer=None):
 	"""	
-	Takes in a dataframe containing file information for a video and an instance of the RouteLineMaker class associated with that file.
-	Uses the file information dataframe to make a popup for a start marker. Calls the make_start_marker() method for the RouteLineMaker instance to add
-	the popup to a start marker
+	Takes in a dataframe containing file information for a video, an instance of the RouteLineMaker class associated with that file, and the map's PopupTable.
+	Adds the file information to the PopupTable, which the start marker's popup is rendered from when it's opened. Calls the make_start_marker() method
+	for the RouteLineMaker instance to add a start marker, or adds the start marker to the StartMarkerLayer if one is given.
 	"""
-	marker_popup = StartMarkerPopup(file_info_df).start_marker_popup_html()
-	routeliner.make_start_marker(marker_popup)
+	popup_id = StartMarkerPopup(file_info_df).add_to_popup_table(popup_table)
+	if marker_layer is not None:
+		routeliner.add_start_marker_to_layer(marker_layer, popup_id)
+	else:
+		routeliner.make_start_marker(popup_table, popup_id)
+
+def add_trip_start_marker_to_map(trip:"Trip", routeliner:RouteLineMaker, popup_table:PopupTable, marker_layer:StartMarkerLayer=None):
+	"""
+	Takes in a Trip (trip_segmentation.py), the RouteLineMaker instance for the trip's route, and the map's PopupTable.
+	Adds the trip's statistics and the details of each of its clips to the PopupTable, and adds a start marker for the trip in the same way as add_start_marker_to_map()
+	"""
+	popup_id = trip.add_to_popup_table(popup_table)
+	if marker_layer is not None:
+		routeliner.add_start_marker_to_layer(marker_layer, popup_id)
+	else:
+		routeliner.make_start_marker(popup_table, popup_id)
 
 def add_speedline_to_map(routeliner:RouteLineMaker, colour_map:linear):
 	"""
@@ -91,41 +157,31 @@ def make_timeline_marker(location:tuple, popup:Popup) -> Marker:
 	timeline_marker = Marker(location = location, popup = popup, icon=Icon(icon="hourglass-start", prefix="fa", color="purple"))
 	return timeline_marker
 
-def add_speed_chart_to_map(speed_chart:Chart, final_point:tuple, map_feature_group:FeatureGroup):
+def add_speed_chart_to_map(speed_chart:Chart, final_point:tuple, map_feature_group:FeatureGroup, shared_outputs:SharedOutputs=None):
 	"""
 	Takes in an altair chart which will be a speed chart, the final point represented in the dashcam footage, and the speed chart marker FeatureGroup
 	Converts the speed chart to a folium Popup using VegaLite
 	Adds the speed chart Popup to the speed chart marker, which is then added to the FeatureGroup
+	If the outputs share their assets (shared_outputs.py), the popup draws the chart saved by save_vega_chart() instead of holding its own copy
 	"""
+	if shared_outputs is not None:
+		marker = Marker(location=final_point, icon=Icon(icon="road" ,color="red")).add_to(map_feature_group)
+		shared_outputs.make_chart_popup("vega", "speed_chart", 750, 650).add_to(marker)
+		return
 	speed_chart_popup=Popup()
 	VegaLite(speed_chart, height="100%", width="100%").add_to(speed_chart_popup)
 	marker = Marker(location=final_point, popup=speed_chart_popup, icon=Icon(icon="road" ,color="red")).add_to(map_feature_group)
 
-def test_exclusion_zones(gps_df:DataFrame, exclusion_zones: list) -> DataFrame:
+def test_exclusion_zones(gps_df:DataFrame, exclusion_zones: list, zone_index:ZoneIndex=None) -> DataFrame:
 	"""
-	Takes in a dataframe containing GPS data and a list of ExclusionZone instances
-	Checks every coordinate in the dataframe for whether it is present in any ExclusionZone
-	If a coordinate is in an ExclusionZone, it is noted in a new column in the dataframe
+	Takes in a dataframe containing GPS data, a list of ExclusionZone instances, and optionally a ZoneIndex already built over those zones
+	Checks every coordinate in the dataframe against the zones whose bounding box it falls in, all at once (see geofence.py)
+	Whether each coordinate is in each ExclusionZone is noted in a new column per zone in the dataframe
 	The dataframe is returned
 	"""
-	for i, exclusion_zone in enumerate(exclusion_zones):
-		for test_point in gps_df["Latitude, Longitude"]:
-			dis = distance.distance(exclusion_zone.location, test_point).km
-			if dis <= exclusion_zone.radius_km:
-				gps_df[f"In Exclusion Zone {i+1}"] = True
-			else:
-				gps_df[f"In Exclusion Zone {i+1}"] = False
-
-	return gps_df
-
-def add_exclusion_zones_to_file_info(gps_df:DataFrame, file_info_df:DataFrame, exclusion_zones:list) -> DataFrame:
-	"""
-	Takes in a GPS dataframe, a file info dataframe, and a list of ExclusionZones. Checks whether any coordinates are in any of the ExclusionZones,
-	and if they are it is noted in the file info dataframe. The ammended file info dataframe is then returned.
-	"""
-	exclusion_zone_list=[exclusion_zone.timeline_label for i, exclusion_zone in enumerate(exclusion_zones) if gps_df[f"In Exclusion Zone {i+1}"].any()]
-	if exclusion_zone_list == []:
-		file_info_df["Present in Exclusion Zones"] = "Not in exclusion zones"
-	else:
-		file_info_df["Present in Exclusion Zones"] = ",<br><br>".join(exclusion_zone_list)
-	return file_info_df
\ No newline at end of file
+	zone_columns = [f"In Exclusion Zone {i+1}" for i in range(len(exclusion_zones))]
+	if zone_index is None:
+		zone_index = make_exclusion_zone_index(exclusion_zones)
+	zone_mask = test_points_against_zones(gps_df, zone_index)
+	gps_df = gps_df.drop(columns = zone_columns, errors = "ignore")
+	return concat([gps_df, DataFrame(data = zone_mask, columns = zone_columns, index = gps_df.index)], axis = 1)
\ No newline at end of file
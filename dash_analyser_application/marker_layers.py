@@ -0,0 +1,53 @@
+from json import dumps
+from branca.element import MacroElement
+from jinja2 import Template
+from dash_analyser_application.geometry_encoding import dumps_for_template
+
+"""
+Draws the start markers of a large number of videos without slowing the map down.
+Rather than one Marker per video, each feature group's start markers are stored as one JSON table of coordinates and popup ids.
+The markers are drawn as circle markers on the map's canvas, and a marker's popup is only rendered from the map's PopupTable (popup_tables.py) when it is clicked.
+"""
+
+HIGH_VOLUME_MARKER_COUNT = 200 #maps with at least this many videos draw start markers as canvas circle markers, and are drawn on a canvas rather than as separate page elements
+START_MARKER_RADIUS = 6 #radius in pixels of each circle marker
+
+class StartMarkerLayer(MacroElement):
+
+	"""
+	Stores the start point and popup id of every video in a feature group, and draws them as canvas circle markers.
+	Each row of the table is [latitude, longitude, popup id].
+	"""
+
+	_template = Template("""
+		{% macro script(this, kwargs) %}
+		{{ this.rows_json() }}.forEach(function (row) {
+			L.circleMarker([row[0], row[1]], {radius: {{ this.radius }}, color: {{ this.colour_json() }}, fillOpacity: 0.8})
+				.bindTooltip("Start of route line. Click to see file details.")
+				.bindPopup(function () { return {{ this.popup_table.get_name() }}(row[2]); }, {maxWidth: 500})
+				.addTo({{ this._parent.get_name() }});
+		});
+		{% endmacro %}
+		""")
+
+	def __init__(self, popup_table:"PopupTable", colour:str, radius:int=START_MARKER_RADIUS):
+		super().__init__()
+		self._name = "StartMarkerLayer"
+		self.popup_table = popup_table
+		self.colour = colour
+		self.radius = radius
+		self.rows = []
+
+	def colour_json(self) -> str:
+		return dumps(self.colour)
+
+	def rows_json(self) -> str:
+		return dumps_for_template(self.rows)
+
+	def add_marker(self, location:tuple, popup_id:int):
+		#Adds a start marker at the given (latitude, longitude), whose popup is the row of the PopupTable with the given id
+		self.rows.append([float(location[0]), float(location[1]), popup_id])
+
+def is_high_volume(video_count:int, threshold:int=HIGH_VOLUME_MARKER_COUNT) -> bool:
+	#Returns whether a map with the given number of videos should use the high volume marker layers
+	return video_count >= threshold
@@ -1,51 +1,65 @@
-from os import system, remove
-from csv import writer, reader
+from json import loads, JSONDecodeError
 from abc import ABC, abstractmethod
+from dash_analyser_application.exiftool_session import ExifToolPool
+from dash_analyser_application.mp4_gps_parser import read_mp4_metadata
 
 class MetadataExtractor(ABC):
 	"""An abstract class defining classes which have a metadata extraction method"""
 	def __init__(self, video: str, temp_directory: str):
 		self.video = video
 		self.temp_directory = temp_directory
+		self.backend = None #set by extract_metadata to the backend which read the metadata, "native" or "exiftool"
 
 	@abstractmethod
-	def extract_metadata(self, input_directory:str):
+	def extract_metadata(self, input_directory:str, exiftool:ExifToolPool):
 		#An abstract method representing a method to extract metadata using exiftool
 		pass
 
-class GPSMetadataExtractor(MetadataExtractor):
+class JSONMetadataExtractor(MetadataExtractor):
 
-	"""Handles the gps metadata for a video"""
-	
-	def extract_metadata(self, input_directory:str):
-		system(f'exiftool  -ee -csv -p "$GPSSpeed, $GPSSpeedRef, $GPSLatitude, $GPSLongitude" -r -n {input_directory}\\{self.video} >> {self.temp_directory}\\{self.video[0:-4]}_gpsdata.csv')
-		print(f"gps data done for {self.video}")
-		self.trim_data()
+	"""
+	Handles the gps, temporal, and file information metadata for a video in a single exiftool call.
+	Exiftool's JSON output is parsed in memory and stored as a dictionary, rather than being written to temp csv files.
+	Tags from the embedded documents (-ee) are kept apart using their family 3 group name (-G3), e.g. "Doc1:GPSLatitude", and tags for the file itself are in the "Main" group.
+	"""
 
-	def trim_data(self):
-		#removes rows in the exiftool csv output for gpsdata which can cause errors later in the code
-		with open(f"{self.temp_directory}\\{self.video[0:-4]}_gpsdata.csv", "r") as csvfile_read, open(f"{self.temp_directory}\\{self.video[0:-4]}_gpsdata_converted.csv", "w", newline="") as csvfile_write:
-			cvs_writer=writer(csvfile_write)
-			for row in reader(csvfile_read):
-				if set(row).intersection(["SourceFile"]):
-					continue
-				else:
-					cvs_writer.writerow(row)
-		remove(f"{self.temp_directory}\\{self.video[0:-4]}_gpsdata.csv")
+	tags = ["-FileType", "-FileSize", "-MIMEType", "-CreateDate", "-Duration", "-GPSSpeed", "-GPSSpeedRef", "-GPSLatitude", "-GPSLongitude", "-GPSDateTime"]
 
+	def extract_metadata(self, input_directory:str, exiftool:ExifToolPool):
+		self.backend = "exiftool"
+		try:
+			output = exiftool.execute(["-json", "-ee", "-n", "-G3"] + self.tags + [f"{input_directory}\\{self.video}"])
+		except FileNotFoundError:
+			raise #exiftool is not installed
+		except OSError as error:
+			self.metadata = None #exiftool died or got stuck on this file, and has been restarted for the next one
+			print(f"exiftool failed on {self.video} ({error}), so no metadata was extracted for it")
+			return
+		try:
+			self.metadata = loads(output)[0]
+		except (JSONDecodeError, IndexError):
+			self.metadata = None #exiftool could not read the file, so there is no metadata for it
+			print(f"no metadata found for {self.video}")
+		else:
+			print(f"metadata done for {self.video}")
 
-class FileInfoMetadataExtractor(MetadataExtractor):
+class NativeMetadataExtractor(JSONMetadataExtractor):
 
-	"""Handles the file information metadata for a video"""
+	"""
+	Handles the gps, temporal, and file information metadata for a video by reading the GPS track embedded in the MP4 file directly (mp4_gps_parser.py).
+	This takes milliseconds rather than the seconds exiftool needs to scan the whole video.
+	If the file's GPS format isn't supported, exiftool is used instead, and the metadata is stored in the same format either way.
+	"""
 
-	def extract_metadata(self, input_directory:str):
-		system(f'exiftool -ee -FileType -filesize -MIMEType -d %d-%m-%Y" "%H:%M:%S -createDate -Duration -csv  {input_directory}\\{self.video} >> {self.temp_directory}\\{self.video[0:-4]}_fileinfo.csv')
-		print(f"file info done for {self.video}")
-
-class TimeMetadataExtractor(MetadataExtractor):
-
-	"""Handles the temporal metadata for a video"""
-
-	def extract_metadata(self, input_directory:str):
-		system(f'exiftool -ee -d %d-%m-%Y" "%H:%M:%S -gpsdatetime -s -s -s {input_directory}\\{self.video} >> {self.temp_directory}\\{self.video[0:-4]}_timedata.csv')
-		print(f"time data done for {self.video}")
\ No newline at end of file
+	def extract_metadata(self, input_directory:str, exiftool:ExifToolPool):
+		self.backend = "native"
+		self.metadata = read_mp4_metadata(f"{input_directory}\\{self.video}")
+		if self.metadata is not None:
+			print(f"metadata done for {self.video} without exiftool")
+			return
+		print(f"no supported gps track found in {self.video}, using exiftool instead")
+		try:
+			super().extract_metadata(input_directory, exiftool)
+		except FileNotFoundError:
+			self.metadata = None #exiftool is not installed
+			print(f"exiftool could not be found, so no metadata was extracted for {self.video}")
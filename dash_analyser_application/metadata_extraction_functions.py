@@ -1,8 +1,11 @@
-from os import listdir, system, remove
-from shutil import rmtree
-import csv
-from abc import ABC, abstractmethod
-from dash_analyser_application.metadata_extraction_classes import GPSMetadataExtractor, TimeMetadataExtractor, FileInfoMetadataExtractor
+from os import listdir
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+from dash_analyser_application.metadata_extraction_classes import JSONMetadataExtractor, NativeMetadataExtractor
+from dash_analyser_application.exiftool_session import ExifToolPool, EXIFTOOL_PROCESSES
+
+METADATA_BACKEND = "native" #"native" reads GPS tracks straight from the video file and only uses exiftool for unsupported files, "exiftool" always uses exiftool
+BACKEND_LABELS = {"native": "native reading", "exiftool": "exiftool"} #how the time spent by each backend is described in the latency report
 
 def get_file_list(input_directory: str) -> list:
 	"""
@@ -16,17 +19,43 @@ def get_file_list(input_directory: str) -> list:
 			video_name_list.append(file)
 	return video_name_list
 
-def make_handlers(video_name_list: list, temp_directory: str) -> list:
-	#Takes in a list of video names and temp directory, and makes a list of 3 metadata handlers for each video name.
+def make_handlers(video_name_list: list, temp_directory: str, backend: str = METADATA_BACKEND) -> list:
+	#Takes in a list of video names and temp directory, and makes a metadata handler for each video name, which extracts all of the video's metadata at once.
+	#The backend decides whether the handlers read GPS tracks natively or always use exiftool
 	#Returns the list of metadata handlers
+	extractor_class = NativeMetadataExtractor if backend == "native" else JSONMetadataExtractor
 	metadata_handler_list=[]
 	for video in video_name_list:
-		metadata_handler_list.append(GPSMetadataExtractor(video = video, temp_directory=temp_directory))
-		metadata_handler_list.append(TimeMetadataExtractor(video = video, temp_directory=temp_directory))
-		metadata_handler_list.append(FileInfoMetadataExtractor(video = video, temp_directory=temp_directory))
+		metadata_handler_list.append(extractor_class(video = video, temp_directory=temp_directory))
 	return metadata_handler_list
 
-def extract_metadata_loop(metadata_handler_list: list, input_directory: str):
-	#Takes in a list of metadata handlers and calls their extract_metadata() methods
-	for metadata_handler in metadata_handler_list:
-		metadata_handler.extract_metadata(input_directory)
\ No newline at end of file
+def run_metadata_handler(metadata_handler, input_directory: str, exiftool: ExifToolPool) -> float:
+	#Calls the extract_metadata() method of a single metadata handler, and returns the time it took
+	start_time = perf_counter()
+	metadata_handler.extract_metadata(input_directory, exiftool)
+	return perf_counter() - start_time
+
+def report_extraction_latency(metadata_handler_list: list, handler_times: list) -> str:
+	#Returns a summary of the time taken to extract the metadata for each video file, split by the backend which read each file, as a native read takes milliseconds and exiftool takes seconds
+	backend_times = {}
+	for metadata_handler, handler_time in zip(metadata_handler_list, handler_times):
+		file_times = backend_times.setdefault(metadata_handler.backend, {})
+		file_times[metadata_handler.video] = file_times.get(metadata_handler.video, 0) + handler_time
+	if backend_times == {}:
+		return "No metadata extracted"
+	summaries = []
+	for backend, file_times in backend_times.items():
+		total_time = sum(file_times.values())
+		summaries.append(f"{len(file_times)} files in {total_time:.2f}s of {BACKEND_LABELS.get(backend, 'extraction')} time ({total_time / len(file_times) * 1000:.1f}ms per file)")
+	return "Extracted metadata for " + ", and ".join(summaries)
+
+def extract_metadata_loop(metadata_handler_list: list, input_directory: str, exiftool_processes: int = EXIFTOOL_PROCESSES):
+	"""
+	Takes in a list of metadata handlers and calls their extract_metadata() methods
+	Every handler runs its commands through a pool of exiftool processes which are kept open for the whole loop, rather than starting exiftool for each command.
+	If there is more than one process in the pool, handlers are run from that many threads at once.
+	"""
+	with ExifToolPool(exiftool_processes) as exiftool:
+		with ThreadPoolExecutor(max_workers=exiftool_processes) as executor:
+			handler_times = list(executor.map(lambda metadata_handler: run_metadata_handler(metadata_handler, input_directory, exiftool), metadata_handler_list))
+	print(report_extraction_latency(metadata_handler_list, handler_times))
\ No newline at end of file
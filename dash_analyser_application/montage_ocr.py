@@ -0,0 +1,55 @@
+from pytesseract import pytesseract, Output
+from numpy import full, median, vstack
+
+OCR_BATCH_SIZE = 1 #number of watermark crops stacked into one image per pytesseract call. 1 reads each crop on its own
+SEPARATOR_HEIGHT = 20 #height in pixels of the padding placed between crops in a montage
+
+def make_montage(images:list, separator_height:int=SEPARATOR_HEIGHT):
+	"""
+	Stacks a list of equally sized watermark crops vertically into a single image, with padding above, between and below each crop.
+	The padding is filled with the median value of the crop it sits above, so that it blends into the watermark's background.
+	Returns the montage image.
+	"""
+	rows = []
+	for image in images:
+		rows.append(full((separator_height,) + image.shape[1:], median(image), dtype=image.dtype))
+		rows.append(image)
+	rows.append(full((separator_height,) + images[-1].shape[1:], median(images[-1]), dtype=images[-1].dtype))
+	return vstack(rows)
+
+def split_montage_output(ocr_data:dict, frame_count:int, crop_height:int, separator_height:int=SEPARATOR_HEIGHT) -> list:
+	"""
+	Takes in the output of pytesseract's image_to_data for a montage, and splits the words read back into the crops they came from.
+	Each word is placed in a crop using the vertical centre of its bounding box, and the words are then joined into lines using tesseract's own line numbers.
+	Returns one string per crop, formatted the same as the output of image_to_string, so it can be processed in the same way.
+	"""
+	frame_lines = [{} for i in range(frame_count)]
+	for i, word in enumerate(ocr_data["text"]):
+		if word.strip() == "":
+			continue
+		centre = ocr_data["top"][i] + ocr_data["height"][i] / 2
+		frame_index = int(centre // (crop_height + separator_height))
+		frame_index = min(max(frame_index, 0), frame_count - 1)
+		line_key = (ocr_data["block_num"][i], ocr_data["par_num"][i], ocr_data["line_num"][i])
+		frame_lines[frame_index].setdefault(line_key, []).append(word)
+	return ["\n".join(" ".join(words) for words in lines.values()) + "\n\x0c" for lines in frame_lines]
+
+def read_watermark_montage(images:list, separator_height:int=SEPARATOR_HEIGHT) -> list:
+	#Reads a batch of watermark crops with a single pytesseract call, and returns the watermark read from each crop in order
+	custom_config = r'--oem 3 --psm 6'
+	montage = make_montage(images, separator_height)
+	ocr_data = pytesseract.image_to_data(montage, config=custom_config, output_type=Output.DICT)
+	return split_montage_output(ocr_data, len(images), images[0].shape[0], separator_height)
+
+def read_watermark_batches(images:list, batch_size:int=OCR_BATCH_SIZE, separator_height:int=SEPARATOR_HEIGHT) -> list:
+	#Splits a list of watermark crops into batches, reads each batch as a montage, and returns the watermarks in order
+	watermarks = []
+	for start in range(0, len(images), batch_size):
+		watermarks.extend(read_watermark_montage(images[start:start+batch_size], separator_height))
+	return watermarks
+
+def report_ocr_cost(frame_count:int, ocr_time:float, batch_size:int) -> str:
+	#Returns a summary of the time spent reading each frame, so that the batch size can be tuned for each dashcam model
+	if frame_count == 0:
+		return f"No frames read (batch size {batch_size})"
+	return f"Read {frame_count} frames in {ocr_time:.2f}s ({ocr_time / frame_count * 1000:.1f}ms per frame, batch size {batch_size})"
@@ -0,0 +1,127 @@
+from mmap import mmap, ACCESS_READ
+from struct import unpack_from, error as StructError
+from os import stat
+from datetime import datetime, timedelta
+
+"""
+Reads the GPS track embedded in dashcam MP4/MOV files without exiftool.
+Only the box headers are walked, using mmap, so the video data itself is never read.
+Supports the Novatek format used by the Nextbase cameras, where GPS points are stored in "free" boxes starting with "GPS ",
+either listed by a "gps " box inside "moov" (or "moov/udta"), or placed at the top level of the file.
+The output is a dictionary in the same format as JSONMetadataExtractor's parsed exiftool output, so it can be passed straight to MetaDataFrames.
+"""
+
+MP4_EPOCH = datetime(1904, 1, 1) #MP4 creation times are counted in seconds from this date
+KNOTS_TO_KMPH = 1.852
+
+def iterate_boxes(data, start:int, end:int):
+	#Generator which yields the type, payload start and payload end of each box between start and end
+	position = start
+	while position + 8 <= end:
+		size, box_type = unpack_from(">I4s", data, position)
+		header_size = 8
+		if size == 1:
+			size = unpack_from(">Q", data, position + 8)[0]
+			header_size = 16
+		elif size == 0:
+			size = end - position
+		if size < header_size:
+			return
+		yield box_type, position + header_size, min(position + size, end)
+		position += size
+
+def find_box(data, start:int, end:int, box_type:bytes) -> tuple:
+	#Returns the payload start and end of the first box of the given type between start and end, or None if there isn't one
+	for found_type, payload_start, payload_end in iterate_boxes(data, start, end):
+		if found_type == box_type:
+			return payload_start, payload_end
+	return None
+
+def nmea_to_decimal(coordinate:float, hemisphere:bytes) -> float:
+	#Converts a coordinate in NMEA format (degrees and minutes, DDDMM.MMMM) to decimal degrees
+	degrees = int(coordinate / 100)
+	decimal = degrees + (coordinate - degrees * 100) / 60
+	return -decimal if hemisphere in (b"S", b"W") else decimal
+
+def read_novatek_gps_block(data, position:int, size:int) -> dict:
+	"""
+	Reads a single Novatek GPS block, which is a "free" box with the magic "GPS " followed by little-endian time and position fields.
+	Returns a dictionary of exiftool style GPS tags, or None if the block is not a GPS block or has no satellite fix.
+	"""
+	if size < 88 or data[position+4:position+12] != b"freeGPS ":
+		return None
+	hour, minute, second, year, month, day, status, latitude_ref, longitude_ref, _, latitude, longitude, speed = unpack_from("<IIIIIIccccfff", data, position + 48)
+	if status != b"A":
+		return None
+	return dict(
+		GPSDateTime = f"{year + 2000:04d}:{month:02d}:{day:02d} {hour:02d}:{minute:02d}:{second:02d}",
+		GPSLatitude = nmea_to_decimal(latitude, latitude_ref),
+		GPSLongitude = nmea_to_decimal(longitude, longitude_ref),
+		GPSSpeed = speed * KNOTS_TO_KMPH,
+		GPSSpeedRef = "K"
+		)
+
+def find_gps_index(data, moov:tuple) -> list:
+	#Returns the (position, size) of each GPS block listed by a "gps " box in moov or moov/udta
+	containers = [moov]
+	udta = find_box(data, moov[0], moov[1], b"udta")
+	if udta:
+		containers.append(udta)
+	for container_start, container_end in containers:
+		gps_box = find_box(data, container_start, container_end, b"gps ")
+		if gps_box:
+			index_start, index_end = gps_box
+			return [unpack_from(">II", data, position) for position in range(index_start + 8, index_end - 7, 8)]
+	return []
+
+def read_gps_documents(data, moov:tuple) -> list:
+	#Reads every GPS block in the file, using the gps index if there is one and otherwise looking for GPS blocks at the top level of the file
+	block_positions = find_gps_index(data, moov) if moov else []
+	if block_positions == []:
+		block_positions = [(payload_start - 8, payload_end - payload_start + 8) for box_type, payload_start, payload_end in iterate_boxes(data, 0, len(data)) if box_type == b"free"]
+	documents = [read_novatek_gps_block(data, position, size) for position, size in block_positions if position + size <= len(data)]
+	return [document for document in documents if document is not None]
+
+def read_movie_header(data, moov:tuple) -> dict:
+	#Reads the creation date and duration of the video from the mvhd box
+	mvhd = find_box(data, moov[0], moov[1], b"mvhd")
+	if mvhd is None:
+		return {}
+	version = data[mvhd[0]]
+	if version == 1:
+		creation_time, modification_time, timescale, duration = unpack_from(">QQIQ", data, mvhd[0] + 4)
+	else:
+		creation_time, modification_time, timescale, duration = unpack_from(">IIII", data, mvhd[0] + 4)
+	return dict(
+		CreateDate = (MP4_EPOCH + timedelta(seconds=creation_time)).strftime("%Y:%m:%d %H:%M:%S"),
+		Duration = duration / timescale if timescale else 0
+		)
+
+def read_mp4_metadata(video_file:str) -> dict:
+	"""
+	Takes in the path to a video file, and reads its file information and embedded GPS track.
+	Returns a dictionary formatted like exiftool's -json -G3 output, or None if the file can't be parsed or no GPS points were found, so that exiftool can be used instead.
+	"""
+	try:
+		with open(video_file, "rb") as file, mmap(file.fileno(), 0, access=ACCESS_READ) as data:
+			ftyp = find_box(data, 0, len(data), b"ftyp")
+			moov = find_box(data, 0, len(data), b"moov")
+			documents = read_gps_documents(data, moov)
+			if documents == []:
+				return None
+			is_quicktime = ftyp is not None and data[ftyp[0]:ftyp[0]+4] == b"qt  "
+			movie_header = read_movie_header(data, moov) if moov else {}
+	except (OSError, ValueError, StructError):
+		return None
+	metadata = {
+		"SourceFile": video_file.replace("\\", "/"),
+		"Main:FileType": "MOV" if is_quicktime else "MP4",
+		"Main:FileSize": stat(video_file).st_size,
+		"Main:MIMEType": "video/quicktime" if is_quicktime else "video/mp4"
+		}
+	for tag, value in movie_header.items():
+		metadata[f"Main:{tag}"] = value
+	for document_number, document in enumerate(documents, start=1):
+		for tag, value in document.items():
+			metadata[f"Doc{document_number}:{tag}"] = value
+	return metadata
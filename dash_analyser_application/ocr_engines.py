@@ -0,0 +1,250 @@
+from abc import ABC, abstractmethod
+from os import makedirs
+from os.path import exists, join, dirname
+from pytesseract import pytesseract
+from cv2 import threshold, resize, cvtColor, COLOR_BGR2GRAY, THRESH_BINARY, THRESH_OTSU, INTER_AREA
+from numpy import concatenate, diff, flatnonzero, int8, float32, stack, zeros, array, savez, load
+from dash_analyser_application.montage_ocr import read_watermark_batches, OCR_BATCH_SIZE
+
+OCR_ENGINE = "tesseract" #the OCR engine used to read watermarks unless the "Read watermarks with learned glyphs" option is selected. Either "tesseract" or "glyph"
+GLYPH_WIDTH = 12 #width in pixels each character is resized to before template matching
+GLYPH_HEIGHT = 16 #height in pixels each character is resized to before template matching
+GLYPH_CONFIDENCE = 0.85 #characters matched with a lower correlation than this cause the frame to be read by tesseract instead
+LEARNING_FRAMES = 10 #number of frames read by tesseract to learn the glyph set from
+SPACE_WIDTH_RATIO = 0.35 #gaps between characters wider than this fraction of the line height are read as spaces, until a glyph set learns its own spacing
+MIN_LINE_HEIGHT = 4 #rows of ink shorter than this are treated as noise rather than a line of text
+GLYPH_DIRECTORY = "glyph_sets" #folder in the working directory the glyph set learned for each dashcam type is kept in
+
+def read_watermark_image(image) -> str:
+	#Uses pytesseract to read the watermark in a single cropped frame
+	custom_config = r'--oem 3 --psm 6'
+	return pytesseract.image_to_string(image, config=custom_config)
+
+def format_lines(lines:list) -> str:
+	#Joins lines of text into a string formatted the same as the output of pytesseract's image_to_string
+	return "\n".join(lines) + "\n\x0c"
+
+class OCREngine(ABC):
+
+	"""
+	A class which forms the base for the engines a Video can use to read its watermarks.
+	An engine takes in a list of cropped frames and returns one string per frame, formatted like the output of pytesseract's image_to_string.
+	"""
+
+	batch_size = 1 #number of frames the engine reads together. Frames read in parallel (ocr_executor.py) are split into chunks of whole batches
+
+	def prepare(self, images:list):
+		#Called with a video's frames before they are read. Engines which need to learn from the frames can override this.
+		pass
+
+	@abstractmethod
+	def read_watermarks(self, images:list) -> list:
+		pass
+
+class TesseractEngine(OCREngine):
+
+	"""Reads watermarks using pytesseract, either one frame at a time or, if the batch size is more than 1, in montages of that many frames"""
+
+	def __init__(self, batch_size:int=OCR_BATCH_SIZE):
+		self.batch_size = batch_size
+
+	def read_watermarks(self, images:list) -> list:
+		if self.batch_size > 1:
+			return read_watermark_batches(images, self.batch_size)
+		return [read_watermark_image(image) for image in images]
+
+def binarise(image):
+	#Thresholds a crop using Otsu's method, returning an array where the text is 1 and the background is 0
+	if image.ndim == 3:
+		image = cvtColor(image, COLOR_BGR2GRAY)
+	_, binary = threshold(image, 0, 1, THRESH_BINARY + THRESH_OTSU)
+	if binary.mean() > 0.5: #text covers less of the crop than the background, so if most pixels are set the text is dark on a light background
+		binary = 1 - binary
+	return binary
+
+def find_runs(profile) -> list:
+	#Returns the (start, end) indices of each run of non-zero values in a projection profile
+	padded = concatenate([[0], (profile > 0).astype(int8), [0]])
+	changes = flatnonzero(diff(padded))
+	return list(zip(changes[::2], changes[1::2]))
+
+def make_glyph_vector(glyph):
+	#Resizes a single character to the glyph size and returns it as a flat vector, with the character's aspect ratio added as a final feature
+	height, width = glyph.shape
+	resized = resize(glyph.astype(float32), (GLYPH_WIDTH, GLYPH_HEIGHT), interpolation=INTER_AREA)
+	return concatenate([resized.ravel(), [width / height]]).astype(float32)
+
+def segment_characters(image) -> list:
+	"""
+	Splits a crop into lines using its horizontal projection, and each line into characters using its vertical projection.
+	Returns a list of lines, where each line is a list of (glyph vector, gap) pairs, one per character.
+	The gap is the space between the character and the one before it as a fraction of the line height, and is 0 for the first character in a line.
+	"""
+	binary = binarise(image)
+	lines = []
+	for top, bottom in find_runs(binary.sum(axis=1)):
+		if bottom - top < MIN_LINE_HEIGHT:
+			continue
+		band = binary[top:bottom]
+		line = []
+		previous_end = None
+		for start, end in find_runs(band.sum(axis=0)):
+			gap = 0 if previous_end is None else (start - previous_end) / (bottom - top)
+			line.append((make_glyph_vector(band[:, start:end]), gap))
+			previous_end = end
+		lines.append(line)
+	return lines
+
+def normalise_rows(vectors):
+	#Centres and scales each row so that the dot product of two rows is their correlation
+	centred = vectors - vectors.mean(axis=1, keepdims=True)
+	norms = (centred ** 2).sum(axis=1, keepdims=True) ** 0.5
+	norms[norms == 0] = 1
+	return centred / norms
+
+class GlyphSet:
+
+	"""
+	Stores a template for each character in a dashcam model's watermark font, and the gap between characters above which there is a space.
+	The templates are learned by lining up the characters segmented from a few frames with tesseract's reading of those frames.
+	"""
+
+	def __init__(self):
+		self.labels = []
+		self.templates = zeros((0, GLYPH_WIDTH * GLYPH_HEIGHT + 1), dtype=float32)
+		self.space_width = SPACE_WIDTH_RATIO
+
+	def is_learned(self) -> bool:
+		return len(self.labels) > 0
+
+	def learn(self, images:list, watermarks:list):
+		"""
+		Takes in a list of crops and the tesseract output for each crop.
+		A line is only learned from if tesseract read the same number of characters as were segmented from it, so misaligned reads are skipped.
+		Each character's template is the mean of every example of it.
+		The space width is set halfway between the widest gap without a space and the narrowest gap with one, if the two don't overlap.
+		"""
+		examples = {}
+		space_gaps = []
+		character_gaps = []
+		for image, watermark in zip(images, watermarks):
+			text_lines = [text_line.strip() for text_line in watermark.strip("\x0c").strip().split("\n") if text_line.strip() != ""]
+			lines = segment_characters(image)
+			if len(text_lines) != len(lines):
+				continue
+			for text_line, line in zip(text_lines, lines):
+				characters = [character for character in text_line if character != " "]
+				if len(characters) != len(line):
+					continue
+				spaced = [text_line[i-1] == " " for i, character in enumerate(text_line) if character != " "]
+				for character, (glyph, gap), after_space in zip(characters, line, spaced):
+					examples.setdefault(character, []).append(glyph)
+					if gap > 0:
+						(space_gaps if after_space else character_gaps).append(gap)
+		if examples:
+			self.labels = list(examples.keys())
+			self.templates = normalise_rows(stack([stack(examples[label]).mean(axis=0) for label in self.labels]))
+		if space_gaps and character_gaps and max(character_gaps) < min(space_gaps):
+			self.space_width = (max(character_gaps) + min(space_gaps)) / 2
+
+	def classify(self, glyphs):
+		#Matches every glyph vector against every template in one matrix product. Returns the best matching label and its correlation for each glyph.
+		scores = normalise_rows(glyphs) @ self.templates.T
+		best = scores.argmax(axis=1)
+		return [self.labels[index] for index in best], scores.max(axis=1)
+
+	def save(self, glyph_file:str):
+		#Saves the labels, templates and space width as plain arrays in a .npz file, creating the folder it goes in if needed
+		if dirname(glyph_file):
+			makedirs(dirname(glyph_file), exist_ok=True)
+		savez(glyph_file, labels=array(self.labels, dtype=str), templates=self.templates, space_width=array(self.space_width))
+
+def load_glyph_set(glyph_file:str) -> GlyphSet:
+	"""
+	Loads a glyph set saved by an earlier run if there is one, otherwise returns an empty glyph set
+	The file is loaded without allowing pickled objects, so a file left in the glyph folder can only hold arrays, not code that would run when it is loaded
+	"""
+	glyph_set = GlyphSet()
+	if glyph_file and exists(glyph_file):
+		with load(glyph_file, allow_pickle=False) as glyph_data:
+			glyph_set.labels = [str(label) for label in glyph_data["labels"]]
+			glyph_set.templates = glyph_data["templates"].astype(float32)
+			glyph_set.space_width = float(glyph_data["space_width"])
+	return glyph_set
+
+class GlyphTemplateEngine(OCREngine):
+
+	"""
+	Reads watermarks by segmenting them into characters and matching each character against a glyph set learned for the dashcam model.
+	Each model burns its watermark in one fixed font, so this is far faster than running tesseract on every frame.
+	Frames containing any character matched with low confidence are read by the fallback engine (tesseract) instead.
+	"""
+
+	def __init__(self, fallback:OCREngine=None, glyph_file:str=None, confidence:float=GLYPH_CONFIDENCE):
+		self.fallback = fallback or TesseractEngine()
+		self.batch_size = self.fallback.batch_size
+		self.glyph_file = glyph_file
+		self.confidence = confidence
+		self.glyph_set = load_glyph_set(glyph_file)
+		self.fallback_count = 0
+
+	def prepare(self, images:list):
+		#Learns the glyph set from the first few frames, read using the fallback engine, if it has not been learned yet
+		if self.glyph_set.is_learned() or images == []:
+			return
+		learning_images = images[:LEARNING_FRAMES]
+		self.glyph_set.learn(learning_images, self.fallback.read_watermarks(learning_images))
+		print(f"Learned {len(self.glyph_set.labels)} glyphs from {len(learning_images)} frames")
+		if self.glyph_set.is_learned() and self.glyph_file:
+			self.glyph_set.save(self.glyph_file)
+
+	def read_watermarks(self, images:list) -> list:
+		"""
+		Segments every frame, then classifies all of their characters together.
+		Returns one string per frame, with any frames that had a low confidence character read by the fallback engine.
+		"""
+		if not self.glyph_set.is_learned():
+			return self.fallback.read_watermarks(images)
+		frame_lines = [segment_characters(image) for image in images]
+		glyphs = [glyph for lines in frame_lines for line in lines for glyph, gap in line]
+		if glyphs == []:
+			return self.fallback.read_watermarks(images)
+		labels, scores = self.glyph_set.classify(stack(glyphs))
+		watermarks = []
+		fallback_indices = []
+		glyph_index = 0
+		for frame_index, lines in enumerate(frame_lines):
+			text_lines = []
+			frame_confident = len(lines) > 0
+			for line in lines:
+				text_line = ""
+				for glyph, gap in line:
+					if gap > self.glyph_set.space_width:
+						text_line += " "
+					text_line += labels[glyph_index]
+					frame_confident = frame_confident and scores[glyph_index] >= self.confidence
+					glyph_index += 1
+				text_lines.append(text_line)
+			watermarks.append(format_lines(text_lines))
+			if not frame_confident:
+				fallback_indices.append(frame_index)
+		if fallback_indices:
+			fallback_watermarks = self.fallback.read_watermarks([images[index] for index in fallback_indices])
+			for index, watermark in zip(fallback_indices, fallback_watermarks):
+				watermarks[index] = watermark
+			self.fallback_count += len(fallback_indices)
+			print(f"{len(fallback_indices)} of {len(images)} frames had low confidence characters and were read by tesseract")
+		return watermarks
+
+def make_ocr_engine(engine_name:str=OCR_ENGINE, batch_size:int=OCR_BATCH_SIZE, glyph_file:str=None) -> OCREngine:
+	"""
+	Uses the engine name to determine which OCR engine to initiate, and returns that engine
+	The glyph engine falls back to tesseract with the given batch size, and saves its learned glyph set to the glyph file if one is given
+	"""
+	if engine_name == "glyph":
+		return GlyphTemplateEngine(TesseractEngine(batch_size), glyph_file)
+	return TesseractEngine(batch_size)
+
+def find_glyph_file(glyph_directory:str, dashcam_type:str) -> str:
+	#Returns the file the glyph set for a dashcam type is kept in. Each dashcam model's watermark uses a different font, so each type learns and keeps its own glyph set
+	return join(glyph_directory, f"{dashcam_type.replace(' ', '_')}_glyphs.npz")
@@ -0,0 +1,87 @@
+from concurrent.futures import ProcessPoolExecutor
+from os import environ, cpu_count
+from time import perf_counter
+from dash_analyser_application.video import Video
+from dash_analyser_application.ocr_engines import OCREngine
+from dash_analyser_application.montage_ocr import report_ocr_cost
+from dash_analyser_application.frame_dedup import expand_watermarks
+
+OCR_WORKERS = None #number of worker processes used to read watermarks. None uses one per CPU core, and 1 reads the watermarks serially
+OCR_CHUNK_SIZE = 16 #number of frames sent to a worker process at a time. Rounded up to a whole number of the OCR engine's batches, so montages are made from the same frames as when reading serially
+TESSERACT_THREADS = 1 #number of OpenMP threads each tesseract process may use. Kept low so that the worker processes don't oversubscribe the CPU
+
+def limit_tesseract_threads(thread_limit:int):
+	#Run when each worker process starts. Tesseract reads OMP_THREAD_LIMIT from the environment it inherits from the worker.
+	environ["OMP_THREAD_LIMIT"] = str(thread_limit)
+
+def extract_video_frames(video:Video) -> tuple:
+	#Run in a worker process. Extracts the frames from a single video and returns the unique cropped images in frame order, along with the map from each frame to its unique frame.
+	video.extract_frames()
+	return video.find_unique_frames([image for frame, image in video.load_frames()])
+
+def round_up_to_batches(chunk_size:int, batch_size:int) -> int:
+	#Returns the smallest multiple of the batch size which is at least the chunk size
+	return -(-chunk_size // batch_size) * batch_size
+
+def read_watermark_chunk(images:list, ocr_engine:OCREngine) -> tuple:
+	#Run in a worker process. Reads the watermarks for a chunk of frames and returns the outputs in frame order, along with the time taken.
+	start_time = perf_counter()
+	watermarks = ocr_engine.read_watermarks(images)
+	return watermarks, perf_counter() - start_time
+
+class ParallelOCRExecutor:
+
+	"""
+	Reads the watermarks for a list of Video instances using a pool of worker processes.
+	Work is split up by video when extracting frames, and by chunks of frames when reading watermarks, so a few long videos still keep every worker busy.
+	The outputs are put back together in frame order, so each Video ends up with the same watermarks as it would have if they were read serially.
+	"""
+
+	def __init__(self, workers:int=OCR_WORKERS, chunk_size:int=OCR_CHUNK_SIZE, tesseract_threads:int=TESSERACT_THREADS):
+		self.workers = workers or cpu_count()
+		self.chunk_size = chunk_size
+		self.tesseract_threads = tesseract_threads
+
+	def make_chunks(self, video_frames:list, batch_sizes:list) -> list:
+		"""
+		Splits the frames of each video into chunks of whole OCR batches, using the batch size of the engine reading that video.
+		Returns a list of the chunks, and a list of the index of the video each chunk belongs to.
+		"""
+		chunks = []
+		chunk_owners = []
+		for video_index, (frames, batch_size) in enumerate(zip(video_frames, batch_sizes)):
+			chunk_size = round_up_to_batches(self.chunk_size, batch_size)
+			for start in range(0, len(frames), chunk_size):
+				chunks.append(frames[start:start+chunk_size])
+				chunk_owners.append(video_index)
+		return chunks, chunk_owners
+
+	def read_video_batch(self, executor:ProcessPoolExecutor, video_batch:list):
+		"""
+		Extracts the frames for a batch of videos, reads the watermarks, and stores the outputs in each Video's watermarks list.
+		Each chunk is read using the OCR engine of the Video it came from. Engines are prepared in this process first, so anything they learn is sent to every worker.
+		"""
+		unique_frames, frame_maps = zip(*executor.map(extract_video_frames, video_batch))
+		for video, frames in zip(video_batch, unique_frames):
+			video.ocr_engine.prepare(frames)
+		chunks, chunk_owners = self.make_chunks(unique_frames, [video.ocr_engine.batch_size for video in video_batch])
+		ocr_engines = [video_batch[video_index].ocr_engine for video_index in chunk_owners]
+		unique_watermarks = [[] for video in video_batch]
+		ocr_times = [0.0] * len(video_batch)
+		for video_index, (chunk_output, ocr_time) in zip(chunk_owners, executor.map(read_watermark_chunk, chunks, ocr_engines)):
+			unique_watermarks[video_index].extend(chunk_output)
+			ocr_times[video_index] += ocr_time
+		for video, watermarks, frame_map, ocr_time in zip(video_batch, unique_watermarks, frame_maps, ocr_times):
+			print(report_ocr_cost(len(watermarks), ocr_time, video.ocr_batch_size))
+			video.watermarks = expand_watermarks(watermarks, frame_map)
+			print(f"DONE READING WATERMARKS FOR {video.video_name}")
+
+	def read_watermarks(self, video_list:list):
+		"""
+		Reads the watermarks for every Video in the list, one batch of videos at a time.
+		Batching keeps only a few videos' frames in memory at once, however many videos there are.
+		"""
+		batch_size = self.workers * 2
+		with ProcessPoolExecutor(max_workers=self.workers, initializer=limit_tesseract_threads, initargs=(self.tesseract_threads,)) as executor:
+			for start in range(0, len(video_list), batch_size):
+				self.read_video_batch(executor, video_list[start:start+batch_size])
@@ -39,6 +39,6 @@ def process_watermark_data(ocr_video_list: list):
 		video.make_watermark_df()
 		video.convert_df()
 		video.remove_nans()
-		video.make_points()
+		video.set_compact_dtypes()
 		video.add_dataframe_source_label()
 		video.make_file_info_df()
\ No newline at end of file
@@ -1,11 +1,26 @@
-from dash_analyser_application.dataframer import make_video_csv_list, make_video_metadata_handlers, make_speed_dataframe, find_final_point_in_route
-from dash_analyser_application.metadata_extraction_functions import make_handlers
-from dash_analyser_application.video import Video, make_video
+from dash_analyser_application.dataframer import make_video_metadata_handlers
+from dash_analyser_application.metadata_extraction_functions import make_handlers, extract_metadata_loop, METADATA_BACKEND
+from dash_analyser_application.video import Video, make_video, FRAME_SAMPLE_RATE
+from dash_analyser_application.ocr_executor import ParallelOCRExecutor, OCR_WORKERS
+from dash_analyser_application.ocr_engines import make_ocr_engine, find_glyph_file, OCR_ENGINE, GLYPH_DIRECTORY
+from dash_analyser_application.montage_ocr import OCR_BATCH_SIZE
+from dash_analyser_application.frame_dedup import DEDUPLICATE_FRAMES, FUZZY_DEDUPLICATION, HASH_TOLERANCE
+from dash_analyser_application.zone_intervals import make_zone_intervals, save_zone_intervals
+from dash_analyser_application.track_simplification import make_track_simplifier
+from dash_analyser_application.tile_pyramid import TilePyramidWriter
+from dash_analyser_application.marker_layers import is_high_volume
+from dash_analyser_application.speed_downsampling import save_speed_chart_data, SPEED_CHART_DATA_FILE, SPEED_CHART_DATASET
+from dash_analyser_application.shared_outputs import SharedOutputs, save_standalone_vega_chart
+from dash_analyser_application.trip_segmentation import segment_trips
+from dash_analyser_application.fleet_tracks import FleetTracks, make_fleet_tracks
+from dash_analyser_application.ingest_manifest import IngestManifest, StoredClip, open_ingest_manifest
+from dash_analyser_application.gps_dtypes import report_memory_saving, MEASURE_GPS_MEMORY
 import dash_analyser_application.mapper_functions as mapper
 import dash_analyser_application.timeline_functions as tl
 from os import system, listdir, getcwd
+from os.path import join
 from shutil import rmtree
-from pandas import concat
+from pandas import concat, DataFrame
 from folium import FeatureGroup, Map
 from plotly.express import timeline
 from branca.colormap import linear
@@ -23,28 +38,29 @@ def make_directories(temp_metadata_directory:str, temp_ocr_directory:str):
 	system(f"mkdir {temp_metadata_directory}")
 	system(f"mkdir {temp_ocr_directory}")
 
-def extract_metadata(video_name_list:list, temp_metadata_directory:str, input_directory:str):
+def extract_metadata(video_name_list:list, temp_metadata_directory:str, input_directory:str, backend:str=METADATA_BACKEND) -> list:
 	"""
-	Takes in a list of video names (list of strings), a temp output directory, and an input directory
+	Takes in a list of video names (list of strings), a temp output directory, an input directory, and optionally the backend to read the metadata with (metadata_extraction_functions.py)
 	Uses the list of video names and temporary output directory to call a function which initialises a list of metadata extraction classes
-	Calls the extract_metadata() method for each metadata extraction class using the input directory
+	Calls the extract_metadata() method for each metadata extraction class using the input directory, through a shared exiftool session
+	Returns the list of metadata extraction classes, which now each store the metadata for their video
 	"""
-	metadata_handler_list = make_handlers(video_name_list = video_name_list, temp_directory = temp_metadata_directory)
-	for metadata_handler in metadata_handler_list:
-		metadata_handler.extract_metadata(input_directory)
+	metadata_handler_list = make_handlers(video_name_list = video_name_list, temp_directory = temp_metadata_directory, backend = backend)
+	extract_metadata_loop(metadata_handler_list, input_directory)
+	return metadata_handler_list
 
-def make_metadata_dataframes(temp_metadata_directory:str, exclusion_zones:list) -> list:
+def make_metadata_dataframes(video_metadata_list:list, exclusion_zones:list) -> list:
 	"""
-	Takes in the name of a temp output directory (string), and a list of ExclusionZone (mapper_classes.py) instances
-	Returns a list of MetaDataFrames (found in dataframer.py) instances
+	Takes in a list of the metadata of each video, as extracted by the metadata extraction classes (metadata_extraction_classes.py), and a list of ExclusionZone (mapper_classes.py) instances
+	Returns a list of MetaDataFrames (found in dataframer.py) instances, skipping any videos exiftool could not read
 	"""
-	video_csv_list = make_video_csv_list(temp_metadata_directory)
-	video_metadata_handler_list = make_video_metadata_handlers(video_csv_list, exclusion_zones, temp_metadata_directory)
+	video_metadata_list = [video_metadata for video_metadata in video_metadata_list if video_metadata is not None]
+	video_metadata_handler_list = make_video_metadata_handlers(video_metadata_list, exclusion_zones)
 	return video_metadata_handler_list
 
-def add_data_to_map(video_list: list, routelines: FeatureGroup, start_markers: FeatureGroup, speed_lines: FeatureGroup, routeline_colour: str, colour_map: linear):
+def add_data_to_map(video_list: list, routelines: FeatureGroup, start_markers: FeatureGroup, speed_lines: FeatureGroup, routeline_colour: str, colour_map: linear, popup_table, simplifier = None, track_table = None, marker_layer = None):
 	"""
-	Takes in either a list of Video (video.py) or MetaDataFrames (dataframer.py) instances, three folium FeatureGroups, and a linear branca colour map.
+	Takes in either a list of Video (video.py) or MetaDataFrames (dataframer.py) instances, three folium FeatureGroups, a linear branca colour map, the map's PopupTable (popup_tables.py), and optionally a TrackSimplifier (track_simplification.py), an EncodedTrackTable (geometry_encoding.py) and a StartMarkerLayer (marker_layers.py).
 	Makes a RouteLineMaker (mapper_classes.py) instance for each video in the video list, and uses these instances to add routelines, start markers, and speed lines to a folium Map
 	"""
 	for video in video_list:
@@ -52,27 +68,90 @@ def add_data_to_map(video_list: list, routelines: FeatureGroup, start_markers: F
 			gps_df = video.gps_df,
 			routeline_group = routelines,
 			start_marker_group = start_markers,
-			colour_line_group = speed_lines)
+			colour_line_group = speed_lines,
+			simplifier = simplifier,
+			track_table = track_table)
 		routeliner.make_routeline(routeline_colour)
-		mapper.add_start_marker_to_map(video.file_info_df, routeliner)
+		mapper.add_start_marker_to_map(video.file_info_df, routeliner, popup_table, marker_layer)
 		mapper.add_speedline_to_map(routeliner, colour_map)
 
-def generate_timeline(video_metadata_handler_list: list, timeline_title: str) -> timeline:
+def add_trips_to_map(trip_list: list, routelines: FeatureGroup, start_markers: FeatureGroup, speed_lines: FeatureGroup, routeline_colour: str, colour_map: linear, popup_table, simplifier = None, track_table = None, marker_layer = None):
 	"""
-	Takes in either a list of Video (video.py) or MetaDataFrames (dataframer.py) instances and a timeline title; either OCR or extracted metadata
+	Takes in a list of Trip (trip_segmentation.py) instances, and the same feature groups, colour map and optional helpers as add_data_to_map()
+	Adds a single routeline, start marker, and speed line to the map for each trip rather than for each clip. The popup of a trip's start marker lists each of its clips.
+	"""
+	for trip in trip_list:
+		routeliner = mapper.add_routeline_to_map(
+			gps_df = trip.gps_df,
+			routeline_group = routelines,
+			start_marker_group = start_markers,
+			colour_line_group = speed_lines,
+			simplifier = simplifier,
+			track_table = track_table)
+		routeliner.make_routeline(routeline_colour)
+		mapper.add_trip_start_marker_to_map(trip, routeliner, popup_table, marker_layer)
+		mapper.add_speedline_to_map(routeliner, colour_map)
+
+def save_speed_chart(speed_data: DataFrame, output_dir: str, shared_outputs: SharedOutputs = None) -> "Chart":
+	"""
+	Takes in a dataframe of speed and datetime data, the output directory, and optionally the SharedOutputs (shared_outputs.py) for the output directory.
+	Saves the full resolution data to a sidecar script in the output directory, and a downsampled speed chart whose detail view is drawn from that script.
+	If the outputs share their assets, the chart's data is saved to the data folder, and speed_chart.html and the map's popup load it and the sidecar from there.
+	Returns the speed chart, so it can also be added to the map.
+	Without shared assets, folium embeds the map's copy of the chart itself and can't load the sidecar, so the map is given the chart without its detail view.
+	"""
+	save_speed_chart_data(speed_data, f"{output_dir}\\{SPEED_CHART_DATA_FILE}")
+	speed_chart = mapper.make_speed_chart(speed_data, SPEED_CHART_DATASET)
+	if shared_outputs is None:
+		save_standalone_vega_chart(speed_chart, f"{output_dir}\\speed_chart.html", "Speed chart", [SPEED_CHART_DATA_FILE])
+		return mapper.make_speed_chart(speed_data)
+	shared_outputs.add_sidecar_script("speed_chart", SPEED_CHART_DATA_FILE)
+	shared_outputs.save_vega_chart(speed_chart, "speed_chart")
+	return speed_chart
+
+def save_timeline(timeline_figure: timeline, data_name: str, output_dir: str, shared_outputs: SharedOutputs = None):
+	#Saves a timeline figure to {data_name}.html in the output directory. If the outputs share their assets, the page loads plotly.js and the timeline's data from the shared folders.
+	if shared_outputs is None:
+		tl.save_timeline_to_file(timeline_figure, f"{output_dir}\\{data_name}.html")
+	else:
+		shared_outputs.save_plotly_figure(timeline_figure, data_name)
+
+def generate_timeline(fleet: FleetTracks, timeline_title: str, zone_intervals: DataFrame = None) -> timeline:
+	"""
+	Takes in a FleetTracks (fleet_tracks.py) instance holding either the Video (video.py) or MetaDataFrames (dataframer.py) instances, and a timeline title; either OCR or extracted metadata
+	Optionally takes in the exclusion zone intervals table for the videos (zone_intervals.py), which is used to colour the time spent in each zone
 	Returns a plotly.express timeline figure
 	"""
-	timeline_bar_list = tl.make_timeline_bars(video_metadata_handler_list)
-	timeline_dataframe = tl.make_timeline_dataframe(timeline_bar_list)
+	timeline_dataframe = tl.make_timeline_dataframe(fleet, zone_intervals)
 	timeline_figure = tl.make_timeline_figure(timeline_dataframe, timeline_title)
 	tl.configure_timeline_yaxis(timeline_figure)
 	return timeline_figure
 
-def add_timeline_to_map(timeline_figure: timeline, average_point: tuple, map_feature_group: FeatureGroup):
+def generate_trip_timeline(trip_list: list, clip_fleet: FleetTracks, timeline_title: str, exclusion_zones: list) -> timeline:
+	"""
+	Takes in a list of Trip (trip_segmentation.py) instances, the FleetTracks (fleet_tracks.py) instance holding their clips, a timeline title, and the list of ExclusionZones
+	Returns a plotly.express timeline figure with a bar for each trip. The bars for each trip's clips are hidden until they are selected in the legend.
+	The exclusion zones are found for the trips rather than the clips, so a visit to a zone which carries on into the next clip is shown as one visit
+	"""
+	trip_fleet = FleetTracks(trip_list)
+	trip_fleet.add_exclusion_zones_to_file_info(exclusion_zones)
+	timeline_dataframe = tl.make_trip_timeline_dataframe(trip_fleet, clip_fleet, make_zone_intervals(trip_fleet, exclusion_zones))
+	timeline_figure = tl.make_timeline_figure(timeline_dataframe, timeline_title)
+	tl.configure_timeline_yaxis(timeline_figure)
+	tl.hide_clip_bars(timeline_figure)
+	return timeline_figure
+
+def add_timeline_to_map(timeline_figure: timeline, average_point: tuple, map_feature_group: FeatureGroup, shared_outputs: SharedOutputs = None, data_name: str = None):
 	"""
 	Takes in a plotly.express timeline figure,  the average coordinate of all videos in the intake, and a folium FeatureGroup
 	Uses the average coordinate of all videos in the intake to add the timeline figure to the folium FeatureGroup
+	If the outputs share their assets, the popup draws the timeline saved by save_timeline() under the given data name, rather than holding a copy of the timeline and plotly.js
 	"""
+	if shared_outputs is not None:
+		timeline_marker = mapper.make_timeline_marker(average_point, None)
+		shared_outputs.make_chart_popup("plotly", data_name, 1000, 400).add_to(timeline_marker)
+		timeline_marker.add_to(map_feature_group)
+		return
 	timeline_html = tl.convert_timeline_to_html(timeline_figure)
 	popup=mapper.make_folium_popup_for_timeline(timeline_html)
 	timeline_marker = mapper.make_timeline_marker(average_point, popup)
@@ -80,49 +159,81 @@ def add_timeline_to_map(timeline_figure: timeline, average_point: tuple, map_fea
 
 def make_exclusion_zones(exclusion_zone_list: list) -> list:
 	"""
-	Takes in a list of dictionaries representing exclusion zones defined by the user
-	Returns a list of ExclusionZone (mapper_classes.py) instances
+	Takes in a list of dictionaries representing exclusion zones defined by the user or loaded from a file (zone_files.py)
+	Returns a list of ExclusionZone (mapper_classes.py) instances, or PolygonExclusionZone instances for dictionaries which have "Polygons" rather than a "Location" and "Radius"
 	"""
 	if exclusion_zone_list != []:
-		exclusion_zones = 	[mapper.make_exclusion_zone(
+		exclusion_zones = 	[mapper.make_polygon_exclusion_zone(
+			polygons = exclusion_dictionary["Polygons"],
+			name = exclusion_dictionary.get("Name"))
+			if "Polygons" in exclusion_dictionary else
+			mapper.make_exclusion_zone(
 			location = exclusion_dictionary["Location"], 
-			radius = exclusion_dictionary["Radius"]) 
+			radius = exclusion_dictionary["Radius"],
+			name = exclusion_dictionary.get("Name")) 
 		   	for exclusion_dictionary in exclusion_zone_list if exclusion_zone_list]
 	else:
 		exclusion_zones =  []
 
 	return exclusion_zones
 
-def extract_metadata_and_make_dataframers(video_name_list:list, temp_metadata_directory:str, input_directory:str, exclusion_zones:list) -> list:
+def make_metadata_pipeline_name(backend:str) -> str:
+	#Names the backend metadata was extracted with, which the ingest manifest keeps results under, so changing the backend extracts the videos' metadata again
+	return f"metadata {backend}"
+
+def extract_metadata_and_make_dataframers(video_name_list:list, temp_metadata_directory:str, input_directory:str, exclusion_zones:list, ingest_manifest:IngestManifest = None, backend:str = METADATA_BACKEND) -> list:
 	"""
 	Takes in a list of video names (list of strings), a temp output directory, an input directory, and a list of ExclusionZone (mapper_classes.py) instances
-	Calls the extract metadata function to extract metadata from the videos in video_name_list
+	Optionally takes in an IngestManifest (ingest_manifest.py), in which case only the videos which have been added or changed since the last run have their metadata extracted,
+	and the metadata stored for the rest is used instead. The newly extracted metadata is then stored in the manifest.
 	Makes MetaDataFrames (dataframer.py) instances for each video, calls methods to populate the dataframes managed by these instances
-	Returns a list of the MetaDataFrames instances
+	Returns a list of the MetaDataFrames instances, in the order of video_name_list. Their points are tested against the exclusion zones once they are stored together in a FleetTracks (fleet_tracks.py) instance
 	"""
-	extract_metadata(video_name_list, temp_metadata_directory, input_directory)# make list of metadata handlers, which then extract metadata
-	video_metadata_handler_list = make_metadata_dataframes(temp_metadata_directory, exclusion_zones)
-	for video_metadata_handler in video_metadata_handler_list:
-		video_metadata_handler.gps_df = mapper.test_exclusion_zones(video_metadata_handler.gps_df, exclusion_zones)
-		video_metadata_handler.file_info_df = mapper.add_exclusion_zones_to_file_info(video_metadata_handler.gps_df, video_metadata_handler.file_info_df, exclusion_zones)
+	pipeline = make_metadata_pipeline_name(backend)
+	if ingest_manifest is None:
+		stored_metadata, new_video_names = {}, video_name_list
+	else:
+		stored_metadata, new_video_names = ingest_manifest.find_stored_results(pipeline, video_name_list, input_directory)
+	metadata_handler_list = extract_metadata(new_video_names, temp_metadata_directory, input_directory, backend)# make list of metadata handlers, which then extract metadata
+	extracted_metadata = {metadata_handler.video: metadata_handler.metadata for metadata_handler in metadata_handler_list}
+	if ingest_manifest is not None:
+		ingest_manifest.store_results(pipeline, extracted_metadata, input_directory) #videos whose metadata couldn't be read aren't stored, so they are tried again next run
+	video_metadata_list = [{**stored_metadata, **extracted_metadata}[video_name] for video_name in video_name_list]
+	video_metadata_handler_list = make_metadata_dataframes(video_metadata_list, exclusion_zones)
 	return video_metadata_handler_list
 
-def ocr_option_process(video_name_list:list, temp_ocr_directory:str, input_dir:str, dashcam_type:str) -> list:
+def read_watermarks_serially(ocr_video_list:list):
 	"""
-	Takes in a list of video names (list of strings), a temp output directory, an input directory, and a dashcam type
-	Uses these to make a Video (video.py) instance for each video in the input directory.
-	Calls all the methods for the Video instances, reading the watermarks in each frame.
-	Returns a list of the Video instances, which now each store gps and file information dataframes.
+	Takes in a list of Video (video.py) instances, and extracts the frames and reads the watermarks for each one in turn
 	"""
-	ocr_video_list = [make_video(video_name, temp_ocr_directory, input_dir, dashcam_type) for video_name in video_name_list]
 	for video in ocr_video_list:
 		print("\n---------------------------------------------------------------------------------------\n")
-		video.get_image_crop_indices()
 		print(f"Performing OCR on {video.video_name}")
 		video.extract_frames()
 		print(f"DONE EXTRACTING FRAMES FOR {video.video_name}")
 		video.read_watermarks()
 		print(f"DONE READING WATERMARKS FOR {video.video_name}")
+
+def ocr_option_process(video_name_list:list, temp_ocr_directory:str, input_dir:str, dashcam_type:str, workers:int=OCR_WORKERS, ocr_engine:str=OCR_ENGINE, glyph_file:str=None, **video_options) -> list:
+	"""
+	Takes in a list of video names (list of strings), a temp output directory, an input directory, and a dashcam type
+	Optionally takes in the number of worker processes to read watermarks with, the name of the OCR engine to use (ocr_engines.py) and a file to keep its learned glyphs in,
+	and video options which are passed to each Video, such as the frame sample rate or a directory to save debug frames to
+	Uses these to make a Video (video.py) instance for each video in the input directory.
+	Calls all the methods for the Video instances, reading the watermarks in each frame.
+	Returns a list of the Video instances, which now each store gps and file information dataframes.
+	"""
+	ocr_video_list = [make_video(video_name, temp_ocr_directory, input_dir, dashcam_type, **video_options) for video_name in video_name_list]
+	if ocr_video_list != []:
+		shared_ocr_engine = make_ocr_engine(ocr_engine, ocr_video_list[0].ocr_batch_size, glyph_file) #one engine is shared by every video, so a glyph set only has to be learned once
+	for video in ocr_video_list:
+		video.get_image_crop_indices()
+		video.ocr_engine = shared_ocr_engine
+	if workers == 1:
+		read_watermarks_serially(ocr_video_list)
+	else:
+		ParallelOCRExecutor(workers).read_watermarks(ocr_video_list)
+	for video in ocr_video_list:
 		video.trim_watermark_output()
 		video.split_watermark_output()
 		video.process_watermarks()
@@ -131,12 +242,42 @@ def ocr_option_process(video_name_list:list, temp_ocr_directory:str, input_dir:s
 		video.convert_df()
 		video.remove_nans()
 		video.add_dataframe_source_label()
-		video.make_points()
+		video.set_compact_dtypes()
 		video.make_file_info_df()
 		print(f"DONE PROCESSING WATERMARKS FOR {video.video_name}")
-		rmtree(video.output_folder)
+		video.remove_frames()
 	return ocr_video_list
 
+def make_ocr_pipeline_name(dashcam_type:str, ocr_engine:str, sample_rate:float, frame_step:int, batch_size:int=OCR_BATCH_SIZE, deduplicate_frames:bool=DEDUPLICATE_FRAMES) -> str:
+	"""
+	Names the settings watermarks were read with, which the ingest manifest keeps results under, so changing the dashcam type, OCR engine, frame sampling,
+	the number of crops read in each batch (montage_ocr.py) or how repeated frames are skipped (frame_dedup.py) reads the videos again
+	"""
+	frames = f"every {frame_step} frames" if frame_step else f"{sample_rate} fps"
+	if not deduplicate_frames:
+		deduplication = "every frame read"
+	elif FUZZY_DEDUPLICATION:
+		deduplication = f"frames within {HASH_TOLERANCE} bits reused"
+	else:
+		deduplication = "identical frames reused"
+	return f"ocr {dashcam_type}, {ocr_engine}, {frames}, batches of {batch_size}, {deduplication}"
+
+def ocr_new_videos(video_name_list:list, temp_ocr_directory:str, input_dir:str, dashcam_type:str, ingest_manifest:IngestManifest, ocr_engine:str=OCR_ENGINE, **video_options) -> list:
+	"""
+	Takes in the same arguments as ocr_option_process(), and an IngestManifest (ingest_manifest.py)
+	Only reads the watermarks of the videos which have been added or changed since the last run with the same settings, and stores their gps and file information dataframes in the manifest.
+	Returns a list of the Video instances and of StoredClip (ingest_manifest.py) instances for the videos stored on earlier runs, in the order of video_name_list
+	"""
+	pipeline = make_ocr_pipeline_name(
+		dashcam_type, ocr_engine, video_options.get("sample_rate", FRAME_SAMPLE_RATE), video_options.get("frame_step"),
+		video_options.get("ocr_batch_size") or OCR_BATCH_SIZE, video_options.get("deduplicate_frames", DEDUPLICATE_FRAMES)
+		)
+	stored_dataframes, new_video_names = ingest_manifest.find_stored_results(pipeline, video_name_list, input_dir)
+	new_videos = {video.video_name: video for video in ocr_option_process(new_video_names, temp_ocr_directory, input_dir, dashcam_type, ocr_engine = ocr_engine, **video_options)}
+	ingest_manifest.store_results(pipeline, {video_name: (video.gps_df, video.file_info_df) for video_name, video in new_videos.items()}, input_dir)
+	stored_videos = {video_name: StoredClip(video_name, *dataframes) for video_name, dataframes in stored_dataframes.items()}
+	return [{**stored_videos, **new_videos}[video_name] for video_name in video_name_list]
+
 
 
 def parse_options(input_dir:str, output_dir:str, options_list:list, exclusion_zones:list, dashcam_type:str):
@@ -158,105 +299,165 @@ def parse_options(input_dir:str, output_dir:str, options_list:list, exclusion_zo
 	remove_temp_directory(temp_directory)
 	make_directories(temp_metadata_directory, temp_ocr_directory)
 
+	zone_index = mapper.make_exclusion_zone_index(exclusion_zones) #built once and shared by every video
+
+	shared_outputs = None
+	if options_list.get("SharedAssets"):
+		shared_outputs = SharedOutputs(output_dir)
+		shared_outputs.write_assets()
+
+	ingest_manifest = None
+	if options_list.get("IncrementalIngest"):
+		ingest_manifest = open_ingest_manifest(output_dir)
+
 	if options_list["ExtractMetadata"]:
-		video_metadata_handler_list = extract_metadata_and_make_dataframers(video_name_list, temp_metadata_directory, input_dir, exclusion_zones)
+		video_metadata_handler_list = extract_metadata_and_make_dataframers(video_name_list, temp_metadata_directory, input_dir, exclusion_zones, ingest_manifest)
 		print(video_metadata_handler_list)
-		speed_data = make_speed_dataframe(video_metadata_handler_list)
-		final_point = find_final_point_in_route(video_metadata_handler_list)
-		large_points_df = concat([video_metadata_handler.gps_df[["GPS Latitude", "GPS Longitude"]] for video_metadata_handler in video_metadata_handler_list])
-		mean_point = (large_points_df["GPS Latitude"].mean(), large_points_df["GPS Longitude"].mean())
-		median_point = (large_points_df["GPS Latitude"].mean(), large_points_df["GPS Longitude"].mean())
+		metadata_fleet = make_fleet_tracks(video_metadata_handler_list, exclusion_zones, zone_index) #every video's points in one table, which the handlers' gps_df are now views of
+		if MEASURE_GPS_MEMORY:
+			print(report_memory_saving(metadata_fleet.points, ["GPS Latitude", "GPS Longitude"], "Speed Reference"))
+		zone_intervals = make_zone_intervals(metadata_fleet, exclusion_zones)
+		speed_data = metadata_fleet.speed_data()
+		final_point = metadata_fleet.final_point()
+		mean_point = metadata_fleet.mean_point()
+		median_point = metadata_fleet.mean_point()
+		if options_list.get("Trips"):
+			metadata_trips = segment_trips(metadata_fleet)
 
 	if options_list["OCR"]:
-		ocr_video_list = ocr_option_process(video_name_list, temp_ocr_directory, input_dir, dashcam_type)
 		system(f"mkdir {output_dir}\\ocr")
-		for video in ocr_video_list:
-			video.gps_df = mapper.test_exclusion_zones(video.gps_df, exclusion_zones)
-			video.file_info_df = mapper.add_exclusion_zones_to_file_info(video.gps_df, video.file_info_df, exclusion_zones)
-			print("Done with just OCR")
-		ocr_speed_data = make_speed_dataframe(ocr_video_list)
-		ocr_final_point = find_final_point_in_route(ocr_video_list)
-		ocr_large_points_df = concat([video.gps_df[["Latitude", "Longitude"]] for video_metadata_handler in ocr_video_list])
-		ocr_mean_point = (ocr_large_points_df["Latitude"].mean(), ocr_large_points_df["Longitude"].mean())
-		ocr_median_point = (ocr_large_points_df["Latitude"].mean(), ocr_large_points_df["Longitude"].mean())
+		if options_list.get("SaveOCRFrames"):
+			debug_frame_directory = f"{output_dir}\\ocr\\frames" #the cropped frames are saved here so that misreads can be inspected
+			system(f"mkdir {debug_frame_directory}")
+		else:
+			debug_frame_directory = None
+		if options_list.get("GlyphOCR"):
+			ocr_engine = "glyph"
+			glyph_file = find_glyph_file(join(getcwd(), GLYPH_DIRECTORY), dashcam_type) #kept outside the output directory, so a dashcam type's glyph set is reused by every later run. The folder is made when the glyph set is first saved
+		else:
+			ocr_engine = "tesseract"
+			glyph_file = None
+		if ingest_manifest is None:
+			ocr_video_list = ocr_option_process(video_name_list, temp_ocr_directory, input_dir, dashcam_type, ocr_engine = ocr_engine, glyph_file = glyph_file, debug_frame_directory = debug_frame_directory)
+		else:
+			ocr_video_list = ocr_new_videos(video_name_list, temp_ocr_directory, input_dir, dashcam_type, ingest_manifest, ocr_engine = ocr_engine, glyph_file = glyph_file, debug_frame_directory = debug_frame_directory)
+		ocr_fleet = make_fleet_tracks(ocr_video_list, exclusion_zones, zone_index)
+		if MEASURE_GPS_MEMORY:
+			print(report_memory_saving(ocr_fleet.points, ["Latitude", "Longitude"], "Speed Ref"))
+		print("Done with just OCR")
+		ocr_zone_intervals = make_zone_intervals(ocr_fleet, exclusion_zones)
+		ocr_speed_data = ocr_fleet.speed_data()
+		ocr_final_point = ocr_fleet.final_point()
+		ocr_mean_point = ocr_fleet.mean_point()
+		ocr_median_point = ocr_fleet.mean_point()
+		if options_list.get("Trips"):
+			ocr_trips = segment_trips(ocr_fleet)
+
+	if ingest_manifest is not None:
+		print(ingest_manifest.report())
+		ingest_manifest.close()
 
 	if options_list["Map"]:
+		if options_list.get("Trips"):
+			video_count = (len(metadata_trips) if options_list["ExtractMetadata"] else 0) + (len(ocr_trips) if options_list["OCR"] else 0)
+		else:
+			video_count = (len(video_metadata_handler_list) if options_list["ExtractMetadata"] else 0) + (len(ocr_video_list) if options_list["OCR"] else 0)
+		high_volume = is_high_volume(video_count) #large maps are drawn on a canvas, and their start markers' popups are only made when clicked
 		try:
-			mappy = mapper.initialise_map(mean_point)
+			mappy = mapper.initialise_map(mean_point, high_volume)
 		except UnboundLocalError:
-			mappy = mapper.initialise_map(ocr_mean_point)
+			mappy = mapper.initialise_map(ocr_mean_point, high_volume)
+		if shared_outputs is not None:
+			shared_outputs.localise_map(mappy.canvas)
 		try:
 			colour_map = mapper.generate_speed_colour_map(speed_data)
 		except UnboundLocalError:
 			colour_map = mapper.generate_speed_colour_map(ocr_speed_data)
 
 		mappy.canvas.add_child(colour_map)
-		mapper.add_exclusion_zones_to_map(mappy.exclusion_zone_feature_group, exclusion_zones)
+		mapper.add_exclusion_zones_to_map(mappy.exclusion_zone_feature_group, exclusion_zones, mappy.popup_table)
+		track_table = mapper.add_track_table_to_map(mappy) #shared by every route line, so metadata and OCR tracks are stored in the same table
+		simplifier = make_track_simplifier(precision = None if track_table is None else track_table.precision) #shared by every route line, so its report covers the whole map. Sizes are measured in the form the tracks are written in
 
 
 	if options_list["Map"] and options_list["ExtractMetadata"]:
-		add_data_to_map(video_metadata_handler_list, mappy.routelines, mappy.start_markers, mappy.speed_lines, "blue", colour_map)
+		marker_layer = mapper.add_start_marker_layer_to_map(mappy.start_markers, "blue", mappy.popup_table) if high_volume else None
+		if options_list.get("Trips"):
+			add_trips_to_map(metadata_trips, mappy.routelines, mappy.start_markers, mappy.speed_lines, "blue", colour_map, mappy.popup_table, simplifier, track_table, marker_layer)
+		else:
+			add_data_to_map(video_metadata_handler_list, mappy.routelines, mappy.start_markers, mappy.speed_lines, "blue", colour_map, mappy.popup_table, simplifier, track_table, marker_layer)
 		mappy.canvas.save(f"{output_dir}\\mappy.html")
 
 	if options_list["SpeedChart"] and options_list["ExtractMetadata"]:
-		speed_chart = mapper.make_speed_chart(speed_data = speed_data)
-		speed_chart.save(f"{output_dir}\\speed_chart.html")
+		speed_chart = save_speed_chart(speed_data, output_dir, shared_outputs)
 		print("Speed chart saved")
 
 	if options_list["Timeline"] and options_list["ExtractMetadata"]:
-		metadata_timeline_figure = generate_timeline(video_metadata_handler_list, "Timeline Generated With Metadata Extracted Using ExifTool")
-		tl.save_timeline_to_file(metadata_timeline_figure, f"{output_dir}\\timeline_from_metadata.html")
+		if options_list.get("Trips"):
+			metadata_timeline_figure = generate_trip_timeline(metadata_trips, metadata_fleet, "Timeline Generated With Metadata Extracted Using ExifTool", exclusion_zones)
+		else:
+			metadata_timeline_figure = generate_timeline(metadata_fleet, "Timeline Generated With Metadata Extracted Using ExifTool", zone_intervals)
+		save_timeline(metadata_timeline_figure, "timeline_from_metadata", output_dir, shared_outputs)
 		print("Done with just timeline")
 
 	if options_list["OCR"] and options_list["Map"]:
-		for video in ocr_video_list:
-			routeliner = mapper.add_routeline_to_map(video.gps_df, mappy.ocr_routelines, mappy.ocr_start_markers, mappy.ocr_speed_lines)
-			routeliner.make_routeline("purple")
-			mapper.add_start_marker_to_map(video.file_info_df, routeliner)
-			mapper.add_speedline_to_map(routeliner, colour_map)
-			mappy.canvas.save(f"{output_dir}\\mappy.html")
+		ocr_marker_layer = mapper.add_start_marker_layer_to_map(mappy.ocr_start_markers, "purple", mappy.popup_table) if high_volume else None
+		if options_list.get("Trips"):
+			add_trips_to_map(ocr_trips, mappy.ocr_routelines, mappy.ocr_start_markers, mappy.ocr_speed_lines, "purple", colour_map, mappy.popup_table, simplifier, track_table, ocr_marker_layer)
+		else:
+			add_data_to_map(ocr_video_list, mappy.ocr_routelines, mappy.ocr_start_markers, mappy.ocr_speed_lines, "purple", colour_map, mappy.popup_table, simplifier, track_table, ocr_marker_layer)
+		mappy.canvas.save(f"{output_dir}\\mappy.html")
 		print("Done with OCR + Map")
 
 	if options_list["OCR"] and options_list["Timeline"]:
-		for video in ocr_video_list:
-			video.file_info_df = mapper.add_exclusion_zones_to_file_info(video.gps_df, video.file_info_df, exclusion_zones)
-		ocr_timeline_figure = generate_timeline(ocr_video_list, "Timeline Generated Using Watermark Data")
-		tl.save_timeline_to_file(ocr_timeline_figure, f"{output_dir}\\timeline_from_ocr.html")
+		if options_list.get("Trips"):
+			ocr_timeline_figure = generate_trip_timeline(ocr_trips, ocr_fleet, "Timeline Generated Using Watermark Data", exclusion_zones)
+		else:
+			ocr_timeline_figure = generate_timeline(ocr_fleet, "Timeline Generated Using Watermark Data", ocr_zone_intervals)
+		save_timeline(ocr_timeline_figure, "timeline_from_ocr", output_dir, shared_outputs)
 		print("Done with OCR + timeline")
 
 	if options_list["OCR"] and options_list["Map"] and options_list["Timeline"]:
 		try:
-			add_timeline_to_map(ocr_timeline_figure, median_point, mappy.ocr_timeline_marker)
+			add_timeline_to_map(ocr_timeline_figure, median_point, mappy.ocr_timeline_marker, shared_outputs, "timeline_from_ocr")
 		except UnboundLocalError:
-			add_timeline_to_map(ocr_timeline_figure, ocr_median_point, mappy.ocr_timeline_marker)
+			add_timeline_to_map(ocr_timeline_figure, ocr_median_point, mappy.ocr_timeline_marker, shared_outputs, "timeline_from_ocr")
 
 		mappy.canvas.save(f"{output_dir}\\mappy.html")
 		print("Done with OCR + map + timeline")
 
 	if options_list["SpeedChart"] and options_list["OCR"]:
-		ocr_speed_data = make_speed_dataframe(ocr_video_list)
-		ocr_speed_chart = mapper.make_speed_chart(ocr_speed_data)
-		try:
-			speed_chart = speed_chart + ocr_speed_chart
-		except UnboundLocalError:
-			speed_chart = ocr_speed_chart
-		speed_chart.save(f"{output_dir}\\speed_chart.html")
+		if options_list["ExtractMetadata"]:
+			speed_chart = save_speed_chart(concat([speed_data, ocr_speed_data]), output_dir, shared_outputs) #one chart with a line for each DataSource
+		else:
+			speed_chart = save_speed_chart(ocr_speed_data, output_dir, shared_outputs)
 		print("Done with speed chart + ocr")
 
 	if options_list["Map"] and options_list["SpeedChart"]:
 		try:
-			mapper.add_speed_chart_to_map(speed_chart, final_point, mappy.speed_chart_marker)
+			mapper.add_speed_chart_to_map(speed_chart, final_point, mappy.speed_chart_marker, shared_outputs)
 		except UnboundLocalError:
-			mapper.add_speed_chart_to_map(speed_chart, ocr_final_point, mappy.speed_chart_marker)
+			mapper.add_speed_chart_to_map(speed_chart, ocr_final_point, mappy.speed_chart_marker, shared_outputs)
 
 		mappy.canvas.save(f"{output_dir}\\mappy.html")
 		print("Done with map + speed chart")
 
 	if options_list["Timeline"] and options_list["Map"] and options_list["ExtractMetadata"]:
-		add_timeline_to_map(metadata_timeline_figure, mean_point, mappy.timeline_marker)
+		add_timeline_to_map(metadata_timeline_figure, mean_point, mappy.timeline_marker, shared_outputs, "timeline_from_metadata")
 		mappy.canvas.save(f"{output_dir}\\mappy.html")
 		print("Done with timeline + map")
 
+	if options_list["Map"] and simplifier is not None:
+		print(simplifier.report.summary())
+
+	if options_list.get("TileMap"):
+		tile_writer = TilePyramidWriter(f"{output_dir}\\tiles", leaflet_sources = shared_outputs.get_sources_from("..") if shared_outputs is not None else None)
+		if options_list["ExtractMetadata"]:
+			tile_writer.add_tracks(video_metadata_handler_list, "blue")
+		if options_list["OCR"]:
+			tile_writer.add_tracks(ocr_video_list, "purple")
+		print(tile_writer.write())
+
 	if options_list["SaveMetadata"]:
 
 		system(f"mkdir {output_dir}\\extracted_metadata")
@@ -271,12 +472,16 @@ def parse_options(input_dir:str, output_dir:str, options_list:list, exclusion_zo
 	path_or_buf = f"{output_dir}\\extracted_metadata\\{video_metadata_handler.video_name}_extracted_file_info.csv", 
    	sep = ","
    	)
+			if exclusion_zones != []:
+				save_zone_intervals(zone_intervals, f"{output_dir}\\extracted_metadata")
 		if options_list["OCR"]:
 			for video in ocr_video_list:
 				video.gps_df.to_csv(
 	path_or_buf = f"{output_dir}\\ocr\\{video.video_name}_ocr_output.csv", 
 	sep = ","
 	)
+			if exclusion_zones != []:
+				save_zone_intervals(ocr_zone_intervals, f"{output_dir}\\ocr")
 		print("Saved metadata")
 	remove_temp_directory(temp_directory)
 	print("Deleted temp")
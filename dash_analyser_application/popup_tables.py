@@ -0,0 +1,83 @@
+from html import escape
+from branca.element import MacroElement
+from jinja2 import Template
+from dash_analyser_application.geometry_encoding import dumps_for_template
+
+"""
+Builds every popup on the map from one shared template and style sheet in the page header, rather than writing a full HTML document into an IFrame for each feature.
+Each feature's details are stored as one row of a JSON table keyed by the feature's id, and its popup table is only rendered from that row when the popup is opened.
+The title, headings and labels of each kind of popup are stored once, so the map grows with the amount of data rather than with the number of features.
+"""
+
+class PopupTable(MacroElement):
+
+	"""
+	Stores the rows of every popup on the map, and writes them to the page header along with the style sheet and the function which renders a row.
+	Rows are [template id, [values]], and templates are [title, [headings], [labels]], so the labels of a popup are only stored once however many features use them.
+	"""
+
+	_template = Template("""
+		{% macro header(this, kwargs) %}
+		<style>
+		.dash-analyser-popup table { font-family: arial, sans-serif; border-collapse: collapse; width: 100%; }
+		.dash-analyser-popup td, .dash-analyser-popup th { border: 1px solid #dddddd; text-align: left; padding: 8px; }
+		.dash-analyser-popup tr:nth-child(even) { background-color: #dddddd; }
+		</style>
+		<script>
+		var {{ this.get_name() }} = (function () {
+			var templates = {{ this.templates_json() }};
+			var rows = {{ this.rows_json() }};
+			return function (feature) {
+				var row = rows[feature], template = templates[row[0]];
+				var html = "<div class='dash-analyser-popup'><h4>" + template[0] + "</h4><table><tr><th>" + template[1].join("</th><th>") + "</th></tr>";
+				for (var i = 0; i < template[2].length; i++) {
+					html += "<tr><td>" + template[2][i] + "</td><td>" + row[1][i] + "</td></tr>";
+				}
+				return html + "</table></div>";
+			};
+		})();
+		</script>
+		{% endmacro %}
+		""")
+
+	def __init__(self):
+		super().__init__()
+		self._name = "PopupTable"
+		self.templates = []
+		self.template_ids = {}
+		self.rows = []
+
+	def templates_json(self) -> str:
+		return dumps_for_template(self.templates)
+
+	def rows_json(self) -> str:
+		return dumps_for_template(self.rows)
+
+	def add_row(self, title:str, headings:list, labels:list, values:list) -> int:
+		"""
+		Adds a row for a feature's popup, made from the given title, column headings and a label for each value. Returns the feature's id in the table.
+		Every value is escaped, as the popup is rendered as HTML.
+		"""
+		template = (title, tuple(headings), tuple(labels))
+		if template not in self.template_ids:
+			self.template_ids[template] = len(self.templates)
+			self.templates.append([escape(title), [escape(heading) for heading in headings], [escape(label) for label in labels]])
+		self.rows.append([self.template_ids[template], [escape(str(value)) for value in values]])
+		return len(self.rows) - 1
+
+class LazyPopup(MacroElement):
+
+	"""Binds a popup to its parent marker or shape, which is rendered from the feature's row of a PopupTable when it's opened"""
+
+	_template = Template("""
+		{% macro script(this, kwargs) %}
+		{{ this._parent.get_name() }}.bindPopup(function () { return {{ this.popup_table.get_name() }}({{ this.feature_id }}); }, {maxWidth: {{ this.max_width }}});
+		{% endmacro %}
+		""")
+
+	def __init__(self, popup_table:PopupTable, feature_id:int, max_width:int=500):
+		super().__init__()
+		self._name = "LazyPopup"
+		self.popup_table = popup_table
+		self.feature_id = feature_id
+		self.max_width = max_width
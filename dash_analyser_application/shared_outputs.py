@@ -0,0 +1,223 @@
+from json import dumps
+from os import makedirs, replace, remove
+from os.path import exists
+from shutil import copyfileobj
+from urllib.request import urlopen
+from http.client import HTTPException
+from folium import Map
+from branca.element import MacroElement, JavascriptLink, CssLink
+from jinja2 import Template
+from plotly.offline import get_plotlyjs
+
+"""
+Writes the scripts used by the output files once into an assets folder, and the data of the speed chart and timelines once into a data folder,
+rather than inlining a copy of plotly.js and of each chart's data into every file which shows it.
+speed_chart.html, the timeline files and the popups on mappy.html then all load the same assets and data files.
+Data files are JSON wrapped in a line of javascript, so that they can be loaded with a script tag when the outputs are opened straight from disk.
+Vega charts can also read datasets registered in dashAnalyserDatasets by sidecar scripts, such as the speed chart's full resolution data (speed_downsampling.py).
+Plotly.js is written from the plotly package. The other assets are downloaded once, and any which can't be downloaded are loaded from their CDN instead.
+Downloads are written to a temporary file which is only renamed to the asset's name once it's complete, so an interrupted download is never reused by a later run.
+"""
+
+ASSETS_DIRECTORY = "assets" #folder in the output directory the shared scripts are written to
+DATA_DIRECTORY = "data" #folder in the output directory the shared chart and timeline data are written to
+VEGA_ASSET_URLS = {
+	"vega": "https://cdn.jsdelivr.net/npm/vega@5",
+	"vega-lite": "https://cdn.jsdelivr.net/npm/vega-lite@4.8.1",
+	"vega-embed": "https://cdn.jsdelivr.net/npm/vega-embed@6"
+	} #versions used by altair 4.1
+LEAFLET_URL = "https://cdn.jsdelivr.net/npm/leaflet@1.6.0/dist" #version used by folium 0.12.1
+LEAFLET_IMAGES = ["layers.png", "layers-2x.png", "marker-icon.png", "marker-icon-2x.png", "marker-shadow.png"] #images leaflet.css refers to, which are kept next to it
+DOWNLOAD_TIMEOUT = 15 #seconds to wait for an asset's server before loading it from the internet instead, so a run with no network doesn't hang
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>{title}</title>
+{scripts}
+</head>
+<body>
+<div id="chart"></div>
+<script>
+var data = dashAnalyserData[{data_name}];
+{draw}
+</script>
+</body>
+</html>
+"""
+
+DRAW_SCRIPTS = {
+	"plotly": 'Plotly.newPlot("{element}", data.data, data.layout);',
+	"vega": 'vegaEmbed("#{element}", Object.assign({{}}, data, {{datasets: Object.assign({{}}, data.datasets, window.dashAnalyserDatasets)}}));'
+	} #draws a chart from its data in an element, for each kind of chart. Vega charts are given any datasets registered by sidecar scripts
+
+def make_data_script(data_name:str, data_json:str) -> str:
+	#Returns the javascript which registers a chart's data in dashAnalyserData, as written to its data file
+	return f"var dashAnalyserData = window.dashAnalyserData || {{}};\ndashAnalyserData[{dumps(data_name)}] = {data_json};\n"
+
+def make_script_tags(sources:list) -> str:
+	#Returns a script tag loading each source, in order
+	return "\n".join(f'<script src="{source}"></script>' for source in sources)
+
+def save_standalone_vega_chart(chart:"Chart", file_path:str, title:str, sidecar_sources:list):
+	"""
+	Saves an altair chart to a page which holds the chart's data itself, as altair's own save() does, but which also loads the given sidecar scripts.
+	Used when the outputs don't share their assets, for charts which read a dataset from a sidecar. Vega is loaded from its CDN.
+	"""
+	scripts = make_script_tags(list(VEGA_ASSET_URLS.values()) + sidecar_sources) + f"\n<script>\n{make_data_script('chart', dumps(chart.to_dict()))}</script>"
+	with open(file_path, "w", encoding = "utf-8") as page_file:
+		page_file.write(PAGE_TEMPLATE.format(title = title, scripts = scripts, data_name = dumps("chart"), draw = DRAW_SCRIPTS["vega"].format(element = "chart")))
+
+class SidecarChartPopup(MacroElement):
+
+	"""Binds a popup to its parent marker, which draws a chart from a shared data file when it's opened rather than holding a copy of the chart"""
+
+	_template = Template("""
+		{% macro script(this, kwargs) %}
+		{{ this._parent.get_name() }}.bindPopup("<div id='{{ this.get_name() }}' style='width:{{ this.width }}px;height:{{ this.height }}px'></div>", {maxWidth: {{ this.width + 50 }}});
+		{{ this._parent.get_name() }}.on("popupopen", function () {
+			var data = dashAnalyserData[{{ this.data_name|tojson }}];
+			{{ this.draw_script() }}
+		});
+		{% endmacro %}
+		""")
+
+	def __init__(self, kind:str, data_name:str, scripts:list, width:int, height:int):
+		super().__init__()
+		self._name = "SidecarChartPopup"
+		self.kind = kind
+		self.data_name = data_name
+		self.scripts = scripts
+		self.width = width
+		self.height = height
+
+	def draw_script(self) -> str:
+		return DRAW_SCRIPTS[self.kind].format(element = self.get_name())
+
+	def render(self, **kwargs):
+		#Adds the chart's scripts and data file to the page header, named so that each is only added once however many popups use it
+		super().render(**kwargs)
+		figure = self.get_root()
+		for name, source in self.scripts:
+			figure.header.add_child(JavascriptLink(source), name = name)
+
+class LocalMapAssets(MacroElement):
+
+	"""
+	Points the map's links to leaflet at the assets folder. This is added to the map as a child, so it's rendered after the map has added its own links,
+	and replaces them by name, so each is still only loaded once.
+	"""
+
+	def __init__(self, sources:dict):
+		super().__init__()
+		self._name = "LocalMapAssets"
+		self.sources = sources
+
+	def render(self, **kwargs):
+		super().render(**kwargs)
+		figure = self.get_root()
+		figure.header.add_child(JavascriptLink(self.sources["leaflet"]), name = "leaflet")
+		figure.header.add_child(CssLink(self.sources["leaflet_css"]), name = "leaflet_css")
+
+def download_file(url:str, file_path:str, timeout:float=DOWNLOAD_TIMEOUT):
+	"""
+	Downloads a url to a temporary file next to file_path, and renames it to file_path once the whole response has been read.
+	If the download fails, times out, or is shorter than the server said it would be, the temporary file is removed and the error is raised.
+	"""
+	partial_path = f"{file_path}.part"
+	try:
+		with urlopen(url, timeout = timeout) as response, open(partial_path, "wb") as partial_file:
+			copyfileobj(response, partial_file)
+			expected_size = response.headers.get("Content-Length")
+			if expected_size is not None and partial_file.tell() != int(expected_size):
+				raise OSError(f"the download stopped after {partial_file.tell()} of {expected_size} bytes")
+		replace(partial_path, file_path)
+	except (OSError, HTTPException):
+		if exists(partial_path):
+			remove(partial_path)
+		raise
+
+class SharedOutputs:
+
+	"""
+	Writes the shared assets and data files for an output directory, and the pages and popups which use them.
+	The path of each asset is stored relative to the output directory, or as its CDN url if it couldn't be written.
+	"""
+
+	def __init__(self, output_dir:str):
+		self.output_dir = output_dir
+		self.sources = {}
+		self.download_failed = False #once one download fails, the rest aren't tried, so a run with no network only waits for one timeout
+		self.sidecar_scripts = {}
+
+	def write_asset(self, name:str, file_name:str, url:str):
+		#Downloads an asset into the assets folder if it isn't there from a previous run, and notes where pages should load it from
+		file_path = f"{self.output_dir}\\{ASSETS_DIRECTORY}\\" + file_name.replace("/", "\\")
+		try:
+			if not exists(file_path):
+				if self.download_failed:
+					raise OSError("an earlier asset could not be downloaded")
+				download_file(url, file_path)
+			self.sources[name] = f"{ASSETS_DIRECTORY}/{file_name}"
+		except (OSError, HTTPException) as error:
+			self.download_failed = True
+			print(f"Could not download {url} ({error}), so it will be loaded from the internet")
+			self.sources[name] = url
+
+	def write_assets(self):
+		#Writes plotly.js, vega and leaflet to the assets folder
+		makedirs(f"{self.output_dir}\\{ASSETS_DIRECTORY}\\images", exist_ok = True)
+		makedirs(f"{self.output_dir}\\{DATA_DIRECTORY}", exist_ok = True)
+		with open(f"{self.output_dir}\\{ASSETS_DIRECTORY}\\plotly.min.js", "w", encoding = "utf-8") as asset_file:
+			asset_file.write(get_plotlyjs())
+		self.sources["plotly"] = f"{ASSETS_DIRECTORY}/plotly.min.js"
+		for name, url in VEGA_ASSET_URLS.items():
+			self.write_asset(name, f"{name}.min.js", url)
+		self.write_asset("leaflet", "leaflet.js", f"{LEAFLET_URL}/leaflet.js")
+		self.write_asset("leaflet_css", "leaflet.css", f"{LEAFLET_URL}/leaflet.css")
+		for image in LEAFLET_IMAGES:
+			self.write_asset(image, f"images/{image}", f"{LEAFLET_URL}/images/{image}")
+
+	def localise_map(self, canvas:Map):
+		#Makes the map load leaflet from the assets folder
+		LocalMapAssets(self.sources).add_to(canvas)
+
+	def get_sources_from(self, path_to_output_dir:str) -> dict:
+		#Returns where a page in a folder inside the output directory should load each asset from, given the relative path from that folder back to the output directory, such as ".."
+		return {name: source if source.startswith("https://") else f"{path_to_output_dir}/{source}" for name, source in self.sources.items()}
+
+	def save_data(self, data_name:str, data_json:str):
+		#Writes a chart's data to its file in the data folder
+		with open(f"{self.output_dir}\\{DATA_DIRECTORY}\\{data_name}.js", "w", encoding = "utf-8") as data_file:
+			data_file.write(make_data_script(data_name, data_json))
+
+	def add_sidecar_script(self, data_name:str, source:str):
+		#Notes a script, relative to the output directory, which the chart with the given data name also needs, such as a sidecar holding a dataset it reads
+		self.sidecar_scripts.setdefault(data_name, []).append(source)
+
+	def get_scripts(self, kind:str, data_name:str) -> list:
+		#Returns the (name, source) of each script a chart needs, including its data file
+		libraries = ["plotly"] if kind == "plotly" else ["vega", "vega-lite", "vega-embed"]
+		sidecars = [(f"sidecar_{source}", source) for source in self.sidecar_scripts.get(data_name, [])]
+		return [(library, self.sources[library]) for library in libraries] + [(f"data_{data_name}", f"{DATA_DIRECTORY}/{data_name}.js")] + sidecars
+
+	def save_page(self, kind:str, data_name:str, title:str):
+		#Writes a page to the output directory which draws a chart from its data file
+		scripts = make_script_tags([source for name, source in self.get_scripts(kind, data_name)])
+		with open(f"{self.output_dir}\\{data_name}.html", "w", encoding = "utf-8") as page_file:
+			page_file.write(PAGE_TEMPLATE.format(title = title, scripts = scripts, data_name = dumps(data_name), draw = DRAW_SCRIPTS[kind].format(element = "chart")))
+
+	def save_vega_chart(self, chart:"Chart", data_name:str):
+		#Saves an altair chart's specification and data to the data folder, and a page showing it named after the data
+		self.save_data(data_name, dumps(chart.to_dict()))
+		self.save_page("vega", data_name, data_name.replace("_", " ").capitalize())
+
+	def save_plotly_figure(self, figure:"timeline", data_name:str):
+		#Saves a plotly figure's data and layout to the data folder, and a page showing it named after the data
+		self.save_data(data_name, figure.to_json())
+		self.save_page("plotly", data_name, data_name.replace("_", " ").capitalize())
+
+	def make_chart_popup(self, kind:str, data_name:str, width:int, height:int) -> SidecarChartPopup:
+		#Returns a popup which draws the saved chart with the given data name when it's opened
+		return SidecarChartPopup(kind, data_name, self.get_scripts(kind, data_name), width, height)
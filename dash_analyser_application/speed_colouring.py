@@ -0,0 +1,44 @@
+from numpy import asarray, float64, int64, floor, clip, zeros, flatnonzero, diff, concatenate, nan_to_num
+
+"""
+Draws the speed coloured route line as a few multi-point lines per video, rather than one two-point line per pair of points.
+Speeds are split into bins along the colour map's scale, and each run of consecutive segments in the same bin is merged into a single line.
+All of the runs in a bin are then drawn as one PolyLine, so a video has at most one line per colour.
+"""
+
+SPEED_COLOUR_BINS = 12 #number of colours the speed scale is split into. 12 matches the number of steps folium's ColorLine uses, so the line looks the same
+
+def quantise_speeds(speeds, colour_map, bins:int=SPEED_COLOUR_BINS):
+	#Returns the bin of the colour map's scale each speed falls in. Missing speeds are put in the lowest bin.
+	speed_array = nan_to_num(asarray(speeds, dtype=float64), nan=colour_map.vmin)
+	span = colour_map.vmax - colour_map.vmin
+	if span <= 0:
+		return zeros(len(speed_array), dtype=int64)
+	return clip(floor((speed_array - colour_map.vmin) / span * bins), 0, bins - 1).astype(int64)
+
+def make_bin_colours(colour_map, bins:int=SPEED_COLOUR_BINS) -> list:
+	#Returns the colour of each bin, taken from the colour map split into the same number of steps as ColorLine does, at the middle of the bin
+	step_map = colour_map.to_step(bins)
+	step = (colour_map.vmax - colour_map.vmin) / bins
+	return [step_map.rgb_hex_str(colour_map.vmin + (speed_bin + 0.5) * step) for speed_bin in range(bins)]
+
+def find_speed_runs(speed_bins) -> dict:
+	"""
+	Takes in the speed bin of each point of a line. Each segment takes the bin of the point it starts at, as with folium's ColorLine.
+	Returns a dictionary mapping each bin to a list of (first point, last point) index pairs, one for each run of consecutive segments in that bin.
+	Neighbouring runs share their end point, so the line has no gaps.
+	"""
+	if len(speed_bins) < 2:
+		return {}
+	segment_bins = asarray(speed_bins)[:-1]
+	changes = flatnonzero(diff(segment_bins)) + 1
+	run_starts = concatenate([[0], changes])
+	run_ends = concatenate([changes, [len(speed_bins) - 1]])
+	runs = {}
+	for start, end in zip(run_starts, run_ends):
+		runs.setdefault(int(segment_bins[start]), []).append((int(start), int(end)))
+	return runs
+
+def merge_speed_runs(points:list, speed_bins) -> dict:
+	#Takes in an array of points and the speed bin of each point, and returns a dictionary mapping each bin to a list of runs, where each run is the slice of the points in it
+	return {speed_bin: [points[start:end+1] for start, end in runs] for speed_bin, runs in find_speed_runs(speed_bins).items()}
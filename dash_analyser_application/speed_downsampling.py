@@ -0,0 +1,79 @@
+from json import dumps
+from numpy import arange, int64, float64, empty, diff, add, concatenate, argmax, abs as absolute
+from pandas import DataFrame, Categorical, concat, to_numeric
+
+"""
+Keeps the speed chart small however many videos it covers.
+Each DataSource's series is downsampled with the Largest-Triangle-Three-Buckets algorithm, which keeps the points that most change the shape of the line, so peaks in speed are kept.
+The full resolution data is written to a sidecar script instead, which the chart's detail view uses to show every point in the range brushed on the overview.
+The sidecar is loaded with a script tag rather than fetched, as browsers block fetching files when the outputs are opened straight from disk.
+"""
+
+SPEED_CHART_POINTS = 2000 #number of points each DataSource's line is reduced to on the speed chart. Altair embeds at most 5000 rows per chart, so keep the total under that
+SPEED_CHART_DATA_FILE = "speed_chart_data.js" #sidecar script holding the full resolution speed data, saved next to speed_chart.html and mappy.html
+SPEED_CHART_DATASET = "speed_chart_detail" #name the sidecar registers the full resolution data under, which the detail chart reads it by
+
+def largest_triangle_three_buckets(x, y, threshold:int=SPEED_CHART_POINTS):
+	"""
+	Takes in arrays of x and y values sorted by x, and the number of points to keep. Returns the indices of the kept points.
+	The first and last points are always kept, and the points in between are split into equal buckets. From each bucket, the point which makes the largest
+	triangle with the point kept from the previous bucket and the average of the next bucket is kept. The bucket averages are found in one vectorised operation.
+	"""
+	point_count = len(x)
+	if threshold >= point_count or threshold < 3:
+		return arange(point_count)
+	bucket_edges = (arange(threshold - 1) * (point_count - 2) / (threshold - 2)).astype(int64) + 1
+	bucket_edges[-1] = point_count - 1
+	bucket_sizes = diff(bucket_edges)
+	next_x = concatenate([(add.reduceat(x[:-1], bucket_edges[:-1]) / bucket_sizes)[1:], x[-1:]])
+	next_y = concatenate([(add.reduceat(y[:-1], bucket_edges[:-1]) / bucket_sizes)[1:], y[-1:]])
+	kept = empty(threshold, dtype=int64)
+	kept[0], kept[-1] = 0, point_count - 1
+	previous = 0
+	for bucket in range(threshold - 2):
+		start, end = bucket_edges[bucket], bucket_edges[bucket + 1]
+		areas = absolute((x[previous] - next_x[bucket]) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y[bucket] - y[previous]))
+		previous = start + int(argmax(areas))
+		kept[bucket + 1] = previous
+	return kept
+
+def clean_speed_data(speed_data:DataFrame) -> DataFrame:
+	#Returns the speed data with any rows missing a speed or time removed, sorted by DataSource and then time
+	speed_data = speed_data[["Speed", "DateTime", "DataSource"]].assign(Speed = to_numeric(speed_data["Speed"], errors = "coerce"))
+	return speed_data.dropna().sort_values(["DataSource", "DateTime"], kind = "stable").reset_index(drop = True)
+
+def downsample_speed_data(speed_data:DataFrame, points:int=SPEED_CHART_POINTS) -> DataFrame:
+	#Takes in a dataframe of speed, datetime and DataSource data, and returns it with each DataSource's series reduced to the given number of points
+	speed_data = clean_speed_data(speed_data)
+	series = []
+	for data_source, source_data in speed_data.groupby("DataSource", sort = False, observed = True):
+		seconds = (source_data["DateTime"] - source_data["DateTime"].iloc[0]).dt.total_seconds().to_numpy(dtype=float64)
+		series.append(source_data.iloc[largest_triangle_three_buckets(seconds, source_data["Speed"].to_numpy(dtype=float64), points)])
+	if series == []:
+		return speed_data
+	return concat(series, ignore_index = True)
+
+def get_data_sources(speed_data:DataFrame) -> list:
+	#Returns the names of the DataSources in the speed data. The sidecar file stores each row's DataSource as its position in this list.
+	return sorted(speed_data["DataSource"].dropna().unique())
+
+def save_speed_chart_data(speed_data:DataFrame, file_path:str):
+	"""
+	Saves the full resolution speed data to the sidecar script used by the speed chart's detail view.
+	To keep the file small, the data is written as CSV text, with times as milliseconds since 1970 and each DataSource as its number from get_data_sources().
+	The script parses the text into rows when it's loaded, and registers them in dashAnalyserDatasets under SPEED_CHART_DATASET.
+	"""
+	speed_data = clean_speed_data(speed_data)
+	csv_text = DataFrame(dict(
+		DateTime = speed_data["DateTime"].to_numpy(dtype="datetime64[ms]").astype(int64),
+		Speed = speed_data["Speed"],
+		Source = Categorical(speed_data["DataSource"], categories = get_data_sources(speed_data)).codes
+		)).to_csv(index = False, header = False, float_format = "%.6g")
+	with open(file_path, "w", encoding = "utf-8") as data_file:
+		data_file.write(
+			"var dashAnalyserDatasets = window.dashAnalyserDatasets || {};\n"
+			f"dashAnalyserDatasets[{dumps(SPEED_CHART_DATASET)}] = {dumps(csv_text)}.split(\"\\n\").filter(Boolean).map(function (line) {{\n"
+			"\tvar values = line.split(\",\");\n"
+			"\treturn {DateTime: +values[0], Speed: +values[1], Source: +values[2]};\n"
+			"});\n"
+			)
@@ -0,0 +1,200 @@
+from json import dumps
+from os import makedirs
+from numpy import radians, log, tan, cos, pi, clip, floor, minimum, maximum, int64, arange, repeat, cumsum, lexsort, flatnonzero, concatenate, diff, zeros, isfinite, nanmean
+from jinja2 import Template
+from dash_analyser_application.geofence import get_coordinates
+from dash_analyser_application.track_simplification import TrackSimplifier, SIMPLIFICATION_METHOD
+from dash_analyser_application.shared_outputs import LEAFLET_URL
+
+"""
+Writes the route lines as a pyramid of GeoJSON tiles, in folders named {zoom}/{x}/{y}.geojson using the same tile numbering as the map's tile layers,
+along with a small Leaflet page which only downloads the tiles in view. This scales to far more videos than a single folium map file, as the browser never loads the whole fleet at once.
+Each zoom level is simplified with its own tolerance, so zoomed out tiles hold a handful of points per track while zoomed in tiles keep every detail.
+The page uses fetch() to load the tiles, so the tile folder needs to be served with a local web server, for example by running "python -m http.server" inside it.
+The page loads the same version of leaflet as the map, from the assets folder if the shared assets (shared_outputs.py) were written, or from its CDN otherwise.
+"""
+
+TILE_MIN_ZOOM = 8 #most zoomed out level tiles are written for. The viewer shows these tiles when zoomed out further
+TILE_MAX_ZOOM = 16 #most zoomed in level tiles are written for. The viewer shows these tiles when zoomed in further
+TILE_PIXEL_TOLERANCE = 1.0 #at each zoom level, tracks are simplified until no point is moved by more than this many pixels on screen
+EQUATOR_METRES_PER_PIXEL = 156543.03392 #ground distance covered by one pixel of a 256 pixel tile at zoom level 0 on the equator
+MAX_MERCATOR_LATITUDE = 85.05112878 #web mercator tiles don't extend beyond this latitude
+COORDINATE_DECIMALS = 6 #decimal places coordinates are written with, which is about 10cm
+
+def zoom_tolerance(zoom:int, latitude:float, pixel_tolerance:float=TILE_PIXEL_TOLERANCE) -> float:
+	#Returns the simplification tolerance in metres for a zoom level, which is the ground distance covered by the tolerance in pixels at the given latitude
+	return EQUATOR_METRES_PER_PIXEL * cos(radians(latitude)) / 2 ** zoom * pixel_tolerance
+
+def tile_coordinates(latitudes, longitudes, zoom:int) -> tuple:
+	#Converts arrays of coordinates to fractional web mercator tile coordinates at a zoom level, so the integer part is the tile number
+	tile_count = 2 ** zoom
+	latitudes = radians(clip(latitudes, -MAX_MERCATOR_LATITUDE, MAX_MERCATOR_LATITUDE))
+	x = (longitudes + 180) / 360 * tile_count
+	y = (1 - log(tan(latitudes) + 1 / cos(latitudes)) / pi) / 2 * tile_count
+	return x, y
+
+def split_track_into_tiles(latitudes, longitudes, zoom:int) -> list:
+	"""
+	Takes in the coordinates of a track and a zoom level.
+	Every segment of the track is placed in each tile its bounding box overlaps, and consecutive segments in the same tile are joined into one piece.
+	Returns a list of (tile x, tile y, first point, last point) for every piece. A segment crossing a tile edge is in both tiles, so the line has no gaps.
+	"""
+	if len(latitudes) < 2:
+		return []
+	x, y = tile_coordinates(latitudes, longitudes, zoom)
+	tile_x = floor(x).astype(int64)
+	tile_y = floor(y).astype(int64)
+	first_x, last_x = minimum(tile_x[:-1], tile_x[1:]), maximum(tile_x[:-1], tile_x[1:])
+	first_y, last_y = minimum(tile_y[:-1], tile_y[1:]), maximum(tile_y[:-1], tile_y[1:])
+	widths = last_x - first_x + 1
+	counts = widths * (last_y - first_y + 1)
+	segments = repeat(arange(len(counts)), counts)
+	offsets = arange(len(segments)) - repeat(cumsum(counts) - counts, counts)
+	segment_x = first_x[segments] + offsets % widths[segments]
+	segment_y = first_y[segments] + offsets // widths[segments]
+	order = lexsort((segments, segment_y, segment_x))
+	segments, segment_x, segment_y = segments[order], segment_x[order], segment_y[order]
+	piece_starts = concatenate([[0], flatnonzero((diff(segments) != 1) | (diff(segment_x) != 0) | (diff(segment_y) != 0)) + 1])
+	piece_ends = concatenate([piece_starts[1:], [len(segments)]]) - 1
+	return [(int(segment_x[start]), int(segment_y[start]), int(segments[start]), int(segments[end]) + 1) for start, end in zip(piece_starts, piece_ends)]
+
+def make_line_feature(latitudes, longitudes, properties:dict) -> dict:
+	#Makes a GeoJSON LineString feature. GeoJSON stores coordinates as (longitude, latitude).
+	coordinates = [[round(float(longitude), COORDINATE_DECIMALS), round(float(latitude), COORDINATE_DECIMALS)] for latitude, longitude in zip(latitudes, longitudes)]
+	return {"type": "Feature", "geometry": {"type": "LineString", "coordinates": coordinates}, "properties": properties}
+
+class TilePyramidWriter:
+
+	"""
+	Collects the tracks of every video, and writes them as a tile pyramid with a viewer page.
+	Tracks are simplified from the most zoomed in level outwards, so each level is simplified from the previous level's points rather than from the full track.
+	The leaflet sources are where the viewer page loads "leaflet" and "leaflet_css" from, relative to the tile directory, and default to leaflet's CDN.
+	"""
+
+	def __init__(self, tile_directory:str, min_zoom:int=TILE_MIN_ZOOM, max_zoom:int=TILE_MAX_ZOOM, pixel_tolerance:float=TILE_PIXEL_TOLERANCE, method:str=SIMPLIFICATION_METHOD, leaflet_sources:dict=None):
+		self.tile_directory = tile_directory
+		self.leaflet_sources = leaflet_sources or dict(leaflet = f"{LEAFLET_URL}/leaflet.js", leaflet_css = f"{LEAFLET_URL}/leaflet.css")
+		self.min_zoom = min_zoom
+		self.max_zoom = max_zoom
+		self.pixel_tolerance = pixel_tolerance
+		self.method = method or "rdp"
+		self.tracks = []
+		self.tile_count = 0
+		self.feature_count = 0
+
+	def add_tracks(self, video_list:list, routeline_colour:str):
+		#Takes in a list of Video (video.py) or MetaDataFrames (dataframer.py) instances and the colour to draw their route lines in
+		for video in video_list:
+			latitudes, longitudes = get_coordinates(video.gps_df)
+			valid = isfinite(latitudes) & isfinite(longitudes)
+			if valid.sum() >= 2:
+				self.tracks.append((latitudes[valid], longitudes[valid], dict(video = video.video_name, colour = routeline_colour)))
+
+	def write_tile(self, zoom:int, x:int, y:int, features:list):
+		#Writes the features in a tile to {zoom}/{x}/{y}.geojson
+		makedirs(f"{self.tile_directory}\\{zoom}\\{x}", exist_ok = True)
+		with open(f"{self.tile_directory}\\{zoom}\\{x}\\{y}.geojson", "w") as tile_file:
+			tile_file.write(dumps({"type": "FeatureCollection", "features": features}, separators = (",", ":")))
+		self.tile_count += 1
+		self.feature_count += len(features)
+
+	def write_zoom_level(self, zoom:int, tracks:list) -> tuple:
+		#Writes every tile for a zoom level, and returns the tracks simplified for this level, along with the list of tiles written
+		latitude = float(nanmean(concatenate([latitudes for latitudes, longitudes, properties in tracks])))
+		simplifier = TrackSimplifier(self.method, zoom_tolerance(zoom, latitude, self.pixel_tolerance))
+		simplified_tracks = []
+		tiles = {}
+		for latitudes, longitudes, properties in tracks:
+			if len(latitudes) > 2:
+				keep = simplifier.find_kept_points(concatenate([latitudes[:, None], longitudes[:, None]], axis = 1), zeros(len(latitudes), dtype = bool))
+				latitudes, longitudes = latitudes[keep], longitudes[keep]
+			simplified_tracks.append((latitudes, longitudes, properties))
+			for x, y, first, last in split_track_into_tiles(latitudes, longitudes, zoom):
+				tiles.setdefault((x, y), []).append(make_line_feature(latitudes[first:last+1], longitudes[first:last+1], properties))
+		for (x, y), features in tiles.items():
+			self.write_tile(zoom, x, y, features)
+		return simplified_tracks, [f"{x}/{y}" for x, y in tiles]
+
+	def write(self) -> str:
+		"""
+		Writes every zoom level, then a metadata file listing the tiles that exist and the bounds of the data, and the viewer page.
+		Returns a summary of what was written.
+		"""
+		if self.tracks == []:
+			return "No tracks to write to tiles"
+		makedirs(self.tile_directory, exist_ok = True)
+		tracks = self.tracks
+		tile_lists = {}
+		for zoom in range(self.max_zoom, self.min_zoom - 1, -1):
+			tracks, tile_lists[zoom] = self.write_zoom_level(zoom, tracks)
+		all_latitudes = concatenate([latitudes for latitudes, longitudes, properties in self.tracks])
+		all_longitudes = concatenate([longitudes for latitudes, longitudes, properties in self.tracks])
+		metadata = dict(
+			min_zoom = self.min_zoom,
+			max_zoom = self.max_zoom,
+			bounds = [[float(all_latitudes.min()), float(all_longitudes.min())], [float(all_latitudes.max()), float(all_longitudes.max())]],
+			tiles = tile_lists
+			)
+		with open(f"{self.tile_directory}\\metadata.json", "w") as metadata_file:
+			metadata_file.write(dumps(metadata, separators = (",", ":")))
+		with open(f"{self.tile_directory}\\index.html", "w") as viewer_file:
+			viewer_file.write(TILE_VIEWER_TEMPLATE.render(leaflet = self.leaflet_sources["leaflet"], leaflet_css = self.leaflet_sources["leaflet_css"]))
+		return f"Wrote {self.feature_count} track pieces for {len(self.tracks)} videos to {self.tile_count} tiles at zoom levels {self.min_zoom}-{self.max_zoom} in {self.tile_directory}"
+
+TILE_VIEWER_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>Dash Analyser tiled map</title>
+<link rel="stylesheet" href="{{ leaflet_css }}">
+<script src="{{ leaflet }}"></script>
+<style> html, body, #map { height: 100%; margin: 0; } </style>
+</head>
+<body>
+<div id="map"></div>
+<script>
+// Loads only the GeoJSON tiles in view at the nearest zoom level that tiles were written for
+var map = L.map("map", {preferCanvas: true});
+L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", {attribution: "&copy; OpenStreetMap contributors"}).addTo(map);
+var tracks = L.geoJSON(null, {
+	style: function (feature) { return {color: feature.properties.colour, weight: 3}; },
+	onEachFeature: function (feature, layer) { layer.bindPopup(feature.properties.video); }
+}).addTo(map);
+var metadata, available = {}, loaded = {}, tileZoom = null;
+
+function loadVisibleTiles() {
+	var zoom = Math.max(metadata.min_zoom, Math.min(metadata.max_zoom, map.getZoom()));
+	if (zoom !== tileZoom) {
+		tracks.clearLayers();
+		loaded = {};
+		tileZoom = zoom;
+	}
+	var bounds = map.getBounds(), count = Math.pow(2, zoom);
+	function tileX(longitude) { return Math.floor((longitude + 180) / 360 * count); }
+	function tileY(latitude) {
+		var radians = latitude * Math.PI / 180;
+		return Math.floor((1 - Math.log(Math.tan(radians) + 1 / Math.cos(radians)) / Math.PI) / 2 * count);
+	}
+	for (var x = tileX(bounds.getWest()); x <= tileX(bounds.getEast()); x++) {
+		for (var y = tileY(bounds.getNorth()); y <= tileY(bounds.getSouth()); y++) {
+			var key = x + "/" + y;
+			if (available[zoom].has(key) && !loaded[key]) {
+				loaded[key] = true;
+				fetch(zoom + "/" + key + ".geojson").then(function (response) { return response.json(); }).then(function (tile) {
+					if (tileZoom === zoom) { tracks.addData(tile); }
+				});
+			}
+		}
+	}
+}
+
+fetch("metadata.json").then(function (response) { return response.json(); }).then(function (data) {
+	metadata = data;
+	for (var zoom in metadata.tiles) { available[zoom] = new Set(metadata.tiles[zoom]); }
+	map.on("moveend", loadVisibleTiles);
+	map.fitBounds(metadata.bounds);
+});
+</script>
+</body>
+</html>
+""")
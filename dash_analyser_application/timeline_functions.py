@@ -1,25 +1,82 @@
 from plotly.io import to_html
-from pandas import DataFrame
+from pandas import DataFrame, concat
 from plotly.express import timeline
-from dash_analyser_application.timeline_classes import TimelineBar
+from dash_analyser_application.fleet_tracks import FleetTracks
 
-def make_timeline_bars(video_data_handler_list:list) -> list:
+"""
+Makes the timeline from a FleetTracks table (fleet_tracks.py). The first and last time of every video is found by grouping the table's points by video,
+so the timeline's dataframe is built with a few column operations rather than from a bar object per video.
+"""
+
+TIMELINE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S" #format of the start and end times shown when hovering over a bar
+CLIP_BAR_COLOUR = "Clips in each trip" #colour of the bars for the clips in each trip, which are hidden until it is selected in the legend
+
+def make_video_bars(fleet:FleetTracks) -> DataFrame:
+	"""
+	Takes in a FleetTracks instance, and returns a dataframe with a row for each video with any points, holding the information for the video's bar on the timeline
+	The bars are coloured by the exclusion zones the video entered, and are indexed by video name
+	"""
+	clip_times = fleet.clip_times()
+	file_info = fleet.file_info
+	zone_text = file_info["Present in Exclusion Zones"].to_numpy()
+	video_bars = DataFrame(dict(
+		FilePath = file_info["SourceFile"].to_numpy(),
+		Date = clip_times["first"].dt.strftime("%d/%m/%Y").to_numpy(),
+		Start = clip_times["first"].dt.strftime(TIMELINE_TIME_FORMAT).to_numpy(),
+		End = clip_times["last"].dt.strftime(TIMELINE_TIME_FORMAT).to_numpy(),
+		ExclusionZones = zone_text,
+		Colour = zone_text,
+		AverageSpeed = (file_info["AverageSpeed"].astype(str) + " " + file_info["SpeedRef"].astype(str)).to_numpy(),
+		MaxSpeed = (file_info["MaxSpeed"].astype(str) + " " + file_info["SpeedRef"].astype(str)).to_numpy(),
+		FileType = file_info["FileType"].to_numpy(),
+		FileSize = file_info["FileSize"].to_numpy()
+		), index = fleet.video_names)
+	return video_bars[fleet.has_points()]
+
+def make_zone_interval_bars(video_bars:DataFrame, zone_intervals:DataFrame) -> DataFrame:
+	"""
+	Takes in the video bars made by make_video_bars(), and the exclusion zone intervals table for the videos (zone_intervals.py)
+	Returns a dataframe with a bar for each visit to a zone, drawn over the bar for the video it happened in. 
+	Each bar has the same details as the video's, but is coloured by the zone that was visited, with the time spent in the zone shown when hovering over it
+	"""
+	zone_intervals = zone_intervals[zone_intervals["Video"].isin(video_bars.index)]
+	interval_bars = video_bars.loc[zone_intervals["Video"]].reset_index(drop = True)
+	interval_bars["Date"] = zone_intervals["Enter"].dt.strftime("%d/%m/%Y").to_numpy()
+	interval_bars["Start"] = zone_intervals["Enter"].dt.strftime(TIMELINE_TIME_FORMAT).to_numpy()
+	interval_bars["End"] = zone_intervals["Exit"].dt.strftime(TIMELINE_TIME_FORMAT).to_numpy()
+	interval_bars["ExclusionZones"] = ("In " + zone_intervals["Zone Name"] + " for " + zone_intervals["Dwell"].astype(str)).to_numpy()
+	interval_bars["Colour"] = ("In " + zone_intervals["Zone Name"]).to_numpy()
+	return interval_bars
+
+def make_timeline_dataframe(fleet:FleetTracks, zone_intervals:DataFrame=None, bar_label:str="Video") -> DataFrame:
+	"""
+	Takes in a FleetTracks instance, and optionally the exclusion zone intervals table for its videos (zone_intervals.py)
+	Returns a DataFrame containing the information required to make a plotly.express timeline, with a bar for each video
+	If there are any intervals, the video bars are all given the same colour, and a bar coloured by zone is added for each visit to a zone, 
+	so the timeline shows when each video was inside each zone rather than only whether it ever was
+	The bar label is the colour the video bars are given in that case, which is changed for trips (trip_segmentation.py)
+	"""
+	video_bars = make_video_bars(fleet)
+	if zone_intervals is None or zone_intervals.empty:
+		return video_bars.reset_index(drop = True)
+	interval_bars = make_zone_interval_bars(video_bars, zone_intervals)
+	if interval_bars.empty:
+		return video_bars.reset_index(drop = True)
+	return concat([video_bars.assign(Colour = bar_label), interval_bars], ignore_index = True)
+
+def make_trip_timeline_dataframe(trip_fleet:FleetTracks, clip_fleet:FleetTracks, zone_intervals:DataFrame=None) -> DataFrame:
 	"""
-	Takes in a list of either Video (video.py) or MetaDataFrames (dataframer.py) instances
-	Uses these instances to return a list of TimelineBar instances
+	Takes in a FleetTracks instance for a list of Trips (trip_segmentation.py), one for the clips the trips were made from, and optionally the exclusion zone intervals table for the trips
+	Returns a DataFrame with a bar for each trip, followed by a bar for each clip, so a trip's clips can still be seen on the timeline
 	"""
-	timeline_bar_list = [TimelineBar(video_data_handler.gps_df, video_data_handler.file_info_df) for video_data_handler in video_data_handler_list]
-	for bar in timeline_bar_list:
-		bar.make_dictionary_for_bar()
-	return timeline_bar_list
+	clip_bars = make_video_bars(clip_fleet).assign(Colour = CLIP_BAR_COLOUR)
+	return concat([make_timeline_dataframe(trip_fleet, zone_intervals, "Trip"), clip_bars], ignore_index = True)
 
-def make_timeline_dataframe(timeline_bar_list:list) -> DataFrame:
+def hide_clip_bars(timeline:timeline):
 	"""
-	Takes in a list of TimelineBar objects and returns a DataFrame containing the information required to 
-	make a plotly.express timeline
+	Hides the bars for the clips in each trip until they are selected in the timeline's legend, so the timeline shows one bar per trip when it is opened
 	"""
-	df = DataFrame([bar.bar_data for bar in timeline_bar_list])
-	return df
+	timeline.update_traces(visible="legendonly", selector=dict(name=CLIP_BAR_COLOUR))
 
 def make_timeline_figure(df:DataFrame, title:str) -> timeline:
 	"""
@@ -30,7 +87,7 @@ def make_timeline_figure(df:DataFrame, title:str) -> timeline:
 		x_start="Start", 
 		x_end="End", 
 		y="Date", 
-		color="ExclusionZones", 
+		color="Colour", 
 		hover_data=[
 			"FilePath",
 			"Date", 
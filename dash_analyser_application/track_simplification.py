@@ -0,0 +1,194 @@
+from heapq import heapify, heappush, heappop
+from json import dumps
+from numpy import asarray, float64, radians, cos, zeros, flatnonzero, diff, concatenate, sqrt, clip, argmax, abs as absolute, inf, isfinite, arange
+from dash_analyser_application.geometry_encoding import encode_polyline
+
+"""
+Simplifies route lines before they are added to the map, so a month of 1-10Hz GPS tracks doesn't produce a map file hundreds of megabytes in size.
+Points are projected to metres around the track's first point, and then simplified with either the Ramer-Douglas-Peucker or the Visvalingam-Whyatt algorithm.
+For the speed coloured line, every point where the speed moves into a different colour bin (speed_colouring.py) is always kept, so the colours along the line still change in the same places.
+"""
+
+SIMPLIFICATION_METHOD = "rdp" #algorithm used to simplify route lines: "rdp" (Ramer-Douglas-Peucker), "visvalingam" (Visvalingam-Whyatt), or None to plot every point
+SIMPLIFICATION_TOLERANCE = 5 #in metres. RDP removes points closer than this to the simplified line, Visvalingam removes points whose triangle has an area under this squared
+EARTH_RADIUS_METRES = 6371008.8
+
+def project_to_metres(coordinates):
+	#Projects an array of (latitude, longitude) pairs to (x, y) in metres using an equirectangular projection centred on the first point, which is accurate over the length of a trip
+	latitudes = radians(coordinates[:, 0])
+	longitudes = radians(coordinates[:, 1])
+	x = (longitudes - longitudes[0]) * cos(latitudes[0]) * EARTH_RADIUS_METRES
+	y = (latitudes - latitudes[0]) * EARTH_RADIUS_METRES
+	return asarray([x, y]).T
+
+def distances_to_segment(points, start, end):
+	#Returns the distance in metres from each point to the line segment between start and end
+	segment = end - start
+	length_squared = (segment ** 2).sum()
+	if length_squared == 0:
+		return sqrt(((points - start) ** 2).sum(axis=1))
+	along = clip(((points - start) @ segment) / length_squared, 0, 1)
+	closest = start + along[:, None] * segment[None, :]
+	return sqrt(((points - closest) ** 2).sum(axis=1))
+
+def ramer_douglas_peucker(projected, tolerance:float, keep):
+	"""
+	Takes in an array of projected points, a tolerance in metres, and a boolean array of points which must be kept, such as the first and last points.
+	Each stretch between two kept points is replaced by a straight line, unless a point in between is further than the tolerance from it,
+	in which case the furthest point is kept and both halves are checked in the same way. The distances for each stretch are found in one vectorised operation.
+	Returns the updated keep array.
+	"""
+	kept_indices = flatnonzero(keep)
+	stack = list(zip(kept_indices[:-1], kept_indices[1:]))
+	while stack:
+		start, end = stack.pop()
+		if end - start < 2:
+			continue
+		distances = distances_to_segment(projected[start+1:end], projected[start], projected[end])
+		furthest = int(argmax(distances))
+		if distances[furthest] > tolerance:
+			middle = start + 1 + furthest
+			keep[middle] = True
+			stack.append((start, middle))
+			stack.append((middle, end))
+	return keep
+
+def triangle_areas(previous_points, points, next_points):
+	#Returns the area of the triangle formed by each point and its neighbours
+	return absolute((previous_points[:, 0] - next_points[:, 0]) * (points[:, 1] - previous_points[:, 1]) - (previous_points[:, 0] - points[:, 0]) * (next_points[:, 1] - previous_points[:, 1])) / 2
+
+def visvalingam_whyatt(projected, tolerance:float, keep):
+	"""
+	Takes in an array of projected points, a tolerance in metres, and a boolean array of points which must be kept, such as the first and last points.
+	Repeatedly removes the point whose triangle with its neighbours has the smallest area, until every remaining triangle is at least the tolerance squared.
+	The starting areas are found in one vectorised operation, and a heap is used to find the next smallest area as points are removed.
+	Returns the updated keep array.
+	"""
+	point_count = len(projected)
+	areas = zeros(point_count)
+	areas[1:-1] = triangle_areas(projected[:-2], projected[1:-1], projected[2:])
+	areas[keep] = inf
+	previous_index = list(range(-1, point_count - 1))
+	next_index = list(range(1, point_count + 1))
+	removed = zeros(point_count, dtype=bool)
+	heap = [(areas[i], i) for i in range(1, point_count - 1) if areas[i] < tolerance ** 2]
+	heapify(heap)
+	while heap:
+		area, index = heappop(heap)
+		if removed[index] or area != areas[index]:
+			continue
+		removed[index] = True
+		before, after = previous_index[index], next_index[index]
+		next_index[before] = after
+		previous_index[after] = before
+		for neighbour in (before, after):
+			if 0 < neighbour < point_count - 1 and not keep[neighbour]:
+				neighbour_area = float(triangle_areas(projected[[previous_index[neighbour]]], projected[[neighbour]], projected[[next_index[neighbour]]])[0])
+				areas[neighbour] = max(neighbour_area, area) #a point's area can't be less than one already removed, so points are removed in order of significance
+				if areas[neighbour] < tolerance ** 2:
+					heappush(heap, (areas[neighbour], neighbour))
+	return ~removed
+
+class SimplificationReport:
+
+	"""
+	Keeps count of the points and coordinate data removed from route lines over a run, so the tolerance can be tuned.
+	Each track is counted once. A track simplified again under the same key, such as when its speed line adds points to it, replaces its earlier sizes in the totals.
+	Sizes are measured in the form the track is written to the map in: an encoded polyline (geometry_encoding.py) at the given precision, or JSON coordinates if the precision is None.
+	"""
+
+	def __init__(self, precision:int=None):
+		self.precision = precision
+		self.lines = 0
+		self.original_vertices = 0
+		self.simplified_vertices = 0
+		self.original_bytes = 0
+		self.simplified_bytes = 0
+		self.track_sizes = {}
+
+	def update_totals(self, sizes:tuple, sign:int):
+		#Adds (or with a sign of -1, removes) a track's line count, vertex counts and sizes to the totals
+		self.lines += sign * sizes[0]
+		self.original_vertices += sign * sizes[1]
+		self.simplified_vertices += sign * sizes[2]
+		self.original_bytes += sign * sizes[3]
+		self.simplified_bytes += sign * sizes[4]
+
+	def measure(self, points) -> int:
+		#Returns the number of bytes the points take up on the map
+		if self.precision is None:
+			return len(dumps(asarray(points, dtype=float64).tolist()))
+		return len(encode_polyline(points, self.precision))
+
+	def add_line(self, original_points:list, simplified_points:list, track_key:object=None):
+		#Adds a simplified line to the totals, replacing the sizes recorded for the same track key if there are any
+		sizes = (1, len(original_points), len(simplified_points), self.measure(original_points), self.measure(simplified_points))
+		if track_key is not None:
+			if track_key in self.track_sizes:
+				self.update_totals(self.track_sizes[track_key], -1)
+			self.track_sizes[track_key] = sizes
+		self.update_totals(sizes, 1)
+
+	def summary(self) -> str:
+		if self.original_vertices == 0:
+			return "No route lines simplified"
+		return (f"Simplified {self.lines} route lines from {self.original_vertices} to {self.simplified_vertices} points "
+			f"({self.simplified_vertices / self.original_vertices:.1%} kept), "
+			f"saving {(self.original_bytes - self.simplified_bytes) / 1048576:.2f}MB of {'coordinates' if self.precision is None else 'encoded tracks'} ({self.simplified_bytes / max(self.original_bytes, 1):.1%} of original size)")
+
+class TrackSimplifier:
+
+	"""
+	Simplifies the points of a route line with the chosen method and tolerance, recording how much was removed in a SimplificationReport.
+	One simplifier is shared by every route line in a run. The precision is that of the EncodedTrackTable the lines are written to, or None if they are written as JSON coordinates.
+	"""
+
+	def __init__(self, method:str=SIMPLIFICATION_METHOD, tolerance:float=SIMPLIFICATION_TOLERANCE, precision:int=None):
+		self.method = method
+		self.tolerance = tolerance
+		self.report = SimplificationReport(precision)
+
+	def find_kept_points(self, coordinates, keep):
+		#Runs the chosen algorithm on an array of (latitude, longitude) pairs, and returns a boolean array of the points to keep
+		keep[0] = keep[-1] = True
+		projected = project_to_metres(coordinates)
+		if self.method == "visvalingam":
+			return visvalingam_whyatt(projected, self.tolerance, keep)
+		return ramer_douglas_peucker(projected, self.tolerance, keep)
+
+	def simplify_track(self, points, speed_bins=None, kept_indices=None, track_key:object=None):
+		"""
+		Takes in an array of (latitude, longitude) points, and optionally the colour bin of the speed at each point, the indices of points which must be kept, and a key for the track in the report.
+		Every point where the speed moves into a different bin is kept, along with the point before it, so the colour changes in the same place.
+		Passing in the points kept by an earlier simplification of the track keeps all of them, so the track can be added to rather than simplified again from scratch.
+		Returns the indices of the points to keep.
+		"""
+		coordinates = asarray(points, dtype=float64).reshape(-1, 2)
+		if len(coordinates) < 3 or not isfinite(coordinates).all():
+			return arange(len(coordinates))
+		keep = zeros(len(coordinates), dtype=bool)
+		if kept_indices is not None:
+			keep[kept_indices] = True
+		if speed_bins is not None:
+			speed_changes = flatnonzero(diff(speed_bins) != 0)
+			keep[concatenate([speed_changes, speed_changes + 1])] = True
+		kept_indices = flatnonzero(self.find_kept_points(coordinates, keep))
+		self.report.add_line(coordinates, coordinates[kept_indices], track_key)
+		return kept_indices
+
+	def simplify_routeline(self, points) -> "array":
+		#Takes in an array of (latitude, longitude) points and returns the array of simplified points
+		coordinates = asarray(points, dtype=float64).reshape(-1, 2)
+		return coordinates[self.simplify_track(coordinates)]
+
+	def simplify_speed_line(self, points:list, speed_bins) -> tuple:
+		#Takes in an array of (latitude, longitude) points and the colour bin of the speed at each point, and returns the array of simplified points and their bins
+		coordinates = asarray(points, dtype=float64).reshape(-1, 2)
+		kept_indices = self.simplify_track(coordinates, speed_bins)
+		return coordinates[kept_indices], speed_bins[kept_indices]
+
+def make_track_simplifier(method:str=SIMPLIFICATION_METHOD, tolerance:float=SIMPLIFICATION_TOLERANCE, precision:int=None) -> TrackSimplifier:
+	#Returns a TrackSimplifier for the given method, or None if route lines shouldn't be simplified. The precision is that of the track table the lines are written to, if there is one
+	if method is None:
+		return None
+	return TrackSimplifier(method, tolerance, precision)
@@ -0,0 +1,111 @@
+from numpy import arcsin, sqrt, sum as total, nansum, diff
+from pandas import DataFrame, Series, concat, to_numeric, isna
+from dash_analyser_application.geofence import get_coordinates, unit_vectors, EARTH_RADIUS_KM
+from dash_analyser_application.dataframer import format_duration
+
+"""
+Stitches the short clips a dashcam splits its recording into back into the journeys they were recorded on.
+Every clip is sorted by its first DateTime, and a clip which starts less than the gap threshold after the previous clips ended is joined onto the same trip.
+Each trip is drawn on the map as one route line, speed line and start marker, and on the timeline as one bar, rather than one of each per clip.
+The clips are kept with their trip, so the trip's popup and the timeline can still show each clip.
+"""
+
+TRIP_GAP_THRESHOLD = 300 #clips starting less than this many seconds after the previous clip ended are joined into the same trip
+
+class Trip:
+
+	"""
+	Stores the clips in a trip, in the order they were recorded, and combines their data so a trip can be used in place of a Video (video.py) or MetaDataFrames (dataframer.py) instance.
+	gps_df holds every clip's points, and file_info_df is a single row describing the whole trip with the same columns as a clip's.
+	"""
+
+	detail_labels = ["Trip:", "Start:", "End:", "Duration:", "Distance (Kilometres):", "Average Speed:", "Highest Speed:", "Number of Clips:"]
+
+	def __init__(self, clips:list, trip_number:int):
+		self.clips = clips
+		self.video_name = f"Trip {trip_number}"
+		self.gps_df = concat([clip.gps_df for clip in clips], ignore_index = True)
+		self.start = self.gps_df["DateTime"].min()
+		self.end = self.gps_df["DateTime"].max()
+		self.distance = measure_distance(self.gps_df)
+		self.file_info_df = self.make_file_info_df()
+
+	def make_file_info_df(self) -> DataFrame:
+		#Makes a single row dataframe describing the trip, with the same columns as a clip's file info dataframe, so the timeline can use it in the same way
+		first_clip = self.clips[0].file_info_df
+		speeds = to_numeric(self.gps_df["Speed"], errors = "coerce")
+		if len(self.clips) == 1:
+			source_file = first_clip["SourceFile"].iloc[0]
+		else:
+			source_file = f'{first_clip["SourceFile"].iloc[0]} to {self.clips[-1].file_info_df["SourceFile"].iloc[0]} ({len(self.clips)} clips)'
+		return DataFrame(data = [dict(
+			SourceFile = source_file,
+			FileType = first_clip["FileType"].iloc[0],
+			FileSize = f"{len(self.clips)} clips",
+			MIMEType = first_clip["MIMEType"].iloc[0],
+			CreateDate = first_clip["CreateDate"].iloc[0],
+			Duration = "Unknown" if isna(self.end - self.start) else format_duration((self.end - self.start).total_seconds()),
+			MaxSpeed = round(speeds.max(), 2),
+			AverageSpeed = round(speeds.mean(), 2),
+			SpeedRef = first_clip["SpeedRef"].iloc[0],
+			Distance = round(self.distance, 2)
+			)])
+
+	def clip_details(self) -> list:
+		#Returns a label and a description of each clip, for the trip's popup
+		details = []
+		for i, clip in enumerate(self.clips):
+			clip_times = clip.gps_df["DateTime"]
+			details.append((f"Clip {i+1}:", f'{clip.video_name} ({format_time(clip_times.min())} to {format_time(clip_times.max())}, average speed {clip.file_info_df["AverageSpeed"].iloc[0]} {clip.file_info_df["SpeedRef"].iloc[0]})'))
+		return details
+
+	def add_to_popup_table(self, popup_table:"PopupTable") -> int:
+		"""
+		Adds the trip's statistics, followed by a row for each of its clips, to the map's PopupTable (popup_tables.py) and returns the popup's id.
+		Trips with the same number of clips share a template, as the clips are labelled by their position in the trip.
+		"""
+		file_info = self.file_info_df.iloc[0]
+		clip_labels, clip_values = zip(*self.clip_details())
+		values = [self.video_name, self.start, self.end, file_info["Duration"], file_info["Distance"], f'{file_info["AverageSpeed"]} {file_info["SpeedRef"]}', f'{file_info["MaxSpeed"]} {file_info["SpeedRef"]}', len(self.clips)]
+		return popup_table.add_row("Trip Information", ["Trip Attribute(s)", "Value(s)"], self.detail_labels + list(clip_labels), values + list(clip_values))
+
+def measure_distance(gps_df:DataFrame) -> float:
+	#Returns the distance in kilometres along the points of a GPS dataframe, measured as great circle distances between consecutive points
+	latitudes, longitudes = get_coordinates(gps_df)
+	if len(latitudes) < 2:
+		return 0.0
+	chords = sqrt(total(diff(unit_vectors(latitudes, longitudes), axis=0) ** 2, axis=1))
+	return float(nansum(2 * arcsin(chords / 2)) * EARTH_RADIUS_KM)
+
+def format_time(time) -> str:
+	#Formats the time of day a clip started or ended, for the trip's popup
+	return "Unknown" if isna(time) else time.strftime("%H:%M:%S")
+
+def find_trip_numbers(clip_starts:Series, clip_ends:Series, gap_threshold:float=TRIP_GAP_THRESHOLD) -> Series:
+	"""
+	Takes in the first and last DateTime of each clip, and the gap threshold in seconds. Returns the number of the trip each clip is in, starting from 1.
+	Clips are ordered by their start, and a new trip starts wherever a clip starts more than the threshold after every earlier clip has ended.
+	Overlapping clips are in the same trip, and a clip with no DateTime is always a trip of its own.
+	"""
+	clip_times = DataFrame(dict(Start = clip_starts, End = clip_ends)).sort_values("Start", kind = "stable", na_position = "last")
+	gaps = (clip_times["Start"] - clip_times["End"].cummax().shift()).dt.total_seconds()
+	return (~(gaps <= gap_threshold)).cumsum().reindex(clip_starts.index)
+
+def segment_trips(fleet:"FleetTracks", gap_threshold:float=TRIP_GAP_THRESHOLD) -> list:
+	"""
+	Takes in a FleetTracks (fleet_tracks.py) instance holding the clips, and optionally the gap threshold in seconds. The start and end of every clip are found by grouping its table by clip.
+	Returns a list of Trip instances in the order they were recorded. Clips with no GPS data are left out, as they have no route to join.
+	"""
+	has_points = fleet.has_points()
+	clips = [video for video, video_has_points in zip(fleet.videos, has_points) if video_has_points]
+	if clips == []:
+		return []
+	clip_times = fleet.clip_times()[has_points]
+	clip_starts = Series(clip_times["min"].to_numpy())
+	clip_ends = Series(clip_times["max"].to_numpy())
+	trip_numbers = find_trip_numbers(clip_starts, clip_ends, gap_threshold)
+	order = clip_starts.sort_values(kind = "stable", na_position = "last").index
+	trip_clips = {}
+	for clip_index in order:
+		trip_clips.setdefault(trip_numbers[clip_index], []).append(clips[clip_index])
+	return [Trip(trip_clips[trip_number], trip_number) for trip_number in sorted(trip_clips)]
@@ -1,53 +1,154 @@
-from cv2 import VideoCapture, imwrite, CAP_PROP_POS_MSEC, imread, cvtColor, COLOR_BGR2GRAY
-from pytesseract import pytesseract, image_to_string
+from cv2 import VideoCapture, imwrite, CAP_PROP_POS_MSEC, CAP_PROP_FPS, imread, cvtColor, COLOR_BGR2GRAY
+from pytesseract import pytesseract
 from os import system, listdir
 from pandas import DataFrame, to_datetime, to_numeric
 from datetime import datetime
+from time import perf_counter
 from shutil import rmtree
 from pickle import dump, load
 from abc import ABC, abstractmethod
 from dash_analyser_application.convert_coord_to_decimal import dms2dec
+from dash_analyser_application.montage_ocr import report_ocr_cost, OCR_BATCH_SIZE
+from dash_analyser_application.ocr_engines import OCREngine, TesseractEngine
+from dash_analyser_application.frame_dedup import FrameDeduplicator, expand_watermarks, report_avoided_ocr, DEDUPLICATE_FRAMES
+from dash_analyser_application.gps_dtypes import set_compact_dtypes, make_label_column
 
 pytesseract.tesseract_cmd = 'Tesseract-OCR\\tesseract'
 
+FRAME_SAMPLE_RATE = 1 #number of frames sampled per second of video when reading watermarks
+FRAMES_IN_MEMORY = True #if True, cropped frames are passed straight to pytesseract rather than being saved to and read back from the temp directory
+
+class FrameSampler:
+
+	"""
+	Decodes a video once from start to finish and returns the frames which fall on the sampling timestamps.
+	Frames that are not needed are only grabbed, so they are never converted to BGR images, and the decoder never has to seek back to a keyframe.
+	Frames can either be sampled at a rate in frames per second (e.g. 1 or 2), or every Nth frame can be taken by setting frame_step.
+	"""
+
+	def __init__(self, video_file:str, sample_rate:float=FRAME_SAMPLE_RATE, frame_step:int=None):
+		self.video_file = video_file
+		self.sample_rate = sample_rate
+		self.frame_step = frame_step
+		self.frames_decoded = 0
+		self.frames_sampled = 0
+		self.decode_time = 0.0
+
+	def is_sample_frame(self, frame_index:int, timestamp:float) -> bool:
+		#Checks whether the frame at the given index and timestamp (in seconds) should be retrieved
+		if self.frame_step:
+			return frame_index % self.frame_step == 0
+		return timestamp >= self.next_sample_time
+
+	def get_timestamp(self, vidcap:VideoCapture, frame_index:int) -> float:
+		#Works out the timestamp of the last grabbed frame in seconds. The frame rate is used where available as some backends report unreliable positions.
+		if self.video_fps > 0:
+			return frame_index / self.video_fps
+		return vidcap.get(CAP_PROP_POS_MSEC) / 1000
+
+	def sample_frames(self):
+		"""
+		Generator which goes through the video in a single pass, yielding the sample count, timestamp (in seconds) and image for each sampled frame.
+		The number of frames decoded and the time spent in the decoder are recorded so that the decoded frames per second can be reported.
+		Sample times are worked out from the number of sampling intervals passed rather than by adding up the interval, so rates such as 3 per second don't drift off the frames they should land on.
+		"""
+		vidcap = VideoCapture(self.video_file)
+		self.video_fps = vidcap.get(CAP_PROP_FPS)
+		self.next_sample_time = 0.0
+		self.decode_time = 0.0
+		sample_interval_count = 0
+		frame_index = 0
+		while self.time_decoder(vidcap.grab):
+			timestamp = self.get_timestamp(vidcap, frame_index)
+			if self.is_sample_frame(frame_index, timestamp):
+				success, image = self.time_decoder(vidcap.retrieve)
+				if success:
+					yield self.frames_sampled, timestamp, image
+					self.frames_sampled += 1
+				while self.next_sample_time <= timestamp:
+					sample_interval_count += 1
+					self.next_sample_time = sample_interval_count / self.sample_rate
+			frame_index += 1
+		self.frames_decoded = frame_index
+		vidcap.release()
+
+	def time_decoder(self, decoder_call):
+		#Calls grab or retrieve on the video capture and adds the time taken to the decode time. Only these calls are timed, so the time the caller spends on each yielded frame isn't counted
+		start_time = perf_counter()
+		result = decoder_call()
+		self.decode_time += perf_counter() - start_time
+		return result
+
+	def decoded_fps(self) -> float:
+		#Returns the number of frames decoded per second of time spent in the decoder
+		if self.decode_time == 0:
+			return 0.0
+		return self.frames_decoded / self.decode_time
+
+	def report(self) -> str:
+		#Returns a summary of the decoding speed, so that different sample rates can be compared
+		return f"Decoded {self.frames_decoded} frames and sampled {self.frames_sampled} in {self.decode_time:.2f}s ({self.decoded_fps():.1f} decoded fps)"
+
 class Video(ABC):
 
 	"""	
 	A class which forms the base for classes which can process videos from various kinds of dashcams.
 	"""
+
+	ocr_batch_size = OCR_BATCH_SIZE #can be overridden by subclasses to suit the size of each dashcam model's watermark
 	
-	def __init__(self, video_name:str, temp_directory:str, video_directory:str):
+	def __init__(self, video_name:str, temp_directory:str, video_directory:str, sample_rate:float=FRAME_SAMPLE_RATE, frame_step:int=None, frames_in_memory:bool=FRAMES_IN_MEMORY, debug_frame_directory:str=None, ocr_batch_size:int=None, deduplicate_frames:bool=DEDUPLICATE_FRAMES, ocr_engine:OCREngine=None):
 		self.video_name=video_name
 		self.output_folder=f"{temp_directory}\\{video_name}"
 		self.video_file=f"{video_directory}\\{video_name}"
+		self.frame_sampler=FrameSampler(self.video_file, sample_rate, frame_step)
+		self.frames_in_memory=frames_in_memory
+		self.debug_frame_directory=debug_frame_directory
+		self.frame_crops=[]
+		if ocr_batch_size:
+			self.ocr_batch_size=ocr_batch_size
+		self.deduplicator=FrameDeduplicator() if deduplicate_frames else None
+		self.ocr_engine=ocr_engine or TesseractEngine(self.ocr_batch_size) #the engine used to read the watermarks can be swapped for any OCREngine (ocr_engines.py)
 
 	@abstractmethod
 	def get_image_crop_indices(self):
 		pass
 
-	def extract_frames(self):
-		#Goes through the video frame by frame using cv2, extracting one frame per second and saving that frame as a .jpg
-		system(f"mkdir {self.output_folder}")
-		vidcap = VideoCapture(self.video_file)
-		success,image = vidcap.read()
-		count = 0
-		while success:
-			vidcap.set(CAP_PROP_POS_MSEC, (count*1000))
-			#the below if condition causes files with a single digit count to be saved with a double digit number. This keeps the extracted frames in order.
-			if count < 10:
-				frame_name = f"{self.video_name[0:-4]}_frame00{count}.jpg"
-			elif count <100: 
-				frame_name = f"{self.video_name[0:-4]}_frame0{count}.jpg"
-			else:
-				frame_name = f"{self.video_name[0:-4]}_frame{count}.jpg"
-
+	def make_frame_name(self, count:int) -> str:
+		#the below if condition causes files with a single digit count to be saved with a double digit number. This keeps the extracted frames in order.
+		if count < 10:
+			frame_name = f"{self.video_name[0:-4]}_frame00{count}.jpg"
+		elif count <100: 
+			frame_name = f"{self.video_name[0:-4]}_frame0{count}.jpg"
+		else:
+			frame_name = f"{self.video_name[0:-4]}_frame{count}.jpg"
+		return frame_name
 
+	def extract_frames(self) -> list:
+		"""
+		Goes through the video once using the FrameSampler, cropping each sampled frame to the watermark and grayscaling it.
+		The crops are kept in memory and returned. If frames_in_memory is False, they are instead saved as .jpg files for read_watermarks to read back.
+		If a debug frame directory has been given, the crops are also saved there so that they can be inspected.
+		"""
+		if not self.frames_in_memory:
+			system(f"mkdir {self.output_folder}")
+		if self.debug_frame_directory:
+			system(f"mkdir {self.debug_frame_directory}\\{self.video_name}")
+		self.frame_crops=[]
+		for count, timestamp, image in self.frame_sampler.sample_frames():
+			frame_name = self.make_frame_name(count)
 			print(frame_name)
 
-			imwrite(f"{self.output_folder}\\{frame_name}", cvtColor(image[self.y_lower:self.y_upper, self.x_lower:self.x_upper], COLOR_BGR2GRAY))
+			crop = cvtColor(image[self.y_lower:self.y_upper, self.x_lower:self.x_upper], COLOR_BGR2GRAY)
+			if self.frames_in_memory:
+				self.frame_crops.append(crop)
+			else:
+				imwrite(f"{self.output_folder}\\{frame_name}", crop)
+			if self.debug_frame_directory:
+				imwrite(f"{self.debug_frame_directory}\\{self.video_name}\\{frame_name}", crop)
 
-			success,image = vidcap.read()
-			count += 1
+		print(self.frame_sampler.report())
+		return self.frame_crops
 
 	@abstractmethod
 	def make_start_string(self):
@@ -65,16 +166,44 @@ class Video(ABC):
 				trimmed_watermark = trimmed_watermark[1:]
 			self.watermarks[i] = trimmed_watermark
 
+	def load_frames(self):
+		#Generator which yields the name and image of each extracted frame, either from memory or from the frames saved in the temp directory
+		if self.frames_in_memory:
+			for count, crop in enumerate(self.frame_crops):
+				yield self.make_frame_name(count), crop
+		else:
+			for frame in listdir(self.output_folder):
+				yield frame, imread(f'{self.output_folder}\\{frame}')
+
+	def find_unique_frames(self, images:list) -> tuple:
+		"""
+		Takes in the list of cropped frames, and returns the frames that need to be read along with a list mapping each frame to its unique frame.
+		If deduplication is turned off, every frame is unique.
+		"""
+		if self.deduplicator is None:
+			return images, list(range(len(images)))
+		unique_images, frame_map = self.deduplicator.find_unique_frames(images)
+		print(report_avoided_ocr(len(images), len(unique_images)))
+		return unique_images, frame_map
+
 	def read_watermarks(self):
-		#Goes through the saved frames of the video one by one and uses pytesseract to read the watermarks
-		self.frames=listdir(self.output_folder)
-		self.watermarks=[]
-		for frame in self.frames:
-			image = imread(f'{self.output_folder}\\{frame}')
-			custom_config = r'--oem 3 --psm 6'
-			tesseract_output = pytesseract.image_to_string(image, config=custom_config)
-			print(f"Read {frame}")
-			self.watermarks.append(tesseract_output)
+		"""
+		Goes through the extracted frames of the video and uses the OCR engine (pytesseract by default) to read the watermarks.
+		Frames whose watermark has not changed since an earlier frame reuse that frame's output rather than being read again.
+		"""
+		unique_images, frame_map = self.find_unique_frames([image for frame, image in self.load_frames()])
+		start_time = perf_counter()
+		self.ocr_engine.prepare(unique_images)
+		unique_watermarks = self.ocr_engine.read_watermarks(unique_images)
+		print(report_ocr_cost(len(unique_watermarks), perf_counter() - start_time, self.ocr_batch_size))
+		self.watermarks = expand_watermarks(unique_watermarks, frame_map)
+
+	def remove_frames(self):
+		#Releases the frame crops held in memory, or removes the saved frames from the temp directory
+		if self.frames_in_memory:
+			self.frame_crops=[]
+		else:
+			rmtree(self.output_folder)
 
 	def split_watermark_output(self):
 		#Splits the string output from the pytesseract read into individual strings separated by spaces.
@@ -127,10 +256,11 @@ class Video(ABC):
 
 	def add_dataframe_source_label(self):
 		#When making a speed chart in altair with multiple lines, in order to make a legend the dataframe needs a column to identify it by
-		self.gps_df["DataSource"] = len(self.gps_df.index) * ["Read metadata from watermarks using pytesseract"]
+		self.gps_df["DataSource"] = make_label_column("Read metadata from watermarks using pytesseract", len(self.gps_df.index))
 
-	def make_points(self):
-		self.gps_df["Latitude, Longitude"] = list(self.gps_df[["Latitude", "Longitude"]].to_records(index=False))
+	def set_compact_dtypes(self):
+		#Stores the coordinates and speed as floats and the speed reference as a categorical (see gps_dtypes.py). The map makes (latitude, longitude) pairs from the coordinate columns when it needs them
+		self.gps_df = set_compact_dtypes(self.gps_df, ["Latitude", "Longitude"], "Speed Ref")
 
 	def make_file_info_df(self):
 		#Make a dataframe containing file information fields that are the same as for the file information extracted using ExifTool.
@@ -142,8 +272,8 @@ class Video(ABC):
 			MIMEType = "Unknown - this data was extracted using OCR", 
 			CreateDate = str(self.gps_df["DateTime"].iloc[0]), 
 			Duration = str(self.gps_df["DateTime"].iloc[-1] - self.gps_df["DateTime"].iloc[0]),
-			MaxSpeed = round(self.gps_df["Speed"].max(), 2),
-			AverageSpeed = round(self.gps_df["Speed"].mean(), 2),
+			MaxSpeed = round(float(self.gps_df["Speed"].max()), 2),
+			AverageSpeed = round(float(self.gps_df["Speed"].mean()), 2),
 			SpeedRef = self.gps_df["Speed Ref"].iloc[0]
 			)
 		self.file_info_df = DataFrame(data = [file_info_dictionary])
@@ -354,15 +484,16 @@ class Nextbase422Video(Video):
 			self.watermarks.remove(watermark) # If the watermark will not convert to a datetime, it has likely been misread by the OCR, so is discarded
 		watermark.remove(watermark[-1])
 
-def make_video(video_name:str, temp_directory:str, input_dir:str, dashcam_type:str) -> Video:
+def make_video(video_name:str, temp_directory:str, input_dir:str, dashcam_type:str, **video_options) -> Video:
 	"""
 	Uses the dashcam type string to determine what Video type to initiate, and returns that video type
+	Any video options (e.g. sample_rate, frame_step, frames_in_memory, debug_frame_directory) are passed on to the Video instance
 	"""
 	if dashcam_type == "GARMIN":
-		return GARMINVideo(video_name, temp_directory, input_dir)
+		return GARMINVideo(video_name, temp_directory, input_dir, **video_options)
 	elif dashcam_type=="Nextbase 312GW":
-		return Nextbase312Video(video_name, temp_directory, input_dir)
+		return Nextbase312Video(video_name, temp_directory, input_dir, **video_options)
 	elif dashcam_type=="MiVue":
-		return MiVueVideo(video_name, temp_directory, input_dir)
+		return MiVueVideo(video_name, temp_directory, input_dir, **video_options)
 	elif dashcam_type=="Nextbase 422GW":
-		return Nextbase422Video(video_name, temp_directory, input_dir)
\ No newline at end of file
+		return Nextbase422Video(video_name, temp_directory, input_dir, **video_options)
\ No newline at end of file
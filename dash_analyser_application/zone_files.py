@@ -0,0 +1,57 @@
+from json import load
+from pandas import read_csv
+
+"""
+Loads exclusion zones in bulk from a file, rather than typing each one into the exclusion zone screen.
+Each loader returns a list of dictionaries in the same format the exclusion zone screen makes, with a "Location" (latitude, longitude) tuple and a "Radius" in kilometres,
+and optionally a "Name", so they can be passed straight to make_exclusion_zones (parse_options_and_make_files.py).
+Polygon zones, such as those exported by the map's draw tool (my_data.geojson), are instead given "Polygons": a list of polygons, each a list of rings of (latitude, longitude) vertices.
+"""
+
+CSV_LATITUDE_COLUMN = "Latitude"
+CSV_LONGITUDE_COLUMN = "Longitude"
+CSV_RADIUS_COLUMN = "Radius" #radius of each zone in kilometres
+CSV_NAME_COLUMN = "Name" #optional column naming each zone, such as the school or depot it surrounds
+GEOJSON_RADIUS_PROPERTY = "radius" #property holding the radius of a Point feature in metres, as used by leaflet circles
+GEOJSON_NAME_PROPERTY = "name" #optional property naming a feature's zone
+
+def load_csv_zones(zone_file:str) -> list:
+	#Reads a CSV file with a row per zone, containing the latitude, longitude and radius of the zone and optionally its name
+	zone_df = read_csv(zone_file)
+	names = zone_df[CSV_NAME_COLUMN].astype(str) if CSV_NAME_COLUMN in zone_df.columns else [None] * len(zone_df.index)
+	return [
+		dict(Location = (float(latitude), float(longitude)), Radius = float(radius), Name = name)
+		for latitude, longitude, radius, name in zip(zone_df[CSV_LATITUDE_COLUMN], zone_df[CSV_LONGITUDE_COLUMN], zone_df[CSV_RADIUS_COLUMN], names)
+		]
+
+def swap_ring_coordinates(ring:list) -> list:
+	#GeoJSON stores coordinates as (longitude, latitude), so they are swapped to match the rest of the tool
+	return [(vertex[1], vertex[0]) for vertex in ring]
+
+def load_geojson_zones(zone_file:str) -> list:
+	"""
+	Reads a GeoJSON file, and makes a zone for every Point feature which has a radius property in metres, and for every Polygon or MultiPolygon feature.
+	The file can be a FeatureCollection, such as the file exported by the map's draw tool, or a single Feature.
+	"""
+	with open(zone_file, encoding="utf-8") as file:
+		geojson = load(file)
+	features = geojson.get("features", [geojson] if geojson.get("type") == "Feature" else [])
+	zone_list = []
+	for feature in features:
+		geometry = feature.get("geometry") or {}
+		properties = feature.get("properties") or {}
+		name = properties.get(GEOJSON_NAME_PROPERTY)
+		if geometry.get("type") == "Point" and GEOJSON_RADIUS_PROPERTY in properties:
+			longitude, latitude = geometry["coordinates"][:2]
+			zone_list.append(dict(Location = (latitude, longitude), Radius = float(properties[GEOJSON_RADIUS_PROPERTY]) / 1000, Name = name))
+		elif geometry.get("type") == "Polygon" and geometry.get("coordinates"):
+			zone_list.append(dict(Polygons = [[swap_ring_coordinates(ring) for ring in geometry["coordinates"]]], Name = name))
+		elif geometry.get("type") == "MultiPolygon" and geometry.get("coordinates"):
+			zone_list.append(dict(Polygons = [[swap_ring_coordinates(ring) for ring in polygon] for polygon in geometry["coordinates"]], Name = name))
+	return zone_list
+
+def load_exclusion_zone_file(zone_file:str) -> list:
+	#Uses the file extension to determine which loader to use, and returns the list of zone dictionaries read from the file
+	if zone_file.lower().endswith((".geojson", ".json")):
+		return load_geojson_zones(zone_file)
+	return load_csv_zones(zone_file)
@@ -0,0 +1,67 @@
+from numpy import concatenate, flatnonzero, zeros, ones, vstack, asarray
+from pandas import DataFrame
+
+"""
+Finds every visit to each exclusion zone, with the time the vehicle entered and left the zone and how long it stayed.
+The per-point zone columns added by test_exclusion_zones (mapper_functions.py) are read from the FleetTracks table (fleet_tracks.py) holding every video's points, and each column is run-length encoded,
+so the intervals for the whole intake are found in one pass with no Python loop over rows.
+"""
+
+INTERVAL_COLUMNS = ["Zone", "Zone Name", "Video", "Enter", "Exit", "Dwell", "Points"]
+
+def find_mask_runs(zone_mask, video_starts):
+	"""
+	Takes in a boolean array of shape (points, zones) and a boolean array which is True at the first point of each video.
+	Returns arrays of the zone index, first row and last row of every run of True values in each column. Runs are split where a new video starts.
+	The runs are ordered by zone, then by row.
+	"""
+	point_count, zone_count = zone_mask.shape
+	video_ends = concatenate([video_starts[1:], ones(1, dtype=bool)]) if point_count else zeros(0, dtype=bool)
+	previous_mask = vstack([zeros((1, zone_count), dtype=bool), zone_mask[:-1]])
+	next_mask = vstack([zone_mask[1:], zeros((1, zone_count), dtype=bool)])
+	run_starts = zone_mask & (~previous_mask | video_starts[:, None])
+	run_ends = zone_mask & (~next_mask | video_ends[:, None])
+	start_positions = flatnonzero(run_starts.T)
+	end_positions = flatnonzero(run_ends.T)
+	return start_positions // point_count, start_positions % point_count, end_positions % point_count
+
+def get_zone_name(exclusion_zone, zone_number:int) -> str:
+	#Returns the name of a zone for the intervals table, falling back to its number if it wasn't given a name
+	return getattr(exclusion_zone, "name", None) or f"Zone {zone_number}"
+
+def make_zone_intervals(fleet:"FleetTracks", exclusion_zones:list) -> DataFrame:
+	"""
+	Takes in a FleetTracks (fleet_tracks.py) instance whose points have been tested against the exclusion zones, and the list of ExclusionZone instances.
+	Returns a dataframe with a row for every time a video entered a zone, giving the zone's number and name, the video, and the time of the first and last point inside the zone.
+	Dwell is the time between those points, so a visit seen at only one point has a dwell of zero.
+	"""
+	zone_columns = [f"In Exclusion Zone {i+1}" for i in range(len(exclusion_zones))]
+	if zone_columns == [] or len(fleet.points.index) == 0:
+		return DataFrame(columns = INTERVAL_COLUMNS)
+	video_codes = fleet.points["video_id"].cat.codes.to_numpy()
+	video_starts = zeros(len(video_codes), dtype=bool)
+	video_starts[fleet.offsets[:-1][fleet.has_points()]] = True
+	zone_indices, start_rows, end_rows = find_mask_runs(fleet.points[zone_columns].to_numpy(dtype=bool), video_starts)
+	datetimes = fleet.points["DateTime"].to_numpy()
+	intervals = DataFrame(dict(
+		Zone = zone_indices + 1,
+		Video = asarray(fleet.video_names, dtype=object)[video_codes[start_rows]],
+		Enter = datetimes[start_rows],
+		Exit = datetimes[end_rows],
+		Points = end_rows - start_rows + 1
+		))
+	zone_names = asarray([get_zone_name(exclusion_zone, i+1) for i, exclusion_zone in enumerate(exclusion_zones)], dtype=object)
+	intervals["Zone Name"] = zone_names[zone_indices]
+	intervals["Dwell"] = intervals["Exit"] - intervals["Enter"]
+	return intervals[INTERVAL_COLUMNS].sort_values(["Enter", "Zone"], kind = "stable").reset_index(drop = True)
+
+def summarise_dwell_by_zone(intervals:DataFrame) -> DataFrame:
+	#Returns the number of visits and the total dwell time for each zone in an intervals table
+	if len(intervals.index) == 0:
+		return DataFrame(columns = ["Zone", "Zone Name", "Visits", "TotalDwell"])
+	return intervals.groupby(["Zone", "Zone Name"]).agg(Visits = ("Dwell", "size"), TotalDwell = ("Dwell", "sum")).reset_index()
+
+def save_zone_intervals(intervals:DataFrame, output_directory:str):
+	#Saves the intervals table, and the number of visits and total dwell time for each zone, as CSV files in the output directory
+	intervals.to_csv(path_or_buf = f"{output_directory}\\exclusion_zone_intervals.csv", sep = ",", index = False)
+	summarise_dwell_by_zone(intervals).to_csv(path_or_buf = f"{output_directory}\\exclusion_zone_dwell.csv", sep = ",", index = False)
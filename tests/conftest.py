@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+from numpy import array
+from pandas import DataFrame, Timestamp, date_range
+import pytest
+
+def build_clip(video_name:str, start, point_count:int=None, zone_masks:list=()) -> SimpleNamespace:
+	"""
+	Stands in for a Video (video.py) or MetaDataFrames (dataframer.py) instance, with a point every second from the start time heading north at 30 km/h.
+	Zone masks add an "In Exclusion Zone i" column per zone, as test_exclusion_zones (mapper_functions.py) does, and set the number of points if it isn't given.
+	"""
+	if point_count is None:
+		point_count = len(zone_masks[0])
+	gps_df = DataFrame(dict(
+		Latitude = [51.5 + i * 0.001 for i in range(point_count)],
+		Longitude = [-0.1] * point_count,
+		Speed = [30.0] * point_count,
+		DateTime = date_range(Timestamp(start), periods = point_count, freq = "s")
+		))
+	for i, zone_mask in enumerate(zone_masks):
+		gps_df[f"In Exclusion Zone {i+1}"] = array(zone_mask, dtype=bool)
+	file_info_df = DataFrame([dict(
+		SourceFile = video_name, FileType = "MP4", FileSize = "10 MB", MIMEType = "video/mp4", CreateDate = "", Duration = f"{point_count} s",
+		SpeedRef = "km/h", AverageSpeed = 30.0, MaxSpeed = 30.0
+		)])
+	return SimpleNamespace(video_name = video_name, gps_df = gps_df, file_info_df = file_info_df)
+
+@pytest.fixture
+def make_clip():
+	#Returns the function which makes a stand in video, so tests can make as many as they need
+	return build_clip
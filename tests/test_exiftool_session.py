@@ -0,0 +1,97 @@
+import sys
+from os import chmod
+from shutil import which
+from pytest import fixture, raises, mark
+from dash_analyser_application.exiftool_session import ExifToolSession, ExifToolPool
+
+FAKE_EXIFTOOL = """#!{python}
+#Stands in for exiftool -stay_open. Each command's arguments are echoed back as one line, along with the command line arguments the process was started with.
+#A command containing "crash" makes the process exit, and one containing "hang" makes it stop responding
+import sys, time
+arguments = []
+for line in sys.stdin:
+	argument = line.rstrip("\\n")
+	if arguments == ["-stay_open"] and argument == "False":
+		sys.exit(0)
+	if argument != "-execute":
+		arguments.append(argument)
+		continue
+	if "crash" in arguments:
+		sys.exit(1)
+	if "hang" in arguments:
+		time.sleep(60)
+	print("|".join(arguments))
+	print("started with " + " ".join(sys.argv[1:]))
+	print("{{ready}}", flush=True)
+	arguments = []
+"""
+
+@fixture
+def fake_exiftool(tmp_path) -> str:
+	script_file = tmp_path / "exiftool"
+	script_file.write_text(FAKE_EXIFTOOL.format(python = sys.executable), encoding = "utf-8")
+	chmod(script_file, 0o755)
+	return str(script_file)
+
+only_on_unix = mark.skipif(sys.platform == "win32", reason = "the stand-in exiftool is run as a script using its #! line")
+
+@only_on_unix
+def test_runs_commands_on_one_process(fake_exiftool):
+	session = ExifToolSession(fake_exiftool)
+	first_process = session.process
+	assert session.execute(["-json", "a.MP4"]).split("\n")[0] == "-json|a.MP4"
+	assert session.execute(["-json", "b.MP4"]).split("\n")[0] == "-json|b.MP4"
+	assert session.process is first_process and session.commands_run == 2
+	session.close()
+	assert session.process.returncode == 0
+
+@only_on_unix
+def test_file_names_are_read_as_utf8(fake_exiftool):
+	session = ExifToolSession(fake_exiftool)
+	output_lines = session.execute(["-json", "Fahrt über Brücke.MP4"]).split("\n")
+	assert output_lines[0] == "-json|Fahrt über Brücke.MP4"
+	assert output_lines[1] == "started with -stay_open True -@ - -common_args -charset filename=utf8"
+	session.close()
+
+@only_on_unix
+def test_restarts_when_exiftool_exits_during_a_command(fake_exiftool):
+	session = ExifToolSession(fake_exiftool)
+	with raises(OSError):
+		session.execute(["crash"])
+	assert session.restarts == 1
+	assert session.execute(["a.MP4"]).startswith("a.MP4\n")
+	session.close()
+
+@only_on_unix
+def test_restarts_when_exiftool_died_between_commands(fake_exiftool):
+	session = ExifToolSession(fake_exiftool)
+	session.process.kill()
+	session.process.wait()
+	assert session.execute(["a.MP4"]).startswith("a.MP4\n")
+	assert session.restarts == 1
+	session.close()
+
+@only_on_unix
+def test_restarts_when_exiftool_stops_responding(fake_exiftool):
+	session = ExifToolSession(fake_exiftool, timeout = 0.5)
+	with raises(OSError):
+		session.execute(["hang"])
+	assert session.restarts == 1
+	assert session.execute(["a.MP4"]).startswith("a.MP4\n")
+	session.close()
+
+@only_on_unix
+def test_pool_keeps_going_after_a_failed_command(fake_exiftool):
+	with ExifToolPool(1, fake_exiftool) as exiftool:
+		with raises(OSError):
+			exiftool.execute(["crash"])
+		assert exiftool.execute(["a.MP4"]).startswith("a.MP4\n")
+
+@mark.skipif(which("exiftool") is None, reason = "exiftool is not installed")
+def test_real_exiftool_reads_non_ascii_file_names(tmp_path):
+	file_path = tmp_path / "Fahrt über Brücke.txt"
+	file_path.write_text("dashcam", encoding = "utf-8")
+	session = ExifToolSession()
+	assert session.execute(["-ver"]).strip() != ""
+	assert session.execute(["-s3", "-FileName", str(file_path)]).strip() == "Fahrt über Brücke.txt"
+	session.close()
@@ -0,0 +1,55 @@
+from cv2 import putText, dilate, FONT_HERSHEY_SIMPLEX, LINE_AA
+from numpy import full, ones, uint8, clip
+from numpy.random import default_rng
+from dash_analyser_application.frame_dedup import FrameDeduplicator, perceptual_hash, hamming_distance, expand_watermarks, HASH_TOLERANCE
+
+WATERMARK = "14/06/2021 12:00:01 N51.50123 W0.12345 045KM/H"
+
+def make_crop(text:str):
+	#Renders a watermark the size of a Garmin crop, light text on a dark background
+	crop = full((25, 1000), 40, dtype = uint8)
+	putText(crop, text, (5, 18), FONT_HERSHEY_SIMPLEX, 0.7, 230, 1, LINE_AA)
+	return crop
+
+def one_character_changes(text:str) -> list:
+	#Every watermark which differs from the text by a single digit
+	return [text[:i] + digit + text[i+1:] for i, character in enumerate(text) if character.isdigit() for digit in "0123456789" if digit != character]
+
+def add_background_noise(crop, seed:int):
+	#Adds noise of up to 2 levels to the pixels away from the text, like the flicker left by video compression in a flat background
+	text_area = dilate((crop > 40).astype(uint8), ones((5, 5), dtype = uint8)) > 0
+	noise = default_rng(seed).integers(-2, 3, crop.shape)
+	noise[text_area] = 0
+	return clip(crop.astype(int) + noise, 0, 255).astype(uint8)
+
+def test_identical_crops_reuse_the_first_read_of_them():
+	a, b = make_crop(WATERMARK), make_crop(WATERMARK.replace("01 N", "02 N"))
+	unique_images, frame_map = FrameDeduplicator().find_unique_frames([a, a.copy(), b, a.copy(), b.copy()])
+	assert len(unique_images) == 2
+	assert frame_map == [0, 0, 1, 0, 1]
+	assert expand_watermarks(["first", "second"], frame_map) == ["first", "first", "second", "first", "second"]
+
+def test_one_character_change_is_never_merged():
+	changes = one_character_changes(WATERMARK)
+	for deduplicator in [FrameDeduplicator(), FrameDeduplicator(fuzzy = True)]:
+		for changed_watermark in changes:
+			unique_images, frame_map = deduplicator.find_unique_frames([make_crop(WATERMARK), make_crop(changed_watermark)])
+			assert frame_map == [0, 1], changed_watermark
+
+def test_one_character_change_moves_the_hash_beyond_the_tolerance():
+	original_hash = perceptual_hash(make_crop(WATERMARK))
+	closest = min(hamming_distance(original_hash, perceptual_hash(make_crop(changed_watermark))) for changed_watermark in one_character_changes(WATERMARK))
+	assert closest > HASH_TOLERANCE
+
+def test_noise_is_only_merged_when_fuzzy():
+	crop = make_crop(WATERMARK)
+	noisy_crops = [add_background_noise(crop, seed) for seed in range(5)]
+	unique_images, frame_map = FrameDeduplicator().find_unique_frames([crop] + noisy_crops)
+	assert frame_map == list(range(6))
+	unique_images, frame_map = FrameDeduplicator(fuzzy = True).find_unique_frames([crop] + noisy_crops)
+	assert frame_map == [0] * 6
+
+def test_fuzzy_matches_are_against_the_previous_unique_crop():
+	a, b = make_crop(WATERMARK), make_crop(WATERMARK.replace("045KM", "046KM"))
+	unique_images, frame_map = FrameDeduplicator(fuzzy = True).find_unique_frames([a, b, add_background_noise(a, 0)])
+	assert frame_map == [0, 1, 2]
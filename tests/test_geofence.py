@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+from numpy import array, nan, zeros
+from numpy.random import default_rng
+from geopy import distance
+import dash_analyser_application.geofence as geofence
+
+def make_circle_zone(latitude:float, longitude:float, radius_km:float) -> SimpleNamespace:
+	#Stands in for an ExclusionZone (mapper_classes.py), which the zone index only reads the location and radius of
+	return SimpleNamespace(location = (latitude, longitude), radius_km = radius_km, polygons = None)
+
+def query_zones(exclusion_zones:list, latitudes:list, longitudes:list, refinement_band:float=geofence.GEODESIC_REFINEMENT_BAND):
+	#Returns a (points, zones) boolean array of which points are inside which zones
+	zone_index = geofence.make_zone_index(exclusion_zones)
+	latitudes, longitudes = array(latitudes, dtype=float), array(longitudes, dtype=float)
+	inside = zeros((len(latitudes), len(exclusion_zones)), dtype=bool)
+	point_indices, zone_indices = zone_index.query(latitudes, longitudes, refinement_band)
+	inside[point_indices, zone_indices] = True
+	return inside
+
+def test_circle_edges_north_and_east():
+	centre = (51.5, -0.1)
+	points = [centre] + [distance.distance(kilometers = km).destination(centre, bearing = bearing) for km, bearing in [(0.95, 0), (1.05, 0), (0.95, 90), (1.05, 90)]]
+	inside = query_zones([make_circle_zone(*centre, 1.0)], [point[0] for point in points], [point[1] for point in points])
+	assert inside[:, 0].tolist() == [True, True, False, True, False]
+
+def test_circles_match_geodesic_distances():
+	rng = default_rng(0)
+	centres = [(51.5, -0.1), (51.52, -0.08), (40.0, -74.0)]
+	radii = [0.5, 1.2, 2.0]
+	latitudes = 51.51 + rng.uniform(-0.03, 0.03, 2000)
+	longitudes = -0.09 + rng.uniform(-0.05, 0.05, 2000)
+	inside = query_zones([make_circle_zone(*centre, radius) for centre, radius in zip(centres, radii)], latitudes, longitudes)
+	for zone, (centre, radius) in enumerate(zip(centres, radii)):
+		expected = [distance.distance(centre, (latitude, longitude)).km <= radius for latitude, longitude in zip(latitudes, longitudes)]
+		assert inside[:, zone].tolist() == expected
+
+def test_missing_coordinates_are_never_inside():
+	inside = query_zones([make_circle_zone(51.5, -0.1, 1.0)], [51.5, nan, 51.5], [-0.1, -0.1, nan])
+	assert inside[:, 0].tolist() == [True, False, False]
+
+def test_no_zones():
+	assert query_zones([], [51.5], [-0.1]).shape == (1, 0)
+
+def test_chord_lengths_order_like_great_circle_distances():
+	#A quarter of the way around the earth is a chord of length sqrt(2) on the unit sphere
+	vectors = geofence.unit_vectors(array([0.0, 0.0, 90.0]), array([0.0, 90.0, 0.0]))
+	chords = geofence.chord_lengths_squared(vectors[[0, 0]], vectors[[1, 2]])
+	assert abs(chords[0] - 2) < 1e-12 and abs(chords[1] - 2) < 1e-12
+	quarter = 3.141592653589793 / 2 * geofence.EARTH_RADIUS_KM
+	assert abs(geofence.radius_to_chord_squared(array([quarter]))[0] - 2) < 1e-9
+
+def make_polygon_zone(polygons:list) -> SimpleNamespace:
+	#Stands in for a PolygonExclusionZone (mapper_classes.py): a list of polygons, each a list of rings of (latitude, longitude) vertices
+	return SimpleNamespace(polygons = polygons)
+
+SQUARE = [(51.0, 0.0), (51.0, 1.0), (52.0, 1.0), (52.0, 0.0)]
+HOLE = [(51.4, 0.4), (51.4, 0.6), (51.6, 0.6), (51.6, 0.4)]
+TRIANGLE = [(40.0, 10.0), (40.0, 12.0), (42.0, 10.0), (40.0, 10.0)]
+
+def test_ray_cast_square():
+	edge_starts, edge_ends = geofence.make_edges([SQUARE])
+	inside = geofence.ray_cast(array([51.5, 51.5, 52.5, 51.5]), array([0.5, 1.5, 0.5, -0.5]), edge_starts, edge_ends)
+	assert inside.tolist() == [True, False, False, False]
+
+def test_polygon_with_hole_and_multipolygon():
+	latitudes = [51.2, 51.5, 40.5, 41.5, 41.5, 45.0]
+	longitudes = [0.2, 0.5, 10.5, 10.2, 11.8, 11.0]
+	inside = query_zones([make_polygon_zone([[SQUARE, HOLE], [TRIANGLE]])], latitudes, longitudes)
+	assert inside[:, 0].tolist() == [True, False, True, True, False, False]
+
+def test_circle_and_polygon_zones_keep_their_numbers():
+	zones = [make_polygon_zone([[TRIANGLE]]), make_circle_zone(51.5, -0.1, 1.0), make_polygon_zone([[SQUARE]])]
+	inside = query_zones(zones, [40.5, 51.5, 51.5], [10.5, -0.1, 0.5])
+	assert inside.tolist() == [[True, False, False], [False, True, False], [False, False, True]]
+
+def test_ray_cast_in_chunks(monkeypatch):
+	#Splitting the points into chunks must not change the result
+	monkeypatch.setattr(geofence, "MAX_EDGE_PAIRS", 8)
+	edge_starts, edge_ends = geofence.make_edges([SQUARE, HOLE])
+	latitudes = array([51.2, 51.5, 52.5, 51.7, 51.45])
+	longitudes = array([0.2, 0.5, 0.5, 0.9, 0.45])
+	assert geofence.ray_cast(latitudes, longitudes, edge_starts, edge_ends).tolist() == [True, False, False, True, False]
+
+def geodesic_inside(centre:tuple, radius_km:float, latitudes, longitudes) -> list:
+	return [distance.distance(centre, (latitude, longitude)).km <= radius_km for latitude, longitude in zip(latitudes, longitudes)]
+
+def test_index_lists_a_circle_containing_the_pole_under_one_turn_of_columns():
+	zone_index = geofence.make_zone_index([make_circle_zone(89.99, 30.0, 5.0)])
+	assert len(zone_index.cell_keys) == 3 * zone_index.column_count #rows 89.9, 89.95 and the one starting at 90, each with one full turn of columns
+	assert (zone_index.west[0], zone_index.east[0]) == (30.0 - 180, 30.0 + 180)
+
+def test_circles_near_the_poles_match_geodesic_distances():
+	rng = default_rng(1)
+	circles = [((89.99, 30.0), 5.0), ((-85.0, 120.0), 50.0)]
+	for centre, radius in circles:
+		latitudes = centre[0] + rng.uniform(-0.6, 0.6, 1500)
+		latitudes = latitudes.clip(-90, 90)
+		longitudes = rng.uniform(-180, 180, 1500) if abs(centre[0]) > 89 else centre[1] + rng.uniform(-7, 7, 1500)
+		inside = query_zones([make_circle_zone(*centre, radius)], latitudes, longitudes)
+		expected = geodesic_inside(centre, radius, latitudes, longitudes)
+		assert inside[:, 0].tolist() == expected
+		assert sum(expected) > 50 #enough points land inside for the comparison to mean something
+
+def test_box_near_a_pole_is_only_as_wide_as_the_circle():
+	#A 50km circle at 85 degrees reaches about 5.2 degrees of longitude either side, not the 1e6 times its height the box used to be
+	zone_index = geofence.make_zone_index([make_circle_zone(-85.0, 120.0, 50.0)])
+	assert 5.0 < zone_index.east[0] - 120.0 < 5.3
+	assert len(zone_index.cell_keys) < 20000
+
+def test_circles_crossing_the_antimeridian_are_indexed_on_both_sides():
+	centre, radius = (-17.0, 179.99), 5.0
+	rng = default_rng(2)
+	latitudes = centre[0] + rng.uniform(-0.06, 0.06, 2000)
+	longitudes = (centre[1] + rng.uniform(-0.07, 0.07, 2000) + 180) % 360 - 180
+	inside = query_zones([make_circle_zone(*centre, radius)], latitudes, longitudes)
+	assert inside[:, 0].tolist() == geodesic_inside(centre, radius, latitudes, longitudes)
+	assert inside[longitudes < 0, 0].sum() > 50 #points just west of -180 are found through the wrapped cells
+	assert query_zones([make_circle_zone(0.0, -179.99, 5.0)], [0.0, 0.0, 0.0], [179.99, 180.0, -179.95]).ravel().tolist() == [True, True, True]
+
+def test_points_at_either_edge_of_the_grid_share_columns():
+	zone_index = geofence.make_zone_index([make_circle_zone(0.0, 0.0, 1.0)])
+	columns = zone_index.find_columns(array([-180.0, 180.0, -179.97, 179.97]))
+	assert columns.tolist() == [0, 0, 0, zone_index.column_count - 1]
@@ -0,0 +1,48 @@
+from json import loads
+from numpy.random import default_rng
+from dash_analyser_application.geometry_encoding import encode_polyline, dumps_for_template
+
+def decode_polyline(encoded:str, precision:int=5) -> list:
+	#A plain Python decoder following Google's description of the format, which the encoder's output should round trip through
+	values = []
+	value = shift = 0
+	for character in encoded:
+		chunk = ord(character) - 63
+		value |= (chunk & 31) << shift
+		shift += 5
+		if chunk < 32:
+			values.append(~(value >> 1) if value & 1 else value >> 1)
+			value = shift = 0
+	coordinates = []
+	latitude = longitude = 0
+	for i in range(0, len(values), 2):
+		latitude += values[i]
+		longitude += values[i + 1]
+		coordinates.append((latitude / 10 ** precision, longitude / 10 ** precision))
+	return coordinates
+
+def test_google_reference_vector():
+	#The example from Google's encoded polyline algorithm format documentation
+	assert encode_polyline([(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+def test_single_values():
+	#Examples from the same documentation, encoding one value at a time
+	assert encode_polyline([(-179.9832104, 0)]) == "`~oia@?"
+	assert encode_polyline([(0, 0)]) == "??"
+
+def test_round_trip():
+	rng = default_rng(0)
+	coordinates = [(51.5 + latitude, -0.1 + longitude) for latitude, longitude in rng.normal(0, 0.01, (500, 2)).cumsum(axis=0)]
+	for precision in (5, 6):
+		decoded = decode_polyline(encode_polyline(coordinates, precision), precision)
+		assert len(decoded) == len(coordinates)
+		assert max(abs(a - b) for point, decoded_point in zip(coordinates, decoded) for a, b in zip(point, decoded_point)) <= 0.5 / 10 ** precision + 1e-12
+
+def test_empty_line():
+	assert encode_polyline([]) == ""
+
+def test_dumps_for_template_escapes_braces():
+	data = ["a{b}", "}}", 1]
+	dumped = dumps_for_template(data)
+	assert "{" not in dumped and "}" not in dumped
+	assert loads(dumped) == data
@@ -0,0 +1,59 @@
+from numpy import float32, float64, int8
+from pandas import DataFrame, CategoricalDtype
+from pandas.api.types import is_datetime64_any_dtype
+from dash_analyser_application.dataframer import make_video_metadata_handlers
+from dash_analyser_application.gps_dtypes import set_compact_dtypes, make_label_column, make_original_layout, measure_memory_saving, report_memory_saving, COORDINATE_DTYPE, SPEED_DTYPE
+
+COORDINATE_COLUMNS = ["GPS Latitude", "GPS Longitude"]
+
+def make_metadata(point_count:int) -> dict:
+	#The dictionary exiftool's JSON output gives for a video with a GPS point every second in its embedded documents, as read by JSONMetadataExtractor
+	video_metadata = dict(SourceFile = "input/a.MP4", FileType = "MP4", FileSize = 104857600, MIMEType = "video/mp4", CreateDate = "2021:06:14 10:00:00", Duration = point_count)
+	for i in range(point_count):
+		video_metadata.update({
+			f"Doc{i+1}:GPSLatitude": 51.5 + i * 0.0001,
+			f"Doc{i+1}:GPSLongitude": -0.1 - i * 0.0001,
+			f"Doc{i+1}:GPSSpeed": 30.0 + i % 7,
+			f"Doc{i+1}:GPSSpeedRef": "K",
+			f"Doc{i+1}:GPSDateTime": f"2021:06:14 10:{i // 60 % 60:02d}:{i % 60:02d}Z"
+			})
+	return video_metadata
+
+def make_gps_df(point_count:int=1800) -> DataFrame:
+	#Returns the GPS dataframe of a half hour video, processed in the same way as during a run
+	return make_video_metadata_handlers([make_metadata(point_count)], [])[0].gps_df
+
+def test_gps_dataframes_are_stored_with_compact_dtypes():
+	gps_df = make_gps_df()
+	assert gps_df["GPS Latitude"].dtype == gps_df["GPS Longitude"].dtype == COORDINATE_DTYPE == float64
+	assert gps_df["Speed"].dtype == SPEED_DTYPE == float32
+	assert gps_df["Speed Reference"].dtype == CategoricalDtype(["K"])
+	assert gps_df["DataSource"].dtype == CategoricalDtype(["Extracted metadata using exiftool"])
+	assert gps_df["DataSource"].cat.codes.dtype == int8
+	assert is_datetime64_any_dtype(gps_df["DateTime"])
+	assert "Latitude, Longitude" not in gps_df.columns
+
+def test_coordinates_can_be_stored_as_float32():
+	gps_df = DataFrame({"Latitude": [51.5, 51.50001], "Longitude": [-0.1, -0.10001], "Speed": ["30.5", "unreadable"], "Speed Ref": ["mph", "mph"]})
+	compact_df = set_compact_dtypes(gps_df, ["Latitude", "Longitude"], "Speed Ref", float32)
+	assert compact_df["Latitude"].dtype == compact_df["Longitude"].dtype == float32
+	assert abs(compact_df["Latitude"] - gps_df["Latitude"]).max() < 1e-5
+	assert compact_df["Speed"].dtype == float32 and compact_df["Speed"].iloc[0] == 30.5 and compact_df["Speed"].isna().iloc[1]
+	assert compact_df["Speed Ref"].dtype == "category"
+
+def test_label_columns_store_the_label_once():
+	label_column = make_label_column("Read metadata from watermarks using pytesseract", 1000)
+	assert list(label_column.categories) == ["Read metadata from watermarks using pytesseract"]
+	assert (label_column == "Read metadata from watermarks using pytesseract").all()
+
+def test_memory_saving_is_measured_against_the_original_layout():
+	gps_df = make_gps_df()
+	original_df = make_original_layout(gps_df, COORDINATE_COLUMNS, "Speed Reference")
+	assert original_df["Speed"].dtype == float64 and original_df["DataSource"].dtype == object and original_df["Speed Reference"].dtype == object
+	assert tuple(original_df["Latitude, Longitude"].iloc[1]) == (gps_df["GPS Latitude"].iloc[1], gps_df["GPS Longitude"].iloc[1])
+	original_bytes, compact_bytes = measure_memory_saving(gps_df, COORDINATE_COLUMNS, "Speed Reference")
+	assert original_bytes == original_df.memory_usage(deep = True).sum()
+	assert compact_bytes == gps_df.memory_usage(deep = True).sum()
+	#The object column and the per row strings were almost all of the original size
+	assert compact_bytes < original_bytes / 5
+	assert report_memory_saving(gps_df, COORDINATE_COLUMNS, "Speed Reference").startswith("GPS data for 1800 points takes up 0.05MB")
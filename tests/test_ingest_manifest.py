@@ -0,0 +1,58 @@
+from os import stat, utime
+from dash_analyser_application.ingest_manifest import IngestManifest, PARTIAL_HASH_BYTES
+from dash_analyser_application.parse_options_and_make_files import make_metadata_pipeline_name, make_ocr_pipeline_name
+
+def write_videos(input_directory:str, sizes:dict):
+	#Videos are named the way the tool joins paths, so the files the manifest opens are the ones written here on any platform
+	for video_name, size in sizes.items():
+		with open(f"{input_directory}\\{video_name}", "wb") as video_file:
+			video_file.write(bytes(range(256)) * (size // 256))
+
+def test_reuses_stored_results_until_a_video_changes(tmp_path):
+	input_directory = str(tmp_path)
+	write_videos(input_directory, {"a.MP4": 1024, "b.MP4": 3 * PARTIAL_HASH_BYTES, "c.MP4": 512})
+	video_names = ["a.MP4", "b.MP4", "c.MP4"]
+	database_file = str(tmp_path / "manifest.sqlite")
+	manifest = IngestManifest(database_file)
+	stored, new = manifest.find_stored_results("metadata", video_names, input_directory)
+	assert stored == {} and new == video_names
+	manifest.store_results("metadata", {"a.MP4": {"GPS": 1}, "b.MP4": {"GPS": 2}, "c.MP4": None}, input_directory)
+	manifest.close()
+	stored_mtime = stat(f"{input_directory}\\b.MP4").st_mtime_ns
+	with open(f"{input_directory}\\b.MP4", "r+b") as video_file:
+		video_file.seek(PARTIAL_HASH_BYTES + 10) #outside the hashed ends, so only the modification time shows the change
+		video_file.write(b"changed")
+	utime(f"{input_directory}\\b.MP4", ns = (stored_mtime + 2000000000, stored_mtime + 2000000000)) #set explicitly, as the write can land in the same tick of a coarse filesystem clock
+	manifest = IngestManifest(database_file)
+	stored, new = manifest.find_stored_results("metadata", video_names, input_directory)
+	assert stored == {"a.MP4": {"GPS": 1}}
+	assert new == ["b.MP4", "c.MP4"] #b changed, and c's metadata couldn't be read so it wasn't stored
+	assert manifest.report() == "Reused 1 stored results, and made 2 new results for videos which were added or changed"
+
+def test_pipelines_are_stored_separately(tmp_path):
+	input_directory = str(tmp_path)
+	write_videos(input_directory, {"a.MP4": 1024})
+	manifest = IngestManifest(str(tmp_path / "manifest.sqlite"))
+	manifest.store_results("ocr GARMIN, tesseract, 1 fps", {"a.MP4": "tesseract"}, input_directory)
+	assert manifest.find_stored_results("ocr GARMIN, tesseract, 1 fps", ["a.MP4"], input_directory)[0] == {"a.MP4": "tesseract"}
+	assert manifest.find_stored_results("ocr GARMIN, glyph, 1 fps", ["a.MP4"], input_directory)[1] == ["a.MP4"]
+	assert manifest.find_stored_results("ocr GARMIN, tesseract, 2 fps", ["a.MP4"], input_directory)[1] == ["a.MP4"]
+
+def test_only_the_modification_time_changing_processes_a_video_again(tmp_path):
+	input_directory = str(tmp_path)
+	write_videos(input_directory, {"a.MP4": 1024})
+	manifest = IngestManifest(str(tmp_path / "manifest.sqlite"))
+	utime(f"{input_directory}\\a.MP4", ns = (1600000000000000000, 1600000000000000000))
+	manifest.store_results("metadata native", {"a.MP4": {"GPS": 1}}, input_directory)
+	assert manifest.find_stored_results("metadata native", ["a.MP4"], input_directory)[0] == {"a.MP4": {"GPS": 1}}
+	utime(f"{input_directory}\\a.MP4", ns = (1600000000000000000, 1600000000000000001))
+	assert IngestManifest(str(tmp_path / "manifest.sqlite")).find_stored_results("metadata native", ["a.MP4"], input_directory)[1] == ["a.MP4"]
+
+def test_pipeline_names_include_every_setting_that_changes_the_result():
+	assert make_metadata_pipeline_name("native") == "metadata native"
+	assert make_metadata_pipeline_name("exiftool") == "metadata exiftool"
+	settings = dict(dashcam_type = "GARMIN", ocr_engine = "tesseract", sample_rate = 1.0, frame_step = None, batch_size = 1, deduplicate_frames = True)
+	assert make_ocr_pipeline_name(**settings) == "ocr GARMIN, tesseract, 1.0 fps, batches of 1, identical frames reused"
+	changes = [dict(dashcam_type = "Nextbase 312GW"), dict(ocr_engine = "glyph"), dict(sample_rate = 2.0), dict(frame_step = 30), dict(batch_size = 8), dict(deduplicate_frames = False)]
+	names = {make_ocr_pipeline_name(**{**settings, **change}) for change in changes}
+	assert len(names) == len(changes) and make_ocr_pipeline_name(**settings) not in names
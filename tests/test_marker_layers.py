@@ -0,0 +1,25 @@
+from folium import FeatureGroup
+from dash_analyser_application.marker_layers import StartMarkerLayer, is_high_volume, HIGH_VOLUME_MARKER_COUNT
+from dash_analyser_application.mapper_classes import Mappy
+from dash_analyser_application.popup_tables import PopupTable
+
+def test_maps_switch_to_a_canvas_at_the_high_volume_count():
+	assert HIGH_VOLUME_MARKER_COUNT == 200
+	assert not is_high_volume(199) and is_high_volume(200) and is_high_volume(5000)
+	assert is_high_volume(3, threshold = 3)
+	for video_count, prefer_canvas in [(199, "false"), (200, "true")]:
+		mappy = Mappy((51.5, -0.1), is_high_volume(video_count))
+		assert f'"preferCanvas": {prefer_canvas}' in mappy.canvas.get_root().render()
+
+def test_start_markers_are_drawn_from_one_table():
+	mappy = Mappy((51.5, -0.1), True)
+	popup_table = PopupTable().add_to(mappy.canvas)
+	start_markers = FeatureGroup(name = "Start markers").add_to(mappy.canvas)
+	marker_layer = StartMarkerLayer(popup_table, "blue").add_to(start_markers)
+	for index in range(3):
+		marker_layer.add_marker((51.5 + index / 100, -0.1), popup_table.add_row("File Information", ["File Attribute(s)", "Value(s)"], ["Name:"], [f"{index}.MP4"]))
+	html = mappy.canvas.get_root().render()
+	assert marker_layer.rows == [[51.5, -0.1, 0], [51.51, -0.1, 1], [51.52, -0.1, 2]]
+	assert "[[51.5,-0.1,0],[51.51,-0.1,1],[51.52,-0.1,2]].forEach" in html
+	assert html.count("L.circleMarker") == 1 and "L.marker(" not in html
+	assert f"return {popup_table.get_name()}(row[2]);" in html and f".addTo({start_markers.get_name()});" in html
@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+from dash_analyser_application.metadata_extraction_classes import JSONMetadataExtractor, NativeMetadataExtractor
+from dash_analyser_application.metadata_extraction_functions import report_extraction_latency
+
+class FailingExifTool:
+
+	"""Stands in for an ExifToolPool whose exiftool process dies on every command"""
+
+	def execute(self, arguments:list) -> str:
+		raise OSError("exiftool exited while running the command, so it was restarted")
+
+def test_exiftool_failure_leaves_the_file_without_metadata(tmp_path):
+	(tmp_path / "a.MP4").write_bytes(b"\x00" * 64)
+	for extractor_class in [JSONMetadataExtractor, NativeMetadataExtractor]:
+		extractor = extractor_class(video = "a.MP4", temp_directory = str(tmp_path))
+		extractor.extract_metadata(str(tmp_path), FailingExifTool())
+		assert extractor.metadata is None
+		assert extractor.backend == "exiftool" #the native reader found no GPS track, so exiftool was tried
+
+def test_latency_report_names_the_backend_used():
+	handlers = [SimpleNamespace(video = "a.MP4", backend = "native"), SimpleNamespace(video = "b.MP4", backend = "native"), SimpleNamespace(video = "c.MOV", backend = "exiftool")]
+	assert report_extraction_latency(handlers, [0.01, 0.03, 2.5]) == "Extracted metadata for 2 files in 0.04s of native reading time (20.0ms per file), and 1 files in 2.50s of exiftool time (2500.0ms per file)"
+	assert report_extraction_latency(handlers[:1], [0.01]) == "Extracted metadata for 1 files in 0.01s of native reading time (10.0ms per file)"
+	assert report_extraction_latency([], []) == "No metadata extracted"
@@ -0,0 +1,87 @@
+from numpy import full, uint8
+from dash_analyser_application import montage_ocr
+from dash_analyser_application.montage_ocr import make_montage, split_montage_output, read_watermark_batches
+
+CROP_HEIGHT = 30
+SEPARATOR = 20
+PITCH = CROP_HEIGHT + SEPARATOR #each crop starts this many rows below the one above it, after its separator
+
+def make_ocr_data(words:list) -> dict:
+	"""
+	Makes a dictionary laid out like the output of image_to_data, from a list of (text, top, height, block, paragraph, line) for each word.
+	Tesseract also gives rows with no text for each block, paragraph and line, so one of those is placed before every word.
+	"""
+	ocr_data = dict(text = [], top = [], height = [], block_num = [], par_num = [], line_num = [])
+	for text, top, height, block, paragraph, line in words:
+		for row in [("", top, height, block, paragraph, line), (text, top, height, block, paragraph, line)]:
+			for key, value in zip(ocr_data.keys(), row):
+				ocr_data[key].append(value)
+	return ocr_data
+
+def test_make_montage_pads_each_crop_with_its_background():
+	images = [full((CROP_HEIGHT, 8), 10, dtype = uint8), full((CROP_HEIGHT, 8), 200, dtype = uint8)]
+	images[1][5, 5] = 0
+	montage = make_montage(images, SEPARATOR)
+	assert montage.shape == (2 * PITCH + SEPARATOR, 8)
+	assert montage.dtype == uint8
+	assert (montage[:SEPARATOR] == 10).all()
+	assert (montage[PITCH:PITCH+SEPARATOR] == 200).all() #the separator above the second crop uses its median, not its darkest pixel
+	assert (montage[PITCH+SEPARATOR:2*PITCH] == images[1]).all()
+	assert (montage[2*PITCH:] == 200).all()
+
+def test_words_are_placed_in_the_crop_their_centre_falls_in():
+	words = [
+		("12:00:01", SEPARATOR + 5, 20, 1, 1, 1),
+		("51.5N", SEPARATOR + 5, 20, 1, 1, 1),
+		("12:00:02", PITCH + SEPARATOR + 5, 20, 1, 1, 2),
+		("12:00:03", 2 * PITCH + SEPARATOR + 5, 20, 2, 1, 1),
+		]
+	assert split_montage_output(make_ocr_data(words), 3, CROP_HEIGHT, SEPARATOR) == ["12:00:01 51.5N\n\x0c", "12:00:02\n\x0c", "12:00:03\n\x0c"]
+
+def test_centres_on_a_crop_boundary_go_to_the_crop_below():
+	#A centre exactly PITCH rows down is the first row of the second crop's separator, so belongs to the second crop
+	words = [("above", PITCH - 11, 20, 1, 1, 1), ("below", PITCH - 10, 20, 1, 1, 2)]
+	assert split_montage_output(make_ocr_data(words), 2, CROP_HEIGHT, SEPARATOR) == ["above\n\x0c", "below\n\x0c"]
+
+def test_words_outside_the_montage_are_kept_in_the_nearest_crop():
+	words = [("top", -15, 20, 1, 1, 1), ("bottom", 2 * PITCH + SEPARATOR - 2, 20, 1, 1, 2)]
+	assert split_montage_output(make_ocr_data(words), 2, CROP_HEIGHT, SEPARATOR) == ["top\n\x0c", "bottom\n\x0c"]
+
+def test_empty_frames_give_an_empty_watermark():
+	words = [("12:00:01", SEPARATOR + 5, 20, 1, 1, 1), ("   ", PITCH + SEPARATOR + 5, 20, 1, 1, 2), ("12:00:03", 2 * PITCH + SEPARATOR + 5, 20, 1, 1, 3)]
+	assert split_montage_output(make_ocr_data(words), 3, CROP_HEIGHT, SEPARATOR) == ["12:00:01\n\x0c", "\n\x0c", "12:00:03\n\x0c"]
+	assert split_montage_output(make_ocr_data([]), 2, CROP_HEIGHT, SEPARATOR) == ["\n\x0c", "\n\x0c"]
+
+def test_frames_with_more_than_one_line_keep_their_lines_in_order():
+	#MiVue and Nextbase 422GW watermarks have two lines. Tesseract numbers lines across the whole montage, so the second frame's lines are lines 3 and 4
+	words = [
+		("2021/06/14", SEPARATOR + 2, 10, 1, 1, 1),
+		("12:00:01", SEPARATOR + 2, 10, 1, 1, 1),
+		("N51.5", SEPARATOR + 16, 10, 1, 1, 2),
+		("W0.1", SEPARATOR + 16, 10, 1, 1, 2),
+		("2021/06/14", PITCH + SEPARATOR + 2, 10, 1, 1, 3),
+		("N51.6", PITCH + SEPARATOR + 16, 10, 1, 1, 4),
+		("12:00:02", PITCH + SEPARATOR + 2, 10, 1, 1, 3), #tesseract can list a word after words from a later line
+		]
+	assert split_montage_output(make_ocr_data(words), 2, CROP_HEIGHT, SEPARATOR) == [
+		"2021/06/14 12:00:01\nN51.5 W0.1\n\x0c",
+		"2021/06/14 12:00:02\nN51.6\n\x0c",
+		]
+
+def test_a_line_spanning_two_frames_is_split_between_them():
+	words = [("left", SEPARATOR + 5, 20, 1, 1, 1), ("right", PITCH + SEPARATOR + 5, 20, 1, 1, 1)]
+	assert split_montage_output(make_ocr_data(words), 2, CROP_HEIGHT, SEPARATOR) == ["left\n\x0c", "right\n\x0c"]
+
+def test_read_watermark_batches_reads_each_batch_as_one_montage(monkeypatch):
+	montage_heights = []
+	def fake_image_to_data(montage, config, output_type):
+		#Reads the value each crop is filled with, as if tesseract read it as a word in the middle of the crop
+		montage_heights.append(montage.shape[0])
+		crop_count = (montage.shape[0] - SEPARATOR) // PITCH
+		words = [(str(montage[i * PITCH + SEPARATOR, 0]), i * PITCH + SEPARATOR + 5, 20, 1, 1, i + 1) for i in range(crop_count)]
+		return make_ocr_data(words)
+	monkeypatch.setattr(montage_ocr.pytesseract, "image_to_data", fake_image_to_data)
+	images = [full((CROP_HEIGHT, 8), value, dtype = uint8) for value in range(1, 8)]
+	watermarks = read_watermark_batches(images, 3, SEPARATOR)
+	assert watermarks == [f"{value}\n\x0c" for value in range(1, 8)]
+	assert montage_heights == [3 * PITCH + SEPARATOR, 3 * PITCH + SEPARATOR, PITCH + SEPARATOR]
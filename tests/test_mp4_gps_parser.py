@@ -0,0 +1,67 @@
+from struct import pack
+from dash_analyser_application.mp4_gps_parser import read_mp4_metadata, nmea_to_decimal
+
+def make_box(box_type:bytes, payload:bytes) -> bytes:
+	return pack(">I", len(payload) + 8) + box_type + payload
+
+def make_gps_block(hour, minute, second, year, month, day, status, latitude_ref, longitude_ref, latitude, longitude, speed) -> bytes:
+	#A Novatek "free" box: the "GPS " magic, padding up to byte 48 of the box, then the little-endian time and position fields
+	fields = pack("<IIIIIIccccfff", hour, minute, second, year, month, day, status, latitude_ref, longitude_ref, b"\x00", latitude, longitude, speed)
+	payload = b"GPS " + bytes(36) + fields
+	return make_box(b"free", payload + bytes(96 - 8 - len(payload)))
+
+def write_video(tmp_path, *boxes) -> str:
+	video_file = tmp_path / "clip.MP4"
+	video_file.write_bytes(make_box(b"ftyp", b"isom" + bytes(4)) + b"".join(boxes))
+	return str(video_file)
+
+def test_nmea_to_decimal_applies_hemisphere_signs():
+	assert nmea_to_decimal(5130.0, b"N") == 51.5
+	assert nmea_to_decimal(5130.0, b"S") == -51.5
+	assert nmea_to_decimal(7.5, b"E") == 0.125
+	assert nmea_to_decimal(7.5, b"W") == -0.125
+
+def test_reads_top_level_gps_blocks(tmp_path):
+	video_file = write_video(
+		tmp_path,
+		make_gps_block(12, 30, 5, 21, 6, 14, b"A", b"N", b"W", 5130.0, 7.5, 10.0),
+		make_gps_block(12, 30, 6, 21, 6, 14, b"A", b"S", b"E", 3345.0, 15112.0, 0.0)
+		)
+	metadata = read_mp4_metadata(video_file)
+	assert metadata["Main:FileType"] == "MP4"
+	assert metadata["Doc1:GPSDateTime"] == "2021:06:14 12:30:05"
+	assert metadata["Doc1:GPSLatitude"] == 51.5
+	assert metadata["Doc1:GPSLongitude"] == -0.125
+	assert abs(metadata["Doc1:GPSSpeed"] - 18.52) < 1e-4
+	assert metadata["Doc1:GPSSpeedRef"] == "K"
+	assert metadata["Doc2:GPSLatitude"] == -33.75
+	assert abs(metadata["Doc2:GPSLongitude"] - (151 + 12 / 60)) < 1e-9
+
+def test_skips_blocks_without_a_fix(tmp_path):
+	video_file = write_video(
+		tmp_path,
+		make_gps_block(12, 30, 5, 21, 6, 14, b"V", b"N", b"W", 5130.0, 7.5, 10.0),
+		make_gps_block(12, 30, 6, 21, 6, 14, b"A", b"N", b"W", 5130.0, 7.5, 10.0)
+		)
+	metadata = read_mp4_metadata(video_file)
+	assert metadata["Doc1:GPSDateTime"] == "2021:06:14 12:30:06"
+	assert "Doc2:GPSDateTime" not in metadata
+
+def test_reads_gps_blocks_listed_in_moov(tmp_path):
+	#The "gps " box holds 8 bytes of version information, then a (position, size) pair for each block. The block is inside mdat, so it can only be found through the index
+	block = make_gps_block(1, 2, 3, 20, 1, 2, b"A", b"N", b"E", 5130.0, 7.5, 0.0)
+	header_size = 16
+	mvhd = make_box(b"mvhd", bytes(4) + pack(">IIII", 0, 0, 1000, 60000))
+	gps_index_size = 8 + 8 + 8
+	moov_size = 8 + len(mvhd) + gps_index_size
+	block_position = header_size + moov_size + 8
+	gps_index = make_box(b"gps ", bytes(8) + pack(">II", block_position, len(block)))
+	video_file = write_video(tmp_path, make_box(b"moov", mvhd + gps_index), make_box(b"mdat", block))
+	metadata = read_mp4_metadata(video_file)
+	assert metadata["Main:Duration"] == 60
+	assert metadata["Main:CreateDate"] == "1904:01:01 00:00:00"
+	assert metadata["Doc1:GPSDateTime"] == "2020:01:02 01:02:03"
+	assert metadata["Doc1:GPSLongitude"] == 0.125
+
+def test_returns_none_without_gps(tmp_path):
+	assert read_mp4_metadata(write_video(tmp_path, make_box(b"mdat", bytes(32)))) is None
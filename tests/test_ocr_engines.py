@@ -0,0 +1,119 @@
+from os.path import join
+from cv2 import putText, FONT_HERSHEY_SIMPLEX, LINE_8
+from numpy import full, uint8, savez, array
+from pytest import raises
+from dash_analyser_application.ocr_engines import segment_characters, GlyphSet, GlyphTemplateEngine, OCREngine, load_glyph_set, find_glyph_file, format_lines, LEARNING_FRAMES
+
+def make_crop(lines:list, background:int=30, text:int=220):
+	#Renders the lines of a watermark, without anti-aliasing so that each character is a clean blob
+	crop = full((20 + 36 * len(lines), 420), background, dtype = uint8)
+	for i, line in enumerate(lines):
+		putText(crop, line, (5, 30 + 36 * i), FONT_HERSHEY_SIMPLEX, 0.9, text, 2, LINE_8)
+	return crop
+
+class ExactFallback(OCREngine):
+
+	"""Stands in for tesseract, reading every crop correctly from the text it was rendered from, and recording which crops it was asked to read"""
+
+	batch_size = 1
+
+	def __init__(self, texts:dict):
+		self.texts = texts
+		self.read_crops = []
+
+	def read_watermarks(self, images:list) -> list:
+		watermarks = []
+		for image in images:
+			text = next(text for crop, text in self.texts if crop is image)
+			self.read_crops.append(text)
+			watermarks.append(text)
+		return watermarks
+
+TRAINING_LINES = [["12:00:01 45KMH", "N51.50 W0.12"], ["12:03:29 60KMH", "N51.67 W0.38"], ["12:07:58 73KMH", "S34.91 E0.45"]]
+
+def make_training_crops() -> list:
+	return [(make_crop(lines), format_lines(lines)) for lines in TRAINING_LINES]
+
+def test_segmentation_finds_each_line_and_character():
+	lines = segment_characters(make_crop(["12:00:01 45KMH", "N51.50 W0.12"]))
+	assert [len(line) for line in lines] == [13, 11]
+	first_line_gaps = [gap for glyph, gap in lines[0]]
+	assert first_line_gaps[0] == 0
+	assert first_line_gaps.index(max(first_line_gaps)) == 8 #the widest gap is the space before "45KMH"
+
+def test_segmentation_handles_dark_text_on_a_light_background():
+	light = segment_characters(make_crop(["12:00:01"]))
+	dark = segment_characters(make_crop(["12:00:01"], background = 220, text = 30))
+	assert [len(line) for line in dark] == [len(line) for line in light] == [8]
+	assert segment_characters(full((40, 200), 30, dtype = uint8)) == []
+
+def test_learns_every_character_and_the_space_width():
+	training = make_training_crops()
+	glyph_set = GlyphSet()
+	glyph_set.learn([crop for crop, text in training], [text for crop, text in training])
+	assert set(glyph_set.labels) == set("".join(line for lines in TRAINING_LINES for line in lines).replace(" ", ""))
+	lines = segment_characters(training[0][0])
+	gaps = [gap for line in lines for glyph, gap in line]
+	assert max(gap for gap in gaps if gap < glyph_set.space_width) < glyph_set.space_width < lines[0][8][1]
+
+def test_misaligned_reads_are_not_learned():
+	crop = make_crop(["12:00"])
+	glyph_set = GlyphSet()
+	glyph_set.learn([crop, crop], [format_lines(["12:0"]), format_lines(["12:00", "extra line"])])
+	assert not glyph_set.is_learned()
+
+def test_reads_new_frames_with_the_learned_glyphs():
+	training = make_training_crops()
+	new_lines = [["12:10:35 81KMH", "N51.05 W0.21"], ["12:11:00 73KMH", "S34.19 E0.54"]]
+	new_crops = [(make_crop(lines), format_lines(lines)) for lines in new_lines]
+	fallback = ExactFallback(training + new_crops)
+	engine = GlyphTemplateEngine(fallback)
+	engine.prepare([crop for crop, text in training])
+	assert fallback.read_crops == [text for crop, text in training] #only the learning frames are read by the fallback
+	assert engine.read_watermarks([crop for crop, text in new_crops]) == [text for crop, text in new_crops]
+	assert len(fallback.read_crops) == len(training) and engine.fallback_count == 0
+
+def test_low_confidence_frames_are_read_by_the_fallback():
+	training = make_training_crops()
+	unseen = (make_crop(["12:10:35 81MPH", "N51.05 W0.21"]), format_lines(["12:10:35 81MPH", "N51.05 W0.21"])) #P was never learned
+	known = (make_crop(["12:10:35 81KMH", "N51.05 W0.21"]), format_lines(["12:10:35 81KMH", "N51.05 W0.21"]))
+	blank = (full((92, 420), 30, dtype = uint8), "\x0c")
+	fallback = ExactFallback(training + [unseen, known, blank])
+	engine = GlyphTemplateEngine(fallback)
+	engine.prepare([crop for crop, text in training])
+	fallback.read_crops = []
+	assert engine.read_watermarks([known[0], unseen[0], blank[0]]) == [known[1], unseen[1], blank[1]]
+	assert fallback.read_crops == [unseen[1], blank[1]]
+	assert engine.fallback_count == 2
+
+def test_unlearned_engine_reads_everything_with_the_fallback():
+	crop, text = make_training_crops()[0]
+	fallback = ExactFallback([(crop, text)])
+	engine = GlyphTemplateEngine(fallback)
+	assert engine.read_watermarks([crop]) == [text]
+	engine.prepare([])
+	assert not engine.glyph_set.is_learned()
+
+def test_learns_from_at_most_the_learning_frames():
+	training = make_training_crops() * LEARNING_FRAMES
+	fallback = ExactFallback(training)
+	GlyphTemplateEngine(fallback).prepare([crop for crop, text in training])
+	assert len(fallback.read_crops) == LEARNING_FRAMES
+
+def test_glyph_set_is_saved_and_loaded_without_pickle(tmp_path):
+	training = make_training_crops()
+	glyph_file = find_glyph_file(str(tmp_path / "glyph_sets"), "Nextbase 312GW")
+	assert glyph_file == join(str(tmp_path), "glyph_sets", "Nextbase_312GW_glyphs.npz")
+	engine = GlyphTemplateEngine(ExactFallback(training), glyph_file)
+	engine.prepare([crop for crop, text in training]) #saves the learned set, making the glyph folder
+	loaded = load_glyph_set(glyph_file)
+	assert loaded.labels == engine.glyph_set.labels
+	assert (loaded.templates == engine.glyph_set.templates).all()
+	assert loaded.space_width == engine.glyph_set.space_width
+	assert load_glyph_set(str(tmp_path / "missing.npz")).is_learned() is False
+
+def test_glyph_files_holding_pickled_objects_are_refused(tmp_path):
+	glyph_file = str(tmp_path / "GARMIN_glyphs.npz")
+	savez(glyph_file, labels = array([{"not": "an array of text"}], dtype = object), templates = array([]), space_width = array(0.3))
+	with raises(ValueError):
+		load_glyph_set(glyph_file)
@@ -0,0 +1,80 @@
+from numpy.random import default_rng
+from dash_analyser_application.video import Video
+from dash_analyser_application.ocr_engines import OCREngine
+from dash_analyser_application.ocr_executor import ParallelOCRExecutor, round_up_to_batches
+
+class MontageStubEngine(OCREngine):
+
+	"""Reads each frame as its own value along with the value of the first frame in its montage, so frames split into different montages give different output"""
+
+	batch_size = 3
+
+	def read_watermarks(self, images:list) -> list:
+		watermarks = []
+		for start in range(0, len(images), self.batch_size):
+			batch = images[start:start+self.batch_size]
+			watermarks.extend([f"{image[0, 0]} in montage from {batch[0][0, 0]}" for image in batch])
+		return watermarks
+
+class StubVideo(Video):
+
+	"""A Video whose frames are made up rather than decoded. Each frame is noise seeded by, and starting with, its value, with some frames repeated so that deduplication is used"""
+
+	def __init__(self, video_name:str, frame_values:list):
+		super().__init__(video_name, "temp", "videos", ocr_engine = MontageStubEngine())
+		self.frame_values = frame_values
+
+	def extract_frames(self) -> list:
+		self.frame_crops = []
+		for value in self.frame_values:
+			crop = default_rng(value).integers(0, 256, (16, 48), dtype = "uint8")
+			crop[0, 0] = value
+			self.frame_crops.append(crop)
+		return self.frame_crops
+
+	def get_image_crop_indices(self):
+		pass
+
+	def make_start_string(self):
+		pass
+
+	def process_watermarks(self):
+		pass
+
+	def combine_date_and_time(self):
+		pass
+
+def make_videos() -> list:
+	return [
+		StubVideo("a.MP4", list(range(14))),
+		StubVideo("b.MP4", [20, 20, 20, 21, 22, 22, 23]),
+		StubVideo("c.MP4", [30]),
+		StubVideo("d.MP4", []),
+		]
+
+def read_serially() -> list:
+	videos = make_videos()
+	for video in videos:
+		video.extract_frames()
+		video.read_watermarks()
+	return [video.watermarks for video in videos]
+
+def test_round_up_to_batches():
+	assert round_up_to_batches(16, 1) == 16
+	assert round_up_to_batches(16, 4) == 16
+	assert round_up_to_batches(16, 3) == 18
+	assert round_up_to_batches(2, 5) == 5
+
+def test_chunks_are_whole_batches():
+	executor = ParallelOCRExecutor(workers = 2, chunk_size = 4)
+	chunks, chunk_owners = executor.make_chunks([list(range(14)), list(range(5))], [3, 1])
+	assert chunks == [list(range(6)), list(range(6, 12)), [12, 13], list(range(4)), [4]]
+	assert chunk_owners == [0, 0, 0, 1, 1]
+
+def test_parallel_output_matches_serial_output():
+	serial_watermarks = read_serially()
+	assert serial_watermarks[0][4] == "4 in montage from 3"
+	for workers in [2, 1]:
+		videos = make_videos()
+		ParallelOCRExecutor(workers = workers, chunk_size = 4).read_watermarks(videos)
+		assert [video.watermarks for video in videos] == serial_watermarks
@@ -0,0 +1,44 @@
+from re import search, DOTALL
+from shutil import which
+from subprocess import run
+import pytest
+from folium import Map, Marker
+from dash_analyser_application.popup_tables import PopupTable, LazyPopup
+
+FILE_LABELS = ["Name:", "File Size"]
+
+def render_map(rows:list) -> tuple:
+	#Renders a map with a marker for each row, whose popup is rendered from the map's PopupTable. Returns the table and the page's HTML
+	canvas = Map(location = (51.5, -0.1), zoom_start = 12)
+	popup_table = PopupTable().add_to(canvas)
+	for index, values in enumerate(rows):
+		marker = Marker(location = (51.5, -0.1 + index / 100)).add_to(canvas)
+		LazyPopup(popup_table, popup_table.add_row("File Information", ["File Attribute(s)", "Value(s)"], FILE_LABELS, values)).add_to(marker)
+	return popup_table, canvas.get_root().render()
+
+def test_labels_are_stored_once_and_values_are_escaped():
+	popup_table = PopupTable()
+	assert popup_table.add_row("File Information", ["File Attribute(s)", "Value(s)"], FILE_LABELS, ["a.MP4", 10]) == 0
+	assert popup_table.add_row("File Information", ["File Attribute(s)", "Value(s)"], FILE_LABELS, ["<b>.MP4", 20]) == 1
+	assert popup_table.add_row("Exclusion Zone", ["Zone"], ["Radius"], [1.5]) == 2
+	assert popup_table.templates == [["File Information", ["File Attribute(s)", "Value(s)"], FILE_LABELS], ["Exclusion Zone", ["Zone"], ["Radius"]]]
+	assert popup_table.rows == [[0, ["a.MP4", "10"]], [0, ["&lt;b&gt;.MP4", "20"]], [1, ["1.5"]]]
+
+def test_popups_are_bound_as_functions_of_their_row():
+	popup_table, html = render_map([["a.MP4", "10 MB"], ["b.MP4", "20 MB"]])
+	table_name = popup_table.get_name()
+	#The page holds each popup's values once, in the table, rather than an HTML document for each popup
+	assert html.count("a.MP4") == 1 and html.count("File Size") == 1
+	assert "<iframe" not in html and "<td>a.MP4" not in html
+	assert f"bindPopup(function () {{ return {table_name}(0); }}, {{maxWidth: 500}});" in html
+	assert f"bindPopup(function () {{ return {table_name}(1); }}, {{maxWidth: 500}});" in html
+	assert html.index(f"var {table_name} =") < html.index("</head>")
+
+@pytest.mark.skipif(which("node") is None, reason = "node is needed to run the popup table's script")
+def test_popup_html_is_rendered_when_opened():
+	popup_table, html = render_map([["a.MP4", "10 MB"], ["<b>.MP4", "20 MB"]])
+	table_name = popup_table.get_name()
+	script = search(rf"var {table_name} = .*?\}}\)\(\);", html, DOTALL).group(0)
+	popup_html = run(["node", "-e", f"{script}\nprocess.stdout.write({table_name}(1));"], capture_output = True, text = True, check = True).stdout
+	assert popup_html == ("<div class='dash-analyser-popup'><h4>File Information</h4><table><tr><th>File Attribute(s)</th><th>Value(s)</th></tr>"
+		"<tr><td>Name:</td><td>&lt;b&gt;.MP4</td></tr><tr><td>File Size</td><td>20 MB</td></tr></table></div>")
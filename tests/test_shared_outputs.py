@@ -0,0 +1,68 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread
+from time import sleep
+from os import listdir
+from os.path import exists
+import pytest
+from dash_analyser_application.shared_outputs import download_file, SharedOutputs, ASSETS_DIRECTORY
+
+ASSET_BYTES = b"/* leaflet */" * 100
+
+class AssetHandler(BaseHTTPRequestHandler):
+
+	"""Serves a complete asset, one which stops before its Content-Length, one which is too slow to answer, and a 404 for anything else"""
+
+	def do_GET(self):
+		self.server.requests.append(self.path)
+		if self.path == "/slow.js":
+			sleep(1)
+		if self.path in ("/leaflet.js", "/short.js", "/slow.js"):
+			self.send_response(200)
+			self.send_header("Content-Length", str(len(ASSET_BYTES)))
+			self.end_headers()
+			self.wfile.write(ASSET_BYTES[:100] if self.path == "/short.js" else ASSET_BYTES)
+		else:
+			self.send_error(404)
+
+	def log_message(self, *arguments):
+		pass
+
+@pytest.fixture
+def asset_server():
+	#Runs the asset server on a free local port, and returns it with the url it's served from
+	server = ThreadingHTTPServer(("127.0.0.1", 0), AssetHandler)
+	server.daemon_threads = True
+	server.requests = []
+	Thread(target = server.serve_forever, daemon = True).start()
+	yield server, f"http://127.0.0.1:{server.server_address[1]}"
+	server.shutdown()
+	server.server_close()
+
+def test_complete_downloads_are_renamed_from_the_part_file(asset_server, tmp_path):
+	server, url = asset_server
+	download_file(f"{url}/leaflet.js", str(tmp_path / "leaflet.js"))
+	assert (tmp_path / "leaflet.js").read_bytes() == ASSET_BYTES
+	assert listdir(tmp_path) == ["leaflet.js"]
+
+@pytest.mark.parametrize("asset_name", ["short.js", "slow.js", "missing.js"])
+def test_failed_downloads_leave_no_files(asset_server, tmp_path, asset_name):
+	server, url = asset_server
+	with pytest.raises(OSError):
+		download_file(f"{url}/{asset_name}", str(tmp_path / asset_name), timeout = 0.2)
+	assert listdir(tmp_path) == []
+
+def test_assets_fall_back_to_their_url_after_a_failed_download(asset_server, tmp_path):
+	server, url = asset_server
+	output_dir = str(tmp_path / "output")
+	shared_outputs = SharedOutputs(output_dir)
+	shared_outputs.write_asset("leaflet", "leaflet.js", f"{url}/leaflet.js")
+	assert shared_outputs.sources["leaflet"] == f"{ASSETS_DIRECTORY}/leaflet.js"
+	assert exists(f"{output_dir}\\{ASSETS_DIRECTORY}\\leaflet.js")
+	shared_outputs.write_asset("vega", "vega.min.js", f"{url}/missing.js")
+	shared_outputs.write_asset("vega-lite", "vega-lite.min.js", f"{url}/leaflet.js")
+	#Only one download is tried once the network has failed, but assets already written are still used
+	shared_outputs.write_asset("leaflet", "leaflet.js", f"{url}/leaflet.js")
+	assert shared_outputs.download_failed
+	assert server.requests == ["/leaflet.js", "/missing.js"]
+	assert shared_outputs.sources == {"leaflet": f"{ASSETS_DIRECTORY}/leaflet.js", "vega": f"{url}/missing.js", "vega-lite": f"{url}/leaflet.js"}
+	assert not exists(f"{output_dir}\\{ASSETS_DIRECTORY}\\vega.min.js") and not exists(f"{output_dir}\\{ASSETS_DIRECTORY}\\vega.min.js.part")
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+from numpy import array, nan, arange
+from numpy.random import default_rng
+from branca.colormap import linear
+from dash_analyser_application.speed_colouring import quantise_speeds, find_speed_runs, merge_speed_runs, make_bin_colours
+
+def test_bin_edges_go_to_the_bin_above():
+	colour_map = SimpleNamespace(vmin = 0.0, vmax = 120.0) #12 bins of 10 km/h
+	assert quantise_speeds([0.0, 9.999, 10.0, 59.9, 60.0, 110.0, 119.9], colour_map).tolist() == [0, 0, 1, 5, 6, 11, 11]
+
+def test_speeds_outside_the_scale_are_clipped():
+	colour_map = SimpleNamespace(vmin = 20.0, vmax = 80.0)
+	assert quantise_speeds([80.0, 200.0, 19.0, -5.0, nan], colour_map, 6).tolist() == [5, 5, 0, 0, 0]
+
+def test_flat_scale_puts_every_speed_in_the_first_bin():
+	assert quantise_speeds([30.0, 30.0, 31.0], SimpleNamespace(vmin = 30.0, vmax = 30.0)).tolist() == [0, 0, 0]
+
+def test_runs_take_the_bin_of_the_point_they_start_at():
+	#The last point only ends a segment, so its bin doesn't start a run
+	assert find_speed_runs(array([0, 0, 0, 5])) == {0: [(0, 3)]}
+	assert find_speed_runs(array([2, 2, 3, 3, 2])) == {2: [(0, 2)], 3: [(2, 4)]}
+
+def test_single_point_runs():
+	#A point whose bin differs from both neighbours gives a run of a single segment, from it to the next point
+	assert find_speed_runs(array([0, 1, 0, 0])) == {0: [(0, 1), (2, 3)], 1: [(1, 2)]}
+	assert find_speed_runs(array([4, 7])) == {4: [(0, 1)]}
+	assert find_speed_runs(array([4])) == {}
+	assert find_speed_runs(array([], dtype = int)) == {}
+
+def test_runs_cover_every_segment_once_and_join_up():
+	speed_bins = default_rng(3).integers(0, 4, 500)
+	runs = sorted(run for bin_runs in find_speed_runs(speed_bins).values() for run in bin_runs)
+	assert runs[0][0] == 0 and runs[-1][1] == 499
+	assert all(previous[1] == following[0] for previous, following in zip(runs, runs[1:]))
+	for speed_bin, bin_runs in find_speed_runs(speed_bins).items():
+		for start, end in bin_runs:
+			assert (speed_bins[start:end] == speed_bin).all()
+
+def test_merge_speed_runs_slices_the_points_of_each_run():
+	points = arange(12, dtype = float).reshape(6, 2)
+	merged = merge_speed_runs(points, array([1, 1, 2, 1, 1, 1]))
+	assert list(merged.keys()) == [1, 2]
+	assert [run.tolist() for run in merged[1]] == [points[0:3].tolist(), points[3:6].tolist()]
+	assert [run.tolist() for run in merged[2]] == [points[2:4].tolist()] #neighbouring runs share their end points, so the line has no gaps
+
+def test_bin_colours_follow_the_colour_map():
+	colour_map = linear.YlOrRd_09.scale(0, 120)
+	colours = make_bin_colours(colour_map)
+	assert len(colours) == 12 and len(set(colours)) > 1
+	assert colours[0] == colour_map.to_step(12).rgb_hex_str(5.0)
@@ -0,0 +1,57 @@
+from math import floor
+from numpy import arange, zeros, sin
+from numpy.random import default_rng
+from pandas import DataFrame, date_range, concat
+from dash_analyser_application.speed_downsampling import largest_triangle_three_buckets, downsample_speed_data
+
+def reference_lttb(x, y, threshold:int) -> list:
+	#Steinarsson's original loop, one bucket at a time
+	point_count = len(x)
+	every = (point_count - 2) / (threshold - 2)
+	kept = [0]
+	previous = 0
+	for i in range(threshold - 2):
+		average_start, average_end = floor((i + 1) * every) + 1, min(floor((i + 2) * every) + 1, point_count)
+		average_x = sum(x[average_start:average_end]) / (average_end - average_start)
+		average_y = sum(y[average_start:average_end]) / (average_end - average_start)
+		best_area = -1
+		for j in range(floor(i * every) + 1, floor((i + 1) * every) + 1):
+			area = abs((x[previous] - average_x) * (y[j] - y[previous]) - (x[previous] - x[j]) * (average_y - y[previous]))
+			if area > best_area:
+				best_area, best = area, j
+		kept.append(best)
+		previous = best
+	return kept + [point_count - 1]
+
+def test_matches_reference():
+	rng = default_rng(0)
+	for point_count, threshold in [(1000, 50), (997, 101), (5000, 2000), (10, 4)]:
+		x = arange(point_count, dtype=float)
+		y = rng.normal(50, 10, point_count)
+		assert largest_triangle_three_buckets(x, y, threshold).tolist() == reference_lttb(x, y, threshold)
+
+def test_keeps_peaks():
+	x = arange(10000, dtype=float)
+	y = sin(x / 500) * 10 + 50
+	y[1234] = 200
+	y[8765] = -100
+	kept = largest_triangle_three_buckets(x, y, 100)
+	assert len(kept) == 100
+	assert 1234 in kept and 8765 in kept
+	assert kept[0] == 0 and kept[-1] == 9999
+
+def test_short_series_are_kept_whole():
+	assert largest_triangle_three_buckets(arange(5.0), zeros(5), 10).tolist() == [0, 1, 2, 3, 4]
+	assert largest_triangle_three_buckets(arange(5.0), zeros(5), 2).tolist() == [0, 1, 2, 3, 4]
+
+def test_downsamples_each_data_source():
+	rng = default_rng(1)
+	speed_data = concat([
+		DataFrame(dict(Speed = rng.uniform(0, 100, 3000), DateTime = date_range("2021-01-01", periods = 3000, freq = "s"), DataSource = "Metadata")),
+		DataFrame(dict(Speed = rng.uniform(0, 100, 50), DateTime = date_range("2021-01-01", periods = 50, freq = "min"), DataSource = "OCR"))
+		], ignore_index = True)
+	speed_data.loc[10, "Speed"] = None
+	downsampled = downsample_speed_data(speed_data, 200)
+	assert downsampled["DataSource"].value_counts().to_dict() == {"Metadata": 200, "OCR": 50}
+	assert downsampled["Speed"].notna().all()
+	assert downsampled.groupby("DataSource")["DateTime"].apply(lambda times: times.is_monotonic_increasing).all()
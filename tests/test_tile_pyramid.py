@@ -0,0 +1,87 @@
+from json import loads
+from os.path import exists
+from types import SimpleNamespace
+from numpy import linspace, tile, array, nan
+from pandas import DataFrame
+from dash_analyser_application.tile_pyramid import TilePyramidWriter, zoom_tolerance, tile_coordinates, split_track_into_tiles
+from dash_analyser_application.shared_outputs import SharedOutputs, LEAFLET_URL
+
+def make_video(video_name:str, latitudes, longitudes) -> SimpleNamespace:
+	#Stands in for a Video (video.py), which the writer only reads the name and GPS dataframe of
+	return SimpleNamespace(video_name = video_name, gps_df = DataFrame({"Latitude": latitudes, "Longitude": longitudes}))
+
+def make_zigzag(point_count:int=200) -> tuple:
+	#A track about 2.8km long heading east through London, zigzagging about 11m either side of its line
+	return 51.5 + tile([0.0001, -0.0001], point_count // 2), linspace(-0.12, -0.08, point_count)
+
+def read_file(tile_directory:str, name:str):
+	with open(f"{tile_directory}\\{name}") as json_file:
+		return loads(json_file.read())
+
+def write_pyramid(tmp_path, video_list:list, **options) -> tuple:
+	tile_directory = str(tmp_path / "tiles")
+	writer = TilePyramidWriter(tile_directory, **options)
+	writer.add_tracks(video_list, "blue")
+	return tile_directory, writer, writer.write()
+
+def test_tiles_use_web_map_numbering():
+	x, y = tile_coordinates(array([51.5, 0.0, -33.9]), array([-0.1, 0.0, 151.2]), 8)
+	assert x.astype(int).tolist() == [127, 128, 235]
+	assert y.astype(int).tolist() == [85, 128, 153]
+
+def test_tiles_are_written_under_zoom_x_and_y(tmp_path):
+	tile_directory, writer, summary = write_pyramid(tmp_path, [make_video("a.MP4", *make_zigzag())], min_zoom = 8, max_zoom = 12)
+	metadata = read_file(tile_directory, "metadata.json")
+	assert (metadata["min_zoom"], metadata["max_zoom"]) == (8, 12)
+	assert metadata["tiles"]["8"] == ["127/85"]
+	written = 0
+	for zoom, tile_names in metadata["tiles"].items():
+		for tile_name in tile_names:
+			x, y = tile_name.split("/")
+			features = read_file(tile_directory, f"{zoom}\\{x}\\{y}.geojson")["features"]
+			assert features != [] and features[0]["properties"] == dict(video = "a.MP4", colour = "blue")
+			written += 1
+	assert written == writer.tile_count and f"to {written} tiles" in summary
+
+def test_each_zoom_is_simplified_with_its_own_tolerance(tmp_path):
+	assert zoom_tolerance(0, 0.0) == 156543.03392
+	assert zoom_tolerance(9, 51.5) == zoom_tolerance(8, 51.5) / 2
+	assert abs(zoom_tolerance(8, 60.0) - zoom_tolerance(8, 0.0) / 2) < 1e-6
+	latitudes, longitudes = make_zigzag()
+	tile_directory, writer, summary = write_pyramid(tmp_path, [make_video("a.MP4", latitudes, longitudes)], min_zoom = 8, max_zoom = 16)
+	#At zoom 16 the tolerance is under 2m, so the 22m zigzag is kept. At zoom 8 it is hundreds of metres, so the track becomes a straight line
+	zoomed_in_points = sum(len(feature["geometry"]["coordinates"]) for x_y in read_file(tile_directory, "metadata.json")["tiles"]["16"]
+		for feature in read_file(tile_directory, "16\\" + x_y.replace("/", "\\") + ".geojson")["features"])
+	assert zoomed_in_points >= len(latitudes)
+	zoomed_out = read_file(tile_directory, "8\\127\\85.geojson")["features"]
+	assert [feature["geometry"]["coordinates"] for feature in zoomed_out] == [[[-0.12, 51.5001], [-0.08, 51.4999]]]
+
+def test_segments_crossing_a_tile_edge_are_in_both_tiles():
+	x, y = tile_coordinates(array([51.5]), array([0.0]), 16)
+	pieces = split_track_into_tiles(array([51.5, 51.5, 51.5]), array([-0.001, 0.001, 0.002]), 16)
+	assert pieces == [(int(x[0]) - 1, int(y[0]), 0, 1), (int(x[0]), int(y[0]), 0, 2)]
+
+def test_empty_tracks_and_tiles_are_not_written(tmp_path):
+	assert split_track_into_tiles(array([51.5]), array([-0.1]), 8) == []
+	videos = [make_video("single_point.MP4", [51.5], [-0.1]), make_video("no_fix.MP4", [nan, nan, nan], [nan, nan, nan])]
+	tile_directory, writer, summary = write_pyramid(tmp_path, videos)
+	assert summary == "No tracks to write to tiles"
+	assert writer.tile_count == 0 and not exists(f"{tile_directory}\\metadata.json")
+	#A track with gaps in its fix only has tiles where it has points
+	latitudes, longitudes = make_zigzag()
+	latitudes[50:150] = nan
+	tile_directory, writer, summary = write_pyramid(tmp_path, [make_video("gap.MP4", latitudes, longitudes)], min_zoom = 14, max_zoom = 14)
+	assert writer.feature_count >= len(read_file(tile_directory, "metadata.json")["tiles"]["14"]) == writer.tile_count
+
+def test_viewer_loads_the_map_leaflet(tmp_path):
+	tile_directory, writer, summary = write_pyramid(tmp_path, [make_video("a.MP4", *make_zigzag())], min_zoom = 8, max_zoom = 8)
+	with open(f"{tile_directory}\\index.html") as viewer_file:
+		viewer = viewer_file.read()
+	assert f'src="{LEAFLET_URL}/leaflet.js"' in viewer and f'href="{LEAFLET_URL}/leaflet.css"' in viewer
+	assert "unpkg" not in viewer and "{{" not in viewer
+	shared_outputs = SharedOutputs(str(tmp_path))
+	shared_outputs.sources = dict(leaflet = "assets/leaflet.js", leaflet_css = f"{LEAFLET_URL}/leaflet.css")
+	tile_directory, writer, summary = write_pyramid(tmp_path / "local", [make_video("a.MP4", *make_zigzag())], min_zoom = 8, max_zoom = 8, leaflet_sources = shared_outputs.get_sources_from(".."))
+	with open(f"{tile_directory}\\index.html") as viewer_file:
+		viewer = viewer_file.read()
+	assert 'src="../assets/leaflet.js"' in viewer and f'href="{LEAFLET_URL}/leaflet.css"' in viewer
@@ -0,0 +1,59 @@
+from pandas import Timestamp, Timedelta
+from dash_analyser_application.fleet_tracks import FleetTracks, make_fleet_tracks
+from dash_analyser_application.mapper_classes import ExclusionZone
+from dash_analyser_application.zone_intervals import make_zone_intervals
+from dash_analyser_application.trip_segmentation import segment_trips
+from dash_analyser_application.timeline_functions import make_video_bars, make_timeline_dataframe, make_trip_timeline_dataframe, make_timeline_figure, hide_clip_bars, CLIP_BAR_COLOUR
+
+START = Timestamp("2021-06-14 10:00:00")
+DEPOT = ExclusionZone((51.503, -0.1), 0.15, "Depot") #the clips' points are 111m apart heading north from 51.5, so the third to fifth points of a clip are inside
+
+def make_clips(make_clip) -> list:
+	#Two clips a few minutes apart which make one trip, a later clip which makes a second trip, and a clip with no points
+	return [
+		make_clip("a.MP4", START, 6),
+		make_clip("b.MP4", START + Timedelta(minutes = 3), 3),
+		make_clip("c.MP4", START + Timedelta(hours = 2), 3),
+		make_clip("empty.MP4", START, 0)
+		]
+
+def test_a_bar_for_each_clip_with_points(make_clip):
+	video_bars = make_video_bars(make_fleet_tracks(make_clips(make_clip), [DEPOT]))
+	assert video_bars.index.tolist() == ["a.MP4", "b.MP4", "c.MP4"]
+	assert video_bars["FilePath"].tolist() == ["a.MP4", "b.MP4", "c.MP4"]
+	assert video_bars["Date"].tolist() == ["14/06/2021"] * 3
+	assert video_bars["Start"].tolist() == ["2021-06-14 10:00:00", "2021-06-14 10:03:00", "2021-06-14 12:00:00"]
+	assert video_bars["End"].tolist() == ["2021-06-14 10:00:05", "2021-06-14 10:03:02", "2021-06-14 12:00:02"]
+	assert video_bars["ExclusionZones"].tolist() == [DEPOT.timeline_label] * 3
+	assert video_bars["AverageSpeed"].tolist() == ["30.0 km/h"] * 3 and video_bars["FileSize"].tolist() == ["10 MB"] * 3
+	video_bars = make_video_bars(make_fleet_tracks(make_clips(make_clip), []))
+	assert video_bars["Colour"].tolist() == ["Not in exclusion zones"] * 3
+
+def test_a_bar_for_each_visit_to_a_zone(make_clip):
+	fleet = make_fleet_tracks(make_clips(make_clip), [DEPOT])
+	timeline_df = make_timeline_dataframe(fleet, make_zone_intervals(fleet, [DEPOT]))
+	assert timeline_df["Colour"].tolist() == ["Video"] * 3 + ["In Depot"] * 3
+	visits = timeline_df.iloc[3:]
+	assert visits["FilePath"].tolist() == ["a.MP4", "b.MP4", "c.MP4"]
+	assert visits["Start"].tolist() == ["2021-06-14 10:00:02", "2021-06-14 10:03:02", "2021-06-14 12:00:02"]
+	assert visits["End"].tolist() == ["2021-06-14 10:00:04", "2021-06-14 10:03:02", "2021-06-14 12:00:02"]
+	assert visits["ExclusionZones"].iloc[0] == f"In Depot for {Timedelta(seconds = 2)}"
+	#Without any visits the bars keep the colour of the zones each video entered
+	fleet = make_fleet_tracks(make_clips(make_clip), [])
+	assert make_timeline_dataframe(fleet, make_zone_intervals(fleet, [])).equals(make_video_bars(fleet).reset_index(drop = True))
+
+def test_trip_bars_are_followed_by_hidden_clip_bars(make_clip):
+	clip_fleet = make_fleet_tracks(make_clips(make_clip), [DEPOT])
+	trips = segment_trips(clip_fleet)
+	trip_fleet = FleetTracks(trips)
+	trip_fleet.add_exclusion_zones_to_file_info([DEPOT])
+	timeline_df = make_trip_timeline_dataframe(trip_fleet, clip_fleet, make_zone_intervals(trip_fleet, [DEPOT]))
+	#A visit which ends in one clip and starts again in the next is two visits, as the vehicle left the zone in between
+	assert timeline_df["Colour"].tolist() == ["Trip"] * 2 + ["In Depot"] * 3 + [CLIP_BAR_COLOUR] * 3
+	assert timeline_df["FilePath"].tolist()[:2] == ["a.MP4 to b.MP4 (2 clips)", "c.MP4"]
+	assert timeline_df["Start"].tolist()[:2] == ["2021-06-14 10:00:00", "2021-06-14 12:00:00"]
+	assert timeline_df["End"].tolist()[:2] == ["2021-06-14 10:03:02", "2021-06-14 12:00:02"]
+	assert timeline_df["FilePath"].tolist()[5:] == ["a.MP4", "b.MP4", "c.MP4"]
+	figure = make_timeline_figure(timeline_df, "Trips")
+	hide_clip_bars(figure)
+	assert {trace.name: trace.visible for trace in figure.data} == {"Trip": None, "In Depot": None, CLIP_BAR_COLOUR: "legendonly"}
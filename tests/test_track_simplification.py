@@ -0,0 +1,123 @@
+from json import dumps
+from numpy import array, zeros, flatnonzero, cumsum, arange, sin
+from numpy.random import default_rng
+from pandas import DataFrame
+from folium import FeatureGroup
+from branca.colormap import linear
+from dash_analyser_application.track_simplification import ramer_douglas_peucker, visvalingam_whyatt, triangle_areas, distances_to_segment, project_to_metres, TrackSimplifier, SimplificationReport, make_track_simplifier
+from dash_analyser_application.geometry_encoding import EncodedTrackTable, encode_polyline
+from dash_analyser_application.mapper_classes import RouteLineMaker
+
+def keep_ends(point_count:int):
+	keep = zeros(point_count, dtype=bool)
+	keep[0] = keep[-1] = True
+	return keep
+
+def reference_rdp(points, tolerance:float, start:int, end:int) -> list:
+	#The textbook recursive form, keeping the furthest point from each chord while it is further than the tolerance
+	if end - start < 2:
+		return [start, end]
+	distances = [distances_to_segment(points[i:i+1], points[start], points[end])[0] for i in range(start + 1, end)]
+	furthest = max(range(len(distances)), key = distances.__getitem__)
+	if distances[furthest] <= tolerance:
+		return [start, end]
+	middle = start + 1 + furthest
+	return reference_rdp(points, tolerance, start, middle)[:-1] + reference_rdp(points, tolerance, middle, end)
+
+def random_walk(point_count:int, seed:int):
+	return cumsum(default_rng(seed).normal(0, 3, (point_count, 2)), axis=0)
+
+def test_rdp_known_line():
+	points = array([[0, 0], [1, 0.1], [2, -0.1], [3, 5], [4, 6], [5, 7], [6, 8.1], [7, 9], [8, 9], [9, 9]], dtype=float)
+	assert flatnonzero(ramer_douglas_peucker(points, 1.0, keep_ends(len(points)))).tolist() == [0, 2, 3, 7, 9]
+
+def test_rdp_matches_recursive_reference():
+	for seed in range(5):
+		points = random_walk(300, seed)
+		kept = flatnonzero(ramer_douglas_peucker(points, 5.0, keep_ends(len(points)))).tolist()
+		assert kept == reference_rdp(points, 5.0, 0, len(points) - 1)
+
+def test_rdp_keeps_forced_points():
+	points = array([[i, 0] for i in range(10)], dtype=float)
+	keep = keep_ends(len(points))
+	keep[4] = True
+	assert flatnonzero(ramer_douglas_peucker(points, 1.0, keep)).tolist() == [0, 4, 9]
+
+def test_visvalingam_known_line():
+	points = array([[0, 0], [1, 0.01], [2, 0], [3, 5], [4, 0]], dtype=float)
+	assert flatnonzero(visvalingam_whyatt(points, 1.0, keep_ends(len(points)))).tolist() == [0, 2, 3, 4]
+
+def test_visvalingam_leaves_no_small_triangles():
+	#Every point left which wasn't forced to be kept must make a triangle of at least the tolerance squared with its remaining neighbours
+	for seed in range(5):
+		points = random_walk(300, seed)
+		keep = keep_ends(len(points))
+		keep[150] = True
+		kept = flatnonzero(visvalingam_whyatt(points, 4.0, keep.copy()))
+		assert 0 in kept and 150 in kept and 299 in kept
+		areas = triangle_areas(points[kept[:-2]], points[kept[1:-1]], points[kept[2:]])
+		forced = keep[kept[1:-1]]
+		assert (areas[~forced] >= 16).all()
+
+def test_triangle_areas():
+	assert triangle_areas(array([[0.0, 0.0]]), array([[2.0, 2.0]]), array([[4.0, 0.0]])).tolist() == [4.0]
+
+def test_project_to_metres():
+	#A thousandth of a degree of latitude is about 111 metres
+	projected = project_to_metres(array([[51.5, -0.1], [51.501, -0.1]]))
+	assert projected[0].tolist() == [0.0, 0.0]
+	assert abs(projected[1, 1] - 111.19) < 0.01 and projected[1, 0] == 0
+
+def test_simplify_routeline_keeps_ends_and_reports():
+	simplifier = TrackSimplifier("rdp", 5)
+	points = [(51.5 + i * 1e-5, -0.1) for i in range(100)]
+	simplified = simplifier.simplify_routeline(points)
+	assert simplified.tolist() == [list(points[0]), list(points[-1])]
+	assert simplifier.report.original_vertices == 100 and simplifier.report.simplified_vertices == 2
+
+def test_simplify_speed_line_keeps_bin_changes():
+	simplifier = TrackSimplifier("rdp", 5)
+	points = [(51.5 + i * 1e-5, -0.1) for i in range(10)]
+	speed_bins = array([0, 0, 0, 1, 1, 1, 1, 2, 2, 2])
+	simplified, bins = simplifier.simplify_speed_line(points, speed_bins)
+	assert bins.tolist() == [0, 0, 1, 1, 2, 2]
+	assert simplified.tolist() == [list(points[i]) for i in [0, 2, 3, 6, 7, 9]]
+
+def make_route(point_count:int, seed:int) -> DataFrame:
+	#A wandering route a few metres between points, with speeds that cross several colour bins
+	walk = random_walk(point_count, seed)
+	return DataFrame(dict(Latitude = 51.5 + walk[:, 1] / 111000, Longitude = -0.1 + walk[:, 0] / 69000, Speed = 40 + 30 * sin(arange(point_count) / 15)))
+
+def test_speed_line_adds_to_the_routeline_simplification():
+	gps_df = make_route(400, 7)
+	simplifier = TrackSimplifier("rdp", 5)
+	track_table = EncodedTrackTable()
+	routeliner = RouteLineMaker(gps_df, FeatureGroup(), FeatureGroup(), FeatureGroup(), simplifier, track_table)
+	routeliner.make_routeline("blue")
+	routeline_indices = routeliner.kept_indices
+	assert routeline_indices.tolist() == flatnonzero(ramer_douglas_peucker(project_to_metres(routeliner.points), 5, keep_ends(400))).tolist()
+	routeliner.make_routeline_with_speed_colouring(linear.YlOrRd_09.scale(0, 100))
+	speed_indices = routeliner.kept_indices
+	assert set(routeline_indices.tolist()) < set(speed_indices.tolist()) #every point the routeline kept is still drawn
+	assert track_table.tracks == [encode_polyline(routeliner.points[speed_indices])] #the track is stored once, and both lines are drawn from it
+	assert simplifier.report.lines == 1
+	assert simplifier.report.original_vertices == 400 and simplifier.report.simplified_vertices == len(speed_indices)
+
+def test_report_counts_each_track_once():
+	report = SimplificationReport()
+	track_key = object()
+	points = [(51.5, -0.1)] * 10
+	report.add_line(points, points[:4], track_key)
+	report.add_line(points, points[:6], track_key)
+	report.add_line(points, points[:2])
+	assert (report.lines, report.original_vertices, report.simplified_vertices) == (2, 20, 8)
+
+def test_report_measures_the_form_tracks_are_written_in():
+	points = [(51.5 + i * 1e-5, -0.1) for i in range(100)]
+	for precision, measure, described_as in [(5, lambda line: len(encode_polyline(line, 5)), "of encoded tracks"), (None, lambda line: len(dumps([list(point) for point in line])), "of coordinates")]:
+		simplifier = TrackSimplifier("rdp", 5, precision)
+		simplified = simplifier.simplify_routeline(points)
+		assert simplifier.report.original_bytes == measure(points)
+		assert simplifier.report.simplified_bytes == measure(simplified.tolist())
+		assert described_as in simplifier.report.summary()
+	assert make_track_simplifier(precision = 5).report.precision == 5
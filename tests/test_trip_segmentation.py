@@ -0,0 +1,44 @@
+from pandas import Series, Timestamp, Timedelta, NaT, DataFrame
+from dash_analyser_application.trip_segmentation import find_trip_numbers, measure_distance, segment_trips
+from dash_analyser_application.fleet_tracks import FleetTracks
+
+START = Timestamp("2021-06-14 08:00:00")
+
+def times(*seconds) -> Series:
+	return Series([NaT if second is None else START + Timedelta(seconds = second) for second in seconds])
+
+def test_consecutive_clips_are_joined_until_a_gap():
+	trip_numbers = find_trip_numbers(times(0, 65, 130, 1000), times(60, 125, 190, 1060), 300)
+	assert trip_numbers.tolist() == [1, 1, 1, 2]
+
+def test_gap_equal_to_threshold_joins_clips():
+	assert find_trip_numbers(times(0, 360), times(60, 120), 300).tolist() == [1, 1]
+	assert find_trip_numbers(times(0, 361), times(60, 120), 300).tolist() == [1, 2]
+
+def test_clips_are_numbered_in_order_of_recording():
+	trip_numbers = find_trip_numbers(times(5000, 0, 65), times(5060, 60, 125), 300)
+	assert trip_numbers.tolist() == [2, 1, 1]
+
+def test_gaps_are_measured_from_the_latest_end_so_far():
+	#The second clip ends early, but the first is still recording, so the third clip follows on from the first
+	trip_numbers = find_trip_numbers(times(0, 10, 1100), times(1000, 20, 1200), 300)
+	assert trip_numbers.tolist() == [1, 1, 1]
+
+def test_clips_without_a_time_are_trips_of_their_own():
+	trip_numbers = find_trip_numbers(times(0, None, 65, None), times(60, None, 125, None), 300)
+	assert trip_numbers.tolist() == [1, 2, 1, 3]
+
+def test_measure_distance():
+	#One degree of latitude along a meridian is about 111.195km on the mean earth sphere
+	gps_df = DataFrame({"Latitude": [51.0, 51.5, 52.0], "Longitude": [-1.0, -1.0, -1.0]})
+	assert abs(measure_distance(gps_df) - 111.195) < 0.001
+	assert measure_distance(gps_df.iloc[:1]) == 0.0
+
+def test_segment_trips(make_clip):
+	clips = [make_clip("b.MP4", START + Timedelta(seconds = 2000), 60), make_clip("a2.MP4", START + Timedelta(seconds = 61), 60), make_clip("a1.MP4", START, 60), make_clip("empty.MP4", START, 0)]
+	trips = segment_trips(FleetTracks(clips))
+	assert [[clip.video_name for clip in trip.clips] for trip in trips] == [["a1.MP4", "a2.MP4"], ["b.MP4"]]
+	assert [trip.video_name for trip in trips] == ["Trip 1", "Trip 2"]
+	assert len(trips[0].gps_df.index) == 120
+	assert trips[0].file_info_df["SourceFile"].iloc[0] == "a1.MP4 to a2.MP4 (2 clips)"
+	assert trips[1].file_info_df["SourceFile"].iloc[0] == "b.MP4"
@@ -0,0 +1,89 @@
+from math import ceil
+from dash_analyser_application import video
+from dash_analyser_application.video import FrameSampler
+from cv2 import CAP_PROP_FPS, CAP_PROP_POS_MSEC
+
+class FakeCapture:
+
+	"""Stands in for cv2.VideoCapture, holding a number of frames at a frame rate. Each retrieved image is the index of the frame"""
+
+	def __init__(self, frame_count:int, fps:float):
+		self.frame_count = frame_count
+		self.fps = fps
+		self.frame_index = -1
+		self.retrieved = []
+
+	def get(self, property_id:int) -> float:
+		if property_id == CAP_PROP_FPS:
+			return self.fps
+		if property_id == CAP_PROP_POS_MSEC:
+			return self.frame_index * 1000 / 25
+		return 0.0
+
+	def grab(self) -> bool:
+		if self.frame_index + 1 >= self.frame_count:
+			return False
+		self.frame_index += 1
+		return True
+
+	def retrieve(self) -> tuple:
+		self.retrieved.append(self.frame_index)
+		return True, self.frame_index
+
+	def release(self):
+		pass
+
+def sample(monkeypatch, frame_count:int, fps:float, **sampler_options) -> tuple:
+	capture = FakeCapture(frame_count, fps)
+	monkeypatch.setattr(video, "VideoCapture", lambda video_file: capture)
+	sampler = FrameSampler("video.MP4", **sampler_options)
+	return sampler, capture, list(sampler.sample_frames())
+
+def first_frames_after(sample_times:list, fps:float) -> list:
+	#The index of the first frame at or after each sample time, worked out independently of the sampler
+	return [ceil(round(sample_time * fps, 9)) for sample_time in sample_times]
+
+def test_samples_the_first_frame_at_each_second_at_fractional_fps(monkeypatch):
+	sampler, capture, samples = sample(monkeypatch, 300, 29.97)
+	assert [image for count, timestamp, image in samples] == first_frames_after(range(10), 29.97)
+	assert [count for count, timestamp, image in samples] == list(range(10))
+	assert all(abs(timestamp - image / 29.97) < 1e-9 for count, timestamp, image in samples)
+	assert capture.retrieved == [image for count, timestamp, image in samples] #frames which aren't sampled are only grabbed
+
+def test_sample_times_do_not_drift_at_rates_that_do_not_divide_a_second(monkeypatch):
+	sampler, capture, samples = sample(monkeypatch, 301, 30.0, sample_rate = 3)
+	assert [image for count, timestamp, image in samples] == list(range(0, 301, 10))
+
+def test_sampling_slower_than_once_a_second(monkeypatch):
+	sampler, capture, samples = sample(monkeypatch, 250, 23.976, sample_rate = 0.5)
+	assert [image for count, timestamp, image in samples] == first_frames_after(range(0, 11, 2), 23.976)
+
+def test_last_frame_is_sampled_when_it_falls_on_a_sample_time(monkeypatch):
+	sampler, capture, samples = sample(monkeypatch, 61, 30.0)
+	assert [image for count, timestamp, image in samples] == [0, 30, 60]
+	sampler, capture, samples = sample(monkeypatch, 60, 30.0)
+	assert [image for count, timestamp, image in samples] == [0, 30]
+	assert sampler.frames_decoded == 60 and sampler.frames_sampled == 2
+
+def test_frame_step_takes_every_nth_frame(monkeypatch):
+	sampler, capture, samples = sample(monkeypatch, 25, 29.97, frame_step = 6)
+	assert [image for count, timestamp, image in samples] == [0, 6, 12, 18, 24]
+	assert sampler.frames_decoded == 25
+
+def test_position_is_used_when_the_frame_rate_is_unknown(monkeypatch):
+	#FakeCapture reports positions as if the video were 25fps
+	sampler, capture, samples = sample(monkeypatch, 60, 0.0)
+	assert [image for count, timestamp, image in samples] == [0, 25, 50]
+
+def test_decode_time_excludes_time_spent_by_the_caller(monkeypatch):
+	clock = iter(range(1000))
+	monkeypatch.setattr(video, "perf_counter", lambda: next(clock))
+	capture = FakeCapture(4, 1.0)
+	monkeypatch.setattr(video, "VideoCapture", lambda video_file: capture)
+	sampler = FrameSampler("video.MP4")
+	for count, timestamp, image in sampler.sample_frames():
+		for _ in range(10):
+			next(clock) #the caller's work takes ten ticks for each frame
+	#Each of the 5 grabs (including the one which finds the end) and 4 retrieves takes one tick
+	assert sampler.decode_time == 9
+	assert sampler.decoded_fps() == 4 / 9
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+from numpy import array, zeros
+from pandas import Timedelta
+from dash_analyser_application.fleet_tracks import FleetTracks
+from dash_analyser_application.zone_intervals import find_mask_runs, make_zone_intervals, summarise_dwell_by_zone
+
+def test_find_mask_runs():
+	zone_mask = array([[1, 0], [1, 1], [0, 1], [1, 1], [1, 0]], dtype=bool)
+	video_starts = array([True, False, False, True, False])
+	zones, starts, ends = find_mask_runs(zone_mask, video_starts)
+	assert zones.tolist() == [0, 0, 1, 1]
+	assert starts.tolist() == [0, 3, 1, 3]
+	assert ends.tolist() == [1, 4, 2, 3]
+
+def test_runs_split_at_video_boundaries():
+	zone_mask = array([[1], [1], [1], [1]], dtype=bool)
+	zones, starts, ends = find_mask_runs(zone_mask, array([True, False, True, False]))
+	assert starts.tolist() == [0, 2] and ends.tolist() == [1, 3]
+
+def test_no_points():
+	zones, starts, ends = find_mask_runs(zeros((0, 2), dtype=bool), zeros(0, dtype=bool))
+	assert len(zones) == len(starts) == len(ends) == 0
+
+def test_make_zone_intervals_and_dwell(make_clip):
+	fleet = FleetTracks([
+		make_clip("a.MP4", "2021-01-01 10:00:00", zone_masks = [[0, 1, 1, 1, 0, 1], [0, 0, 0, 0, 0, 0]]),
+		make_clip("b.MP4", "2021-01-01 11:00:00", zone_masks = [[1, 1, 0], [0, 1, 1]]),
+		make_clip("c.MP4", "2021-01-01 12:00:00", zone_masks = [[], []])
+		])
+	zones = [SimpleNamespace(name = "Depot"), SimpleNamespace(name = None)]
+	intervals = make_zone_intervals(fleet, zones)
+	assert intervals["Video"].tolist() == ["a.MP4", "a.MP4", "b.MP4", "b.MP4"]
+	assert intervals["Zone"].tolist() == [1, 1, 1, 2]
+	assert intervals["Zone Name"].tolist() == ["Depot", "Depot", "Depot", "Zone 2"]
+	assert intervals["Dwell"].tolist() == [Timedelta(seconds = 2), Timedelta(0), Timedelta(seconds = 1), Timedelta(seconds = 1)]
+	assert intervals["Points"].tolist() == [3, 1, 2, 2]
+	summary = summarise_dwell_by_zone(intervals)
+	assert summary["Visits"].tolist() == [3, 1]
+	assert summary["TotalDwell"].tolist() == [Timedelta(seconds = 3), Timedelta(seconds = 1)]
+
+def test_no_zones(make_clip):
+	fleet = FleetTracks([make_clip("a.MP4", "2021-01-01", zone_masks = [[1, 1]])])
+	intervals = make_zone_intervals(fleet, [])
+	assert len(intervals.index) == 0
+	assert summarise_dwell_by_zone(intervals).columns.tolist() == ["Zone", "Zone Name", "Visits", "TotalDwell"]